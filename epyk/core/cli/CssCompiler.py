@@ -0,0 +1,128 @@
+"""
+Command line to precompile the stylesheets of the framework.
+
+All the CSS classes of the registry are compiled for each theme defined in epyk.core.css.themes. The stylesheets are
+optimized, minified and named with the hash of their content. A manifest.json file is written with them and it should be
+loaded by the workers with CssCache.loadManifest(path). The CSS is then only generated for the custom overrides.
+
+This should be run at deploy time
+
+Example
+  python -m epyk.core.cli.CssCompiler --path static/css
+  python -m epyk.core.cli.CssCompiler --path static/css --themes ThemeDark ThemeBlue --default ThemeBlue --variables
+"""
+
+import os
+import sys
+import json
+import time
+import inspect
+import pkgutil
+import argparse
+import importlib
+import collections
+
+from epyk.core.css import themes as cssThemes
+from epyk.core.css import CssCache
+from epyk.core.css import CssOptimizer
+from epyk.core.css import Palette
+from epyk.core.css.styles import CssStyle
+from epyk.core.css.styles import CssRegistry
+
+
+def getThemes():
+  """
+  Return all the themes defined in the epyk.core.css.themes package
+
+  :return: An ordered dictionary with the theme class names and the classes
+  """
+  results = collections.OrderedDict()
+  for _, modName, _ in pkgutil.iter_modules(cssThemes.__path__):
+    pyMod = importlib.import_module("%s.%s" % (cssThemes.__name__, modName))
+    for name, cls in inspect.getmembers(pyMod, inspect.isclass):
+      if cls.__module__ == pyMod.__name__ and hasattr(cls, 'colors'):
+        results[name] = cls
+  return results
+
+
+def compileStyles(theme):
+  """
+  Compile all the CSS classes of the registry for a theme
+
+  :param theme: The theme class (or Palette.VARIABLES)
+
+  :return: An ordered dictionary with the selectors and the CSS definitions
+  """
+  styles = collections.OrderedDict()
+  for clsName in CssRegistry.CLASSES:
+    cssObj = CssStyle.getCssObj(clsName, theme=theme)
+    if cssObj is not None:
+      styles.update(cssObj.getStyles())
+  return styles
+
+
+def build(path, themes=None, default=None, variables=False):
+  """
+  Write the precompiled stylesheets and the manifest
+
+  :param path: The destination folder
+  :param themes: Optional. The theme class names to compile. Default all the themes
+  :param default: Optional. The theme class name used by default. Default the first theme
+  :param variables: Optional. Flag to also write the stylesheet based on CSS variables and the themes variables
+
+  :return: The manifest dictionary
+  """
+  available = getThemes()
+  names = themes or list(available)
+  for name in names:
+    if name not in available:
+      raise ValueError("Unknown theme %s, available themes: %s" % (name, ", ".join(available)))
+
+  default = default or names[0]
+  manifest = {'version': 1, 'created': time.strftime("%Y-%m-%d %H:%M:%S"), 'default': CssCache.themeKey(available[default]),
+              'classes': sorted(CssRegistry.CLASSES), 'themes': {}}
+  for name in names:
+    theme = available[name]
+    sheet = CssCache.CACHE.write(CssOptimizer.minify(compileStyles(theme)), path, prefix="epyk.%s" % name.lower())
+    manifest['themes'][CssCache.themeKey(theme)] = {'name': name, 'file': sheet, 'class': Palette.themeClass(theme)}
+  if variables:
+    manifest['variables'] = {
+      'file': CssCache.CACHE.write(CssOptimizer.minify(compileStyles(Palette.VARIABLES)), path, prefix="epyk.variables"),
+      'themes': CssCache.CACHE.write(Palette.themesCss(available[default], [available[name] for name in names if name != default]),
+                                     path, prefix="epyk.themes")}
+  CssCache.CACHE.writeFile("manifest.json", json.dumps(manifest, indent=2, sort_keys=True), path)
+  return manifest
+
+
+def main(argv=None):
+  """
+  Entry point of the command line
+
+  :param argv: Optional. The command line arguments. Default sys.argv
+
+  :return: The exit code
+  """
+  parser = argparse.ArgumentParser(description="Precompile the CSS stylesheets of the themes")
+  parser.add_argument('-p', '--path', required=True, help="The destination folder")
+  parser.add_argument('-t', '--themes', nargs='*', help="The theme classes to compile (default all)")
+  parser.add_argument('-d', '--default', help="The default theme class (default the first one)")
+  parser.add_argument('--variables', action='store_true', help="Also compile the stylesheet based on CSS variables")
+  parser.add_argument('-q', '--quiet', action='store_true', help="Do not display the files written")
+  args = parser.parse_args(argv)
+
+  try:
+    manifest = build(args.path, args.themes, args.default, args.variables)
+  except ValueError as e:
+    parser.error(str(e))
+
+  if not args.quiet:
+    for record in manifest['themes'].values():
+      print("%s: %s" % (record['name'], os.path.join(args.path, record['file'])))
+    if 'variables' in manifest:
+      print("variables: %s" % os.path.join(args.path, manifest['variables']['file']))
+    print("manifest: %s" % os.path.join(args.path, "manifest.json"))
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
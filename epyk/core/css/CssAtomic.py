@@ -0,0 +1,243 @@
+"""
+Extraction of the repeated inline styles.
+
+The components are writing a lot of inline styles and the same declarations are repeated on many elements
+(e.g. text-align:center;vertical-align:middle;width:80px). This module is a post render pass on the HTML which is
+moving the declarations used several times to short atomic classes defined once in the stylesheet.
+
+The inline styles have priority over the classes. By default a declaration is then kept inline when the element has a
+class attribute or when its property (or one of its shorthands / longhands) is defined in a style block of the page.
+The atomic classes can be defined with !important to move those declarations too, but in this case the style changes
+done later in Javascript (element.style) will not be visible anymore. This is why this is not the default
+
+Example
+  html, styles = CssAtomic.extract(rptObj.outs.html())
+  page = CssAtomic.atomize(html)
+"""
+
+import re
+import collections
+
+from epyk.core.css import CssOptimizer
+
+
+_TAG_REGEX = re.compile(r"""<[a-zA-Z][^\s/>]*(?:\s+[^\s=/>]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s'">]+))?)*\s*/?>""")
+_STYLE_REGEX = re.compile(r"""(\s)style\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+_CLASS_REGEX = re.compile(r"""(\s)class\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s'">]+))""", re.IGNORECASE)
+_RAW_REGEX = re.compile(r"(<(script|style)\b.*?</\2\s*>)", re.IGNORECASE | re.DOTALL)
+_BLOCK_REGEX = re.compile(r"\{([^{}]*)\}")
+
+
+def declarations(style):
+  """
+  Split an inline style in normalised declarations
+
+  Example
+  >>> declarations("text-align: center; Width:80px;")
+  ['text-align:center', 'width:80px']
+
+  :param style: The content of a style attribute
+
+  :return: A list of strings property:value
+  """
+  results = []
+  for declaration in CssOptimizer.split(style):
+    if ":" not in declaration:
+      continue
+
+    attr, value = declaration.split(":", 1)
+    attr = attr.strip()
+    if not attr.startswith("--"):
+      # The custom properties are case sensitive
+      attr = attr.lower()
+    results.append("%s:%s" % (attr, " ".join(value.split())))
+  return results
+
+
+def movable(decls):
+  """
+  Return the declarations which can be moved to a class.
+
+  The properties defined several times in a style attribute are kept inline (e.g. display:-webkit-box;display:flex),
+  the order of the declarations is only guaranteed in the same attribute
+
+  :param decls: The list of the declarations of a style attribute
+
+  :return: The list of declarations in the style order
+  """
+  counts = collections.Counter(declaration.split(":", 1)[0] for declaration in decls)
+  return [declaration for declaration in decls if counts[declaration.split(":", 1)[0]] == 1]
+
+
+def reserved(html):
+  """
+  Return the properties defined in the style blocks of the page, with all their longhands (see CssOptimizer.expand).
+  The inline declarations of those properties cannot be moved to a class without changing their priority
+
+  :param html: The HTML string
+
+  :return: A set of properties
+  """
+  attrs = set()
+  for part, active in _segments(html):
+    if not active and part[:6].lower() == "<style":
+      for block in _BLOCK_REGEX.findall(part):
+        for attr, _, _ in CssOptimizer.parse(block):
+          attrs.update(CssOptimizer.expand(attr))
+  return attrs
+
+
+def className(index, prefix='py_a'):
+  """
+  Return the short name of an atomic class
+
+  Example
+  >>> className(37)
+  'py_a11'
+
+  :param index: The class index
+  :param prefix: Optional. The prefix of the atomic classes
+
+  :return: The classname
+  """
+  chars, digits = "0123456789abcdefghijklmnopqrstuvwxyz", []
+  while True:
+    index, rest = divmod(index, 36)
+    digits.append(chars[rest])
+    if index == 0:
+      break
+
+  return "%s%s" % (prefix, "".join(reversed(digits)))
+
+
+def _segments(html):
+  """
+  Split the HTML in the parts to be processed and the script and style blocks to be kept unchanged
+  """
+  for i, part in enumerate(_RAW_REGEX.split(html)):
+    if i % 3 == 0:
+      yield part, True
+    elif i % 3 == 1:
+      yield part, False
+
+
+def _styles(tag):
+  match = _STYLE_REGEX.search(tag)
+  if match is None:
+    return None, None
+
+  return match, match.group(2) if match.group(2) is not None else match.group(3)
+
+
+def _candidates(tag, decls, reservedAttrs):
+  """
+  Return the declarations of a tag which can be moved to an atomic class.
+  All of them are kept inline for the elements with a class attribute if reservedAttrs is defined (no !important)
+  """
+  candidates = movable(decls)
+  if reservedAttrs is None:
+    return candidates
+
+  if _CLASS_REGEX.search(tag) is not None:
+    return []
+
+  return [declaration for declaration in candidates
+          if not CssOptimizer.expand(declaration.split(":", 1)[0]) & reservedAttrs]
+
+
+def extract(html, minCount=2, prefix='py_a', important=False):
+  """
+  Move the declarations repeated in the inline styles to atomic classes.
+
+  A declaration is only moved if it is used at least minCount times and if this is reducing the size of the page.
+  Without important, the declarations of the elements with a class attribute and the properties defined in the style
+  blocks of the page are kept inline
+
+  :param html: The HTML string
+  :param minCount: Optional. The minimum number of elements using a declaration
+  :param prefix: Optional. The prefix of the atomic classes
+  :param important: Optional. Flag to add !important to the atomic classes and to move all the declarations
+
+  :return: A tuple with the new HTML string and a dictionary with the selectors and the CSS definitions
+  """
+  reservedAttrs = None if important else reserved(html)
+  counts = collections.Counter()
+  for part, active in _segments(html):
+    if active:
+      for tag in _TAG_REGEX.findall(part):
+        match, style = _styles(tag)
+        if match is not None:
+          counts.update(_candidates(tag, declarations(style), reservedAttrs))
+
+  classes, styles = {}, collections.OrderedDict()
+  # The ties are kept in the order of the first appearance in the page so the class names are stable
+  for declaration, count in counts.most_common():
+    name = className(len(classes), prefix)
+    # each element gets the classname instead of the declaration and the rule is written once in the stylesheet
+    if count < minCount or count * (len(declaration) - len(name)) <= len(".%s{%s}" % (name, declaration)):
+      continue
+
+    classes[declaration] = name
+    styles[".%s" % name] = "{ %s%s; }" % (declaration, " !important" if important else "")
+  if not classes:
+    return html, styles
+
+  def rewrite(tagMatch):
+    tag = tagMatch.group(0)
+    match, style = _styles(tag)
+    if match is None:
+      return tag
+
+    inline, atomic = [], []
+    decls = declarations(style)
+    candidates = _candidates(tag, decls, reservedAttrs)
+    for declaration in decls:
+      if declaration in classes and declaration in candidates:
+        if classes[declaration] not in atomic:
+          atomic.append(classes[declaration])
+      else:
+        inline.append(declaration)
+    if not atomic:
+      return tag
+
+    quote = '"' if match.group(2) is not None else "'"
+    tag = "%s%s%s" % (tag[:match.start()], "%sstyle=%s%s%s" % (match.group(1), quote, ";".join(inline), quote) if inline else "", tag[match.end():])
+    classMatch = _CLASS_REGEX.search(tag)
+    if classMatch is None:
+      end = len(tag) - (2 if tag.endswith("/>") else 1)
+      return "%s class='%s'%s" % (tag[:end].rstrip(), " ".join(atomic), tag[end:])
+
+    for i, quote in ((2, '"'), (3, "'"), (4, '"')):
+      if classMatch.group(i) is not None:
+        value = " ".join([classMatch.group(i)] + atomic)
+        return "%s%sclass=%s%s%s%s" % (tag[:classMatch.start()], classMatch.group(1), quote, value, quote, tag[classMatch.end():])
+
+  return "".join([_TAG_REGEX.sub(rewrite, part) if active else part for part, active in _segments(html)]), styles
+
+
+def atomize(html, minCount=2, prefix='py_a', important=False):
+  """
+  Move the repeated inline styles to atomic classes and add the stylesheet to the page.
+
+  The style tag is added at the end of the head if the page has one
+
+  Example
+  CssAtomic.atomize(rptObj.outs.html())
+
+  :param html: The HTML string
+  :param minCount: Optional. The minimum number of elements using a declaration
+  :param prefix: Optional. The prefix of the atomic classes
+  :param important: Optional. Flag to add !important to the atomic classes and to move all the declarations
+
+  :return: The new HTML string
+  """
+  html, styles = extract(html, minCount, prefix, important)
+  if not styles:
+    return html
+
+  styleTag = "<style>%s</style>" % CssOptimizer.minify(styles)
+  headEnd = html.lower().find("</head>")
+  if headEnd >= 0:
+    return "%s%s%s" % (html[:headEnd], styleTag, html[headEnd:])
+
+  return "%s\n%s" % (styleTag, html)
@@ -0,0 +1,422 @@
+"""
+Cache of the compiled CSS classes.
+
+The CSS produced by a CSS class is a pure function of the class definition, the theme and the colors overrides.
+The result of getStyles() is kept in a memory LRU cache and the stylesheets can also be written to disk with a
+content hash in their names. In this case the report can reference the external stylesheet instead of writing the
+same CSS text in all the pages.
+
+Example
+  CssCache.CACHE_PATH = r"/static/css/cache"
+  href = CssCache.stylesheet([rptObj.style.cssObj(...), ...])
+"""
+
+import os
+import json
+import hashlib
+import threading
+import collections
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+  import msvcrt
+
+try:
+  from importlib import metadata
+except ImportError:
+  # Python < 3.8
+  metadata = None
+
+from epyk.core.css import CssOptimizer
+
+
+# Folder used to store the compiled stylesheets. If None only the memory cache is used
+CACHE_PATH = None
+
+# Maximum number of compiled CSS classes kept in memory
+MAX_SIZE = 2048
+
+# Marker for the values not yet resolved
+MISSING = object()
+
+_VERSION = MISSING
+
+
+def themeKey(theme):
+  """
+  Return a serializable reference for a theme
+
+  :param theme: The theme class or its name
+
+  :return: The theme reference as a String
+  """
+  if theme is None or isinstance(theme, str):
+    return theme
+
+  return "%s.%s" % (getattr(theme, '__module__', ''), getattr(theme, '__name__', theme.__class__.__name__))
+
+
+def colorsKey(colors):
+  """
+  Return a hashable version of the colors overrides
+
+  :param colors: A dictionary of dictionaries with the colors to override per category and index
+
+  :return: A tuple or None
+  """
+  if not colors:
+    return None
+
+  return tuple(sorted((name, tuple(sorted(values.items()))) for name, values in colors.items()))
+
+
+def toText(styles):
+  """
+  Convert the result of getStyles() to a CSS String
+
+  :param styles: A dictionary with the selectors and the CSS definitions
+
+  :return: The CSS text
+  """
+  return "\n".join(["%s %s" % (selector, definition) for selector, definition in styles.items()])
+
+
+def version():
+  """
+  Return the installed version of epyk. The compiled stylesheets are not reused across versions
+
+  :return: The version as a String or None if the package is not installed
+  """
+  global _VERSION
+
+  if _VERSION is MISSING:
+    try:
+      _VERSION = metadata.version("epyk") if metadata is not None else None
+    except metadata.PackageNotFoundError:
+      _VERSION = None
+  return _VERSION
+
+
+def definitionKey(cssObj):
+  """
+  Return a hash of the definition of a CSS object.
+
+  It is based on the class, the style after customize(), the events styles, the selector and the epyk version. The
+  stylesheets written by a previous version of a class are then not served after a deploy
+
+  :param cssObj: The CSS Python object
+
+  :return: A short hexadecimal hash
+  """
+  cls = cssObj.__class__
+  return contentHash(json.dumps([
+    "%s.%s" % (cls.__module__, cls.__name__), version(), cssObj.cssId, cls.childrenTag, cls.directChildrenTag,
+    sorted(cssObj.style.items()),
+    sorted((state, sorted(record.items())) for state, record in cssObj.eventsStyles.items())], default=str))
+
+
+class FileLock(object):
+  """
+  Exclusive lock on a file shared by all the processes using the same stylesheets folder
+  """
+
+  def __init__(self, path):
+    self.path, self._file = path, None
+
+  def __enter__(self):
+    self._file = open(self.path, "a+")
+    if fcntl is not None:
+      fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+    else:
+      self._file.seek(0)
+      msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    if fcntl is not None:
+      fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+    else:
+      self._file.seek(0)
+      msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+    self._file.close()
+
+
+def contentHash(content):
+  """
+  Return the hash used in the name of the stylesheets
+
+  :param content: The file content
+
+  :return: A short hexadecimal hash
+  """
+  return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+
+class StylesCache(object):
+  """
+  Memory cache of the compiled CSS classes with an optional folder for the compiled stylesheets.
+
+  The keys are tuples (class name, theme, colors overrides). The reads are not using any lock, the entries used since
+  the last eviction get a second chance before being removed (CLOCK approximation of a LRU cache)
+  """
+
+  def __init__(self, maxsize=MAX_SIZE, path=None):
+    self.maxsize, self.path = maxsize, path
+    self._lru, self._lock = collections.OrderedDict(), threading.Lock()
+    self._used, self._sheets = set(), {}
+    self.hits, self.misses = 0, 0
+
+  def get(self, key):
+    """
+    Return the compiled CSS for a key. No lock is taken, the counters are only indicative with several threads
+
+    :param key: The cache key
+
+    :return: A dictionary with the selectors and the CSS definitions or None
+    """
+    styles = self._lru.get(key)
+    if styles is None:
+      self.misses += 1
+      return None
+
+    self._used.add(key)
+    self.hits += 1
+    return styles
+
+  def set(self, key, styles):
+    """
+    Store the compiled CSS for a key
+
+    :param key: The cache key
+    :param styles: A dictionary with the selectors and the CSS definitions
+
+    :return: The styles
+    """
+    with self._lock:
+      self._lru[key] = styles
+      while len(self._lru) > self.maxsize:
+        oldest = next(iter(self._lru))
+        if oldest in self._used and oldest != key:
+          # Used since the last eviction, the entry is kept
+          self._used.discard(oldest)
+          self._lru.move_to_end(oldest)
+        else:
+          self._used.discard(oldest)
+          del self._lru[oldest]
+    return styles
+
+  def invalidate(self, clsName=None):
+    """
+    Remove the compiled CSS of a class (or all of them)
+
+    :param clsName: Optional. The CSS class name. Default all the classes
+    """
+    with self._lock:
+      if clsName is None:
+        self._lru.clear()
+        self._used.clear()
+        self._sheets.clear()
+      else:
+        for key in [k for k in self._lru if k[0] == clsName]:
+          del self._lru[key]
+          self._used.discard(key)
+        self._sheets.clear()
+
+  def stylesheet(self, cssObjs, path=None):
+    """
+    Write the optimized CSS of the objects in an external stylesheet and return its file name.
+
+    The file name is based on a hash of its content so it can be cached by the browsers. When all the objects are
+    coming from the factory the file name is also stored in an index.json file in order to avoid generating the CSS
+    again, even in a new process. The index key includes a hash of the class definitions (see definitionKey)
+
+    :param cssObjs: A list of CSS Python objects
+    :param path: Optional. The destination folder. Default the cache path
+
+    :return: The stylesheet file name
+    """
+    path = path or self.path or CACHE_PATH
+    if path is None:
+      raise Exception("No path defined for the CSS stylesheets")
+
+    keys = [getattr(cssObj, '_cacheKey', None) for cssObj in cssObjs]
+    bundleKey = None
+    if all(k is not None for k in keys):
+      bundleKey = contentHash(json.dumps(
+        [[list(key), definitionKey(cssObj)] for key, cssObj in zip(keys, cssObjs)], default=str))
+      sheet = self._sheets.get((path, bundleKey))
+      if sheet is None:
+        sheet = self._index(path).get(bundleKey)
+      if sheet is not None and os.path.exists(os.path.join(path, sheet)):
+        self._sheets[(path, bundleKey)] = sheet
+        return sheet
+
+    styles = collections.OrderedDict()
+    for cssObj in cssObjs:
+      styles.update(cssObj.getStyles())
+    sheet = self.write(CssOptimizer.minify(styles), path)
+    if bundleKey is not None:
+      # The index is shared by all the processes using this folder
+      with self._lock, FileLock(os.path.join(path, "index.lock")):
+        index = self._index(path)
+        index[bundleKey] = sheet
+        self._write(path, "index.json", json.dumps(index))
+        self._sheets[(path, bundleKey)] = sheet
+    return sheet
+
+  def write(self, content, path=None, prefix="epyk"):
+    """
+    Write a CSS text in a stylesheet named with the hash of its content
+
+    :param content: The CSS text
+    :param path: Optional. The destination folder. Default the cache path
+    :param prefix: Optional. The prefix of the file name
+
+    :return: The stylesheet file name
+    """
+    path = path or self.path or CACHE_PATH
+    if path is None:
+      raise Exception("No path defined for the CSS stylesheets")
+
+    sheet = "%s.%s.css" % (prefix, contentHash(content))
+    if not os.path.exists(os.path.join(path, sheet)):
+      self._write(path, sheet, content)
+    return sheet
+
+  def writeFile(self, filename, content, path=None):
+    """
+    Write a file in the stylesheets folder (e.g. a manifest). The file is replaced atomically
+
+    :param filename: The file name
+    :param content: The text content
+    :param path: Optional. The destination folder. Default the cache path
+
+    :return: The file name
+    """
+    path = path or self.path or CACHE_PATH
+    if path is None:
+      raise Exception("No path defined for the CSS stylesheets")
+
+    self._write(path, filename, content)
+    return filename
+
+  def _index(self, path):
+    indexFile = os.path.join(path, "index.json")
+    if not os.path.exists(indexFile):
+      return {}
+
+    with open(indexFile) as f:
+      return json.load(f)
+
+  def _write(self, path, filename, content):
+    """
+    Write a file with a temporary file and a rename to be safe with concurrent processes
+    """
+    if not os.path.exists(path):
+      os.makedirs(path)
+    tmpFile = os.path.join(path, "%s.%s.tmp" % (filename, os.getpid()))
+    with open(tmpFile, "w") as f:
+      f.write(content)
+    os.replace(tmpFile, os.path.join(path, filename))
+
+  def stats(self):
+    """
+    Return the cache counters
+
+    :return: A dictionary with the size, the hits and the misses of the memory cache
+    """
+    return {"size": len(self._lru), "hits": self.hits, "misses": self.misses}
+
+
+# The cache shared by all the reports
+CACHE = StylesCache()
+
+
+def stylesheet(cssObjs, path=None):
+  """
+  Write the CSS of the objects in an external stylesheet and return its file name
+
+  Example
+  CssCache.stylesheet([CssStyle.getCssObj('CssButtonBasic', theme=ThemeDark.ThemeDark)], path=r"/static/css")
+
+  :param cssObjs: A list of CSS Python objects
+  :param path: Optional. The destination folder. Default CACHE_PATH
+
+  :return: The stylesheet file name
+  """
+  return CACHE.stylesheet(cssObjs, path)
+
+
+def link(href):
+  """
+  Return the HTML tag to load a compiled stylesheet
+
+  :param href: The stylesheet url
+
+  :return: The HTML string
+  """
+  return '<link rel="stylesheet" href="%s" type="text/css">' % href
+
+
+# The manifest of the stylesheets precompiled at build time (python -m epyk.core.cli.CssCompiler)
+MANIFEST = None
+
+
+def loadManifest(path):
+  """
+  Load the manifest of the precompiled stylesheets.
+
+  The CSS of the stock classes is then coming from those stylesheets and it is only generated for the overrides
+
+  Example
+  CssCache.loadManifest(r"/static/css")
+
+  :param path: The folder with the precompiled stylesheets and the manifest.json file
+
+  :return: The manifest dictionary
+  """
+  global MANIFEST
+
+  with open(os.path.join(path, "manifest.json")) as f:
+    manifest = json.load(f)
+  manifest['classes'] = set(manifest['classes'])
+  MANIFEST = manifest
+  return manifest
+
+
+def precompiled(theme=None):
+  """
+  Return the precompiled stylesheet of a theme
+
+  :param theme: Optional. The theme class (or its reference). Default the default theme of the manifest
+
+  :return: The stylesheet file name or None
+  """
+  if MANIFEST is None:
+    return None
+
+  record = MANIFEST['themes'].get(themeKey(theme) if theme is not None else MANIFEST['default'])
+  return record['file'] if record is not None else None
+
+
+def isPrecompiled(cssObj, theme=None):
+  """
+  Check if the CSS of an object is already in the precompiled stylesheet of a theme.
+  This is only the case for the stock classes without overrides
+
+  :param cssObj: The CSS Python object
+  :param theme: Optional. The theme of the page. Default the default theme of the manifest
+
+  :return: A boolean
+  """
+  key = cssObj._cacheKey
+  if MANIFEST is None or key is None or key[2] is not None or key[0] not in MANIFEST['classes']:
+    return False
+
+  if key[1] is None:
+    # Objects created with the default theme are using the theme of the page
+    return precompiled(theme) is not None
+
+  return key[1] in MANIFEST['themes'] and key[1] == (themeKey(theme) if theme is not None else MANIFEST['default'])
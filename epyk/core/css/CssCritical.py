@@ -0,0 +1,193 @@
+"""
+Critical CSS of the reports.
+
+The classnames are registered when the components are getting their CSS objects from the factory
+(CssStyle.getCssObj with the report). The classes used above the fold are written in a style tag in the header and all
+the other ones are moved to a stylesheet loaded asynchronously.
+This will reduce the render blocking CSS on large dashboards.
+
+Example
+  CssCritical.track(rptObj, cssObj)  # Only needed for the classnames not coming from the factory
+  CssCritical.fold(rptObj)
+  header = CssCritical.html(rptObj, cssObjs, path=r"/static/css", url="/css/")
+
+Documentation
+https://web.dev/defer-non-critical-css/
+"""
+
+import re
+import collections
+
+from epyk.core.css import CssCache
+from epyk.core.css import CssOptimizer
+
+
+_CLASS_REGEX = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+
+
+class Usage(object):
+  """
+  Classnames referenced by the components of a report.
+
+  The classnames are critical until the fold is reached
+  """
+
+  def __init__(self):
+    self.classnames, self.aboveFold = collections.OrderedDict(), True
+
+  def add(self, classnames, critical=None):
+    """
+    Register classnames used in the page. A classname is critical as soon as one component above the fold is using it
+
+    :param classnames: A classname, a CSS Python object or a list of them
+    :param critical: Optional. Flag to force the classname to be (or not to be) critical. Default the fold position
+    """
+    if critical is None:
+      critical = self.aboveFold
+    if not isinstance(classnames, (list, tuple, set)):
+      classnames = [classnames]
+    for classname in classnames:
+      if not isinstance(classname, str):
+        classname = classname.classname
+      self.classnames[classname] = self.classnames.get(classname, False) or critical
+
+  @property
+  def critical(self):
+    """
+    The critical classnames
+
+    :return: A set with the classnames
+    """
+    return set(classname for classname, critical in self.classnames.items() if critical)
+
+
+def usage(report):
+  """
+  Return the classnames usage of a report. It is stored in the report properties
+
+  :param report: The report object
+
+  :return: The Usage object
+  """
+  css = report._props.setdefault('css', {})
+  if 'usage' not in css:
+    css['usage'] = Usage()
+  return css['usage']
+
+
+def track(report, classnames, critical=None):
+  """
+  Register the classnames used by a component when it is rendered
+
+  Example
+  CssCritical.track(rptObj, [cssObj, 'py_cssdivnoborder'])
+
+  :param report: The report object
+  :param classnames: A classname, a CSS Python object or a list of them
+  :param critical: Optional. Flag to force the classname to be (or not to be) critical. Default the fold position
+  """
+  usage(report).add(classnames, critical)
+
+
+def fold(report):
+  """
+  Mark the position of the fold. The classnames registered after this call will not be critical
+
+  :param report: The report object
+  """
+  usage(report).aboveFold = False
+
+
+def classes(selector):
+  """
+  Return the classnames used in a CSS selector
+
+  Example
+  >>> sorted(classes(".py_cssbuttonbasic:hover, .py_a > .py_b"))
+  ['py_a', 'py_b', 'py_cssbuttonbasic']
+
+  :param selector: The CSS selector
+
+  :return: A set with the classnames
+  """
+  return set(_CLASS_REGEX.findall(selector))
+
+
+def isCritical(selector, classnames):
+  """
+  Check if a selector is needed for the first rendering.
+
+  A selector can only match an element if all its classnames are in the page. Selectors without any class (tags or ids)
+  are always critical
+
+  :param selector: The CSS selector
+  :param classnames: The set of critical classnames
+
+  :return: A boolean
+  """
+  for part in selector.split(","):
+    if classes(part) <= classnames:
+      return True
+
+  return False
+
+
+def split(styles, classnames):
+  """
+  Split the styles in the critical and deferred parts.
+
+  The deferred stylesheet is loaded after the critical styles, so a selector is only deferred if it does not share a
+  classname with a critical selector defined after it. Otherwise it would override this one and change the cascade
+
+  :param styles: A dictionary with the selectors and the CSS definitions
+  :param classnames: The set of critical classnames
+
+  :return: A tuple with two ordered dictionaries (critical, deferred)
+  """
+  selectors = list(styles)
+  flags = [isCritical(selector, classnames) for selector in selectors]
+  later = set()
+  for i in range(len(selectors) - 1, -1, -1):
+    if not flags[i] and classes(selectors[i]) & later:
+      flags[i] = True
+    if flags[i]:
+      later |= classes(selectors[i])
+  critical, deferred = collections.OrderedDict(), collections.OrderedDict()
+  for selector, flag in zip(selectors, flags):
+    if flag:
+      critical[selector] = styles[selector]
+    else:
+      deferred[selector] = styles[selector]
+  return critical, deferred
+
+
+def html(report, cssObjs, path=None, url=''):
+  """
+  Return the HTML fragment for the header of the report.
+
+  The critical styles are inlined and the other ones are written to a stylesheet loaded asynchronously (with a
+  noscript fallback). If no path is defined nothing is deferred, all the styles are inlined
+
+  :param report: The report object
+  :param cssObjs: A list of CSS Python objects used in the report
+  :param path: Optional. The folder for the deferred stylesheet. Default CssCache.CACHE_PATH
+  :param url: Optional. The url prefix of the stylesheet
+
+  :return: The HTML string
+  """
+  styles = collections.OrderedDict()
+  for cssObj in cssObjs:
+    styles.update(cssObj.getStyles())
+  if path is None and CssCache.CACHE_PATH is None:
+    # The deferred styles can only be loaded from a stylesheet
+    return '<style>%s</style>' % CssOptimizer.minify(styles) if styles else ''
+
+  critical, deferred = split(styles, usage(report).critical)
+  htmlParts = []
+  if critical:
+    htmlParts.append('<style>%s</style>' % CssOptimizer.minify(critical))
+  if deferred:
+    href = "%s%s" % (url, CssCache.CACHE.write(CssOptimizer.minify(deferred), path))
+    htmlParts.append('<link rel="preload" href="%s" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">' % href)
+    htmlParts.append('<noscript>%s</noscript>' % CssCache.link(href))
+  return "\n".join(htmlParts)
@@ -0,0 +1,369 @@
+"""
+Optimizer for the CSS produced by the CSS classes.
+
+It is working on the dictionaries returned by CssCls.getStyles() {selector: "{ attr: value; ... }"} and it will:
+  - remove the declarations overridden in the same block,
+  - collapse the margin, padding and border properties to their shorthands,
+  - group the selectors with identical blocks,
+  - minify the result.
+
+Selectors are only grouped when no block between them is defining one of their properties (or a shorthand / longhand
+of them, e.g. margin and margin-top), so the cascade is not changed.
+Vendor specific selectors (e.g. ::-webkit-scrollbar) are never grouped
+
+Documentation
+https://developer.mozilla.org/en-US/docs/Web/CSS/Shorthand_properties
+"""
+
+import re
+import collections
+
+
+# Shorthand properties and their longhands in the shorthand order
+SHORTHANDS = collections.OrderedDict([
+  ('margin', ('margin-top', 'margin-right', 'margin-bottom', 'margin-left')),
+  ('padding', ('padding-top', 'padding-right', 'padding-bottom', 'padding-left')),
+  ('border', ('border-width', 'border-style', 'border-color')),
+])
+
+# Properties set by the shorthands (only the direct ones, see expand)
+SUBPROPERTIES = {
+  'margin': ('margin-top', 'margin-right', 'margin-bottom', 'margin-left'),
+  'padding': ('padding-top', 'padding-right', 'padding-bottom', 'padding-left'),
+  'border': ('border-width', 'border-style', 'border-color', 'border-top', 'border-right', 'border-bottom',
+             'border-left', 'border-image'),
+  'border-width': ('border-top-width', 'border-right-width', 'border-bottom-width', 'border-left-width'),
+  'border-style': ('border-top-style', 'border-right-style', 'border-bottom-style', 'border-left-style'),
+  'border-color': ('border-top-color', 'border-right-color', 'border-bottom-color', 'border-left-color'),
+  'border-top': ('border-top-width', 'border-top-style', 'border-top-color'),
+  'border-right': ('border-right-width', 'border-right-style', 'border-right-color'),
+  'border-bottom': ('border-bottom-width', 'border-bottom-style', 'border-bottom-color'),
+  'border-left': ('border-left-width', 'border-left-style', 'border-left-color'),
+  'border-image': ('border-image-source', 'border-image-slice', 'border-image-width', 'border-image-outset',
+                   'border-image-repeat'),
+  'border-radius': ('border-top-left-radius', 'border-top-right-radius', 'border-bottom-right-radius',
+                    'border-bottom-left-radius'),
+  'outline': ('outline-width', 'outline-style', 'outline-color'),
+  'background': ('background-color', 'background-image', 'background-repeat', 'background-attachment',
+                 'background-position', 'background-size', 'background-origin', 'background-clip'),
+  'background-position': ('background-position-x', 'background-position-y'),
+  'font': ('font-style', 'font-variant', 'font-weight', 'font-stretch', 'font-size', 'line-height', 'font-family'),
+  'list-style': ('list-style-type', 'list-style-position', 'list-style-image'),
+  'text-decoration': ('text-decoration-line', 'text-decoration-style', 'text-decoration-color'),
+  'overflow': ('overflow-x', 'overflow-y'),
+  'flex': ('flex-grow', 'flex-shrink', 'flex-basis'),
+  'flex-flow': ('flex-direction', 'flex-wrap'),
+  'gap': ('row-gap', 'column-gap'),
+  'grid-gap': ('grid-row-gap', 'grid-column-gap'),
+  'columns': ('column-width', 'column-count'),
+  'column-rule': ('column-rule-width', 'column-rule-style', 'column-rule-color'),
+  'transition': ('transition-property', 'transition-duration', 'transition-timing-function', 'transition-delay'),
+  'animation': ('animation-name', 'animation-duration', 'animation-timing-function', 'animation-delay',
+                'animation-iteration-count', 'animation-direction', 'animation-fill-mode', 'animation-play-state'),
+  'inset': ('top', 'right', 'bottom', 'left'),
+  'place-items': ('align-items', 'justify-items'),
+  'place-content': ('align-content', 'justify-content'),
+  'place-self': ('align-self', 'justify-self'),
+}
+
+_EXPANDED = {}
+
+_IMPORTANT_REGEX = re.compile(r"\s*!\s*important\s*$", re.IGNORECASE)
+_HEX_REGEX = re.compile(r"#([0-9a-fA-F])\1([0-9a-fA-F])\2([0-9a-fA-F])\3\b")
+_ZERO_REGEX = re.compile(r"(?<![\w.#-])0(?:px|em|rem|pt)(?![\w%])")
+_VENDOR_REGEX = re.compile(r"(?:^|[\s(,])-(?:webkit|moz|ms|o)-")
+
+
+def split(definition):
+  """
+  Split a CSS block in declarations. The semi colons in quotes or in parenthesis (e.g url) are ignored
+
+  :param definition: The content of a CSS block
+
+  :return: The list of declarations
+  """
+  parts, current, quote, depth = [], [], None, 0
+  for char in definition:
+    if quote is not None:
+      if char == quote:
+        quote = None
+    elif char in "'\"":
+      quote = char
+    elif char == "(":
+      depth += 1
+    elif char == ")":
+      depth -= 1
+    elif char == ";" and depth == 0:
+      parts.append("".join(current))
+      current = []
+      continue
+
+    current.append(char)
+  parts.append("".join(current))
+  return parts
+
+
+def parse(definition):
+  """
+  Split a CSS block in declarations
+
+  Example
+  >>> parse("{ color: red; margin: 0 !IMPORTANT; }")
+  [('color', 'red', False), ('margin', '0', True)]
+
+  :param definition: The CSS block as produced by CssCls.toCss
+
+  :return: A list of tuples (property, value, important)
+  """
+  declarations = []
+  for declaration in split(definition.strip().lstrip("{").rstrip("}")):
+    if ":" not in declaration:
+      continue
+
+    attr, value = declaration.split(":", 1)
+    important = _IMPORTANT_REGEX.search(value) is not None
+    attr = attr.strip()
+    if not attr.startswith("--"):
+      # The custom properties are case sensitive
+      attr = attr.lower()
+    declarations.append((attr, _IMPORTANT_REGEX.sub("", value).strip(), important))
+  return declarations
+
+
+def tokens(value):
+  """
+  Split a CSS value on the spaces which are not in parenthesis
+
+  Example
+  >>> tokens("calc(100% - 2px) auto")
+  ['calc(100% - 2px)', 'auto']
+
+  :param value: The CSS value
+
+  :return: The list of tokens
+  """
+  parts, current, depth = [], [], 0
+  for char in value.strip():
+    if char == "(":
+      depth += 1
+    elif char == ")":
+      depth -= 1
+    elif char.isspace() and depth == 0:
+      if current:
+        parts.append("".join(current))
+        current = []
+      continue
+
+    current.append(char)
+  if current:
+    parts.append("".join(current))
+  return parts
+
+
+def minifyValue(value):
+  """
+  Minify a CSS value
+
+  Example
+  >>> minifyValue("1px solid #FFFFFF")
+  '1px solid #FFF'
+
+  :param value: The CSS value
+
+  :return: The minified value
+  """
+  value = " ".join(value.split())
+  # The units are only removed outside of the functions, calc(100% - 0px) is not valid without them
+  parts, start, depth = [], 0, 0
+  for i, char in enumerate(value):
+    if char == "(":
+      if depth == 0:
+        parts.append(_ZERO_REGEX.sub("0", value[start:i]))
+        start = i
+      depth += 1
+    elif char == ")" and depth > 0:
+      depth -= 1
+      if depth == 0:
+        parts.append(value[start:i + 1])
+        start = i + 1
+  parts.append(value[start:] if depth else _ZERO_REGEX.sub("0", value[start:]))
+  return _HEX_REGEX.sub(r"#\1\2\3", "".join(parts))
+
+
+def isFallback(previous, value):
+  """
+  Check if a declaration is a fallback for the next declaration of the same property.
+
+  This is the case when one of the values is vendor specific (e.g. display: -webkit-box; display: flex) or when the new
+  value is using a function (var, calc, gradients...) which might not be supported by the browser
+
+  :param previous: The value of the first declaration
+  :param value: The value of the next declaration
+
+  :return: A boolean
+  """
+  if _VENDOR_REGEX.search(previous) or _VENDOR_REGEX.search(value):
+    return previous != value
+
+  return "(" in value and value != previous
+
+
+def removeOverridden(declarations):
+  """
+  Remove the declarations which are overridden later in the same block.
+  An important declaration is only overridden by another important one. The fallbacks are kept (see isFallback)
+
+  :param declarations: A list of tuples (property, value, important)
+
+  :return: The list of the active declarations
+  """
+  active = []
+  for attr, value, important in declarations:
+    previous = [declaration for declaration in active if declaration[0] == attr]
+    if previous and previous[-1][2] and not important:
+      continue
+
+    if not previous or not isFallback(previous[-1][1], value):
+      active = [declaration for declaration in active if declaration[0] != attr]
+    if attr in SHORTHANDS:
+      # The shorthand is resetting all its longhands defined before
+      active = [declaration for declaration in active
+                if declaration[0] not in SHORTHANDS[attr] or (declaration[2] and not important)]
+    active.append((attr, value, important))
+  return active
+
+
+def collapse(declarations):
+  """
+  Replace the longhand properties by their shorthand when all of them are defined once, with a single value and with
+  the same priority
+
+  Example
+  >>> collapse([('margin-top', '0', False), ('margin-right', '2px', False), ('margin-bottom', '0', False), ('margin-left', '2px', False)])
+  [('margin', '0 2px', False)]
+
+  :param declarations: A list of tuples (property, value, important)
+
+  :return: The new list of declarations
+  """
+  attrs = dict((attr, (value, important)) for attr, value, important in declarations)
+  counts = collections.Counter(attr for attr, _, _ in declarations)
+  replaced = {}
+  for shorthand, longhands in SHORTHANDS.items():
+    if not all(counts[longhand] == 1 and len(tokens(attrs[longhand][0])) == 1 for longhand in longhands):
+      # Missing longhands, fallbacks or values with several tokens (e.g. border-width: 1px 2px)
+      continue
+
+    if len(set(attrs[longhand][1] for longhand in longhands)) > 1 or shorthand in attrs:
+      continue
+
+    values = [attrs[longhand][0] for longhand in longhands]
+    if shorthand != 'border':
+      if values[1] == values[3]:
+        values.pop()
+        if values[0] == values[2]:
+          values.pop()
+          if values[0] == values[1]:
+            values.pop()
+    replaced[longhands[0]] = (shorthand, " ".join(values), attrs[longhands[0]][1])
+    for longhand in longhands[1:]:
+      replaced[longhand] = None
+  if not replaced:
+    return declarations
+
+  results = []
+  for declaration in declarations:
+    if declaration[0] not in replaced:
+      results.append(declaration)
+    elif replaced[declaration[0]] is not None:
+      results.append(replaced[declaration[0]])
+  return results
+
+
+def expand(attr):
+  """
+  Return all the properties set by a declaration: the property itself and all the longhands it covers
+
+  Example
+  >>> sorted(expand('border-top'))
+  ['border-top', 'border-top-color', 'border-top-style', 'border-top-width']
+
+  :param attr: The CSS property
+
+  :return: A frozenset of properties
+  """
+  expanded = _EXPANDED.get(attr)
+  if expanded is None:
+    expanded = set([attr])
+    for subAttr in SUBPROPERTIES.get(attr, ()):
+      expanded.update(expand(subAttr))
+    expanded = _EXPANDED[attr] = frozenset(expanded)
+  return expanded
+
+
+def toBlock(declarations):
+  """
+  Convert a list of declarations to a minified CSS block
+
+  :param declarations: A list of tuples (property, value, important)
+
+  :return: The CSS block
+  """
+  return "{%s}" % ";".join(["%s:%s%s" % (attr, minifyValue(value), "!important" if important else "")
+                            for attr, value, important in declarations])
+
+
+def optimize(styles):
+  """
+  Optimize the CSS produced by one or several CSS classes
+
+  Example
+  CssOptimizer.optimize(CssStyle.getCssObj('CssButtonBasic').getStyles())
+
+  :param styles: A dictionary with the selectors and the CSS definitions
+
+  :return: A new ordered dictionary with the grouped selectors and the minified CSS blocks
+  """
+  rules = []
+  for selector, definition in styles.items():
+    declarations = collapse(removeOverridden(parse(definition)))
+    if declarations:
+      attrs = set()
+      for attr, _, _ in declarations:
+        attrs.update(expand(attr))
+      rules.append((selector.strip(), toBlock(declarations), attrs))
+
+  groups = []
+  for selector, block, attrs in rules:
+    if ":-" in selector:
+      # Vendor specific selectors are not grouped as an unknown selector would invalidate the full rule
+      groups.append(([selector], block, attrs))
+      continue
+
+    for group in reversed(groups):
+      if group[1] == block and ":-" not in group[0][0]:
+        group[0].append(selector)
+        break
+
+      if group[2] & attrs or 'all' in group[2] or 'all' in attrs:
+        # A block in between is defining the same properties (or their longhands). The order must be kept
+        groups.append(([selector], block, attrs))
+        break
+
+    else:
+      groups.append(([selector], block, attrs))
+  return collections.OrderedDict((",".join(selectors), block) for selectors, block, _ in groups)
+
+
+def minify(styles):
+  """
+  Return the optimized and minified CSS text
+
+  Example
+  CssOptimizer.minify(CssStyle.getCssObj('CssButtonBasic').getStyles())
+
+  :param styles: A dictionary with the selectors and the CSS definitions
+
+  :return: The CSS text
+  """
+  return "".join(["%s%s" % (selector, block) for selector, block in optimize(styles).items()])
@@ -0,0 +1,321 @@
+"""
+Module in charge of the resolved colors of the themes.
+
+A palette is built only once per theme and then shared by all the CSS classes (and all the threads).
+This will avoid the creation of a ColorMaker object for each color lookup in the customize() methods.
+
+The overrides defined in the CSS classes (the colors parameter) are applied with a light overlay on top of the
+shared palette.
+
+With the VARIABLES theme the colors are resolved to CSS custom properties (e.g. var(--epyk-colors-3)). The stylesheet
+is then the same for all the themes and the themes are compiled to small blocks of variables. Changing the theme is
+only changing a class on the page
+
+Example
+  Palette.useVariables(rptObj)
+  header = "<style>%s</style>" % Palette.themesCss(ThemeBlue.ThemeBlue, [ThemeDark.ThemeDark])
+"""
+
+import threading
+
+from epyk.core.css import Color
+
+
+# The palettes shared by all the CSS classes. Key is the theme
+_PALETTES, _LOCK = {}, threading.Lock()
+
+# Theme used to resolve the colors to CSS variables
+VARIABLES = "variables"
+
+# Color categories compiled to CSS variables
+CATEGORIES = ('colors', 'greys', 'warning', 'danger', 'success')
+
+# Number of negative indices (from the end of the category) also defined as variables
+NEGATIVE_VARIABLES = 2
+
+
+class Palette(object):
+  """
+  Resolved colors of a theme.
+
+  The colors of a category are only retrieved once from the ColorMaker and then stored in a tuple.
+  Positive and negative indices are resolved directly with the tuple index
+  """
+  __slots__ = ('theme', '_maker', '_colors')
+
+  def __init__(self, maker, theme=None):
+    self.theme, self._maker, self._colors = theme, maker, {}
+
+  def colors(self, name):
+    """
+    Return all the colors of a category
+
+    Example
+    Palette.get(ThemeDark.ThemeDark).colors('greys')
+
+    :param name: The color category (charts, colors, greys, warning, danger, success)
+
+    :return: A tuple with the hexadecimal color codes
+    """
+    try:
+      return self._colors[name]
+
+    except KeyError:
+      colors = self._colors[name] = tuple(self._maker.get(name))
+      return colors
+
+  def get(self, name, index=None):
+    """
+    Return the hexadecimal color code
+
+    Example
+    Palette.get(ThemeDark.ThemeDark).get('greys', -1)
+
+    :param name: The color category
+    :param index: Optional. The color index in the category. Default all the colors of the category
+
+    :return: The hexadecimal color code
+    """
+    if index is None:
+      return self.colors(name)
+
+    return self.colors(name)[index]
+
+  def overlay(self, overrides):
+    """
+    Return the palette with some colors overridden
+
+    Example
+    Palette.get().overlay({'colors': {9: 'orange'}})
+
+    :param overrides: A dictionary of dictionaries with the colors to override per category and index
+
+    :return: A PaletteOverlay or the palette itself if there is nothing to override
+    """
+    if not overrides:
+      return self
+
+    return PaletteOverlay(self, overrides)
+
+
+class PaletteOverlay(object):
+  """
+  Colors overridden on top of a shared palette.
+
+  The overrides are defined by index and they are also reachable from the opposite index, namely for a category with
+  10 colors, the override for the index 9 is also used for the index -2 (and -1 for the index 10)
+  """
+  __slots__ = ('palette', '_overrides')
+
+  def __init__(self, palette, overrides):
+    self.palette, self._overrides = palette, {}
+    for name, colors in overrides.items():
+      count = len(palette.colors(name))
+      indices = dict(colors)
+      for index, color in colors.items():
+        if index > 0:
+          indices.setdefault(index - count - 1, color)
+        elif index < 0:
+          indices.setdefault(count + index + 1, color)
+      self._overrides[name] = indices
+
+  def colors(self, name):
+    return self.palette.colors(name)
+
+  def get(self, name, index=None):
+    if index and name in self._overrides and index in self._overrides[name]:
+      return self._overrides[name][index]
+
+    return self.palette.get(name, index)
+
+  def overlay(self, overrides):
+    return self.palette.overlay(overrides)
+
+
+class VariablesPalette(object):
+  """
+  Palette returning CSS variables instead of the colors.
+
+  The negative indices are resolved to dedicated variables (e.g. --epyk-greys-n1) as the themes do not all have the
+  same number of colors. Beyond NEGATIVE_VARIABLES they are resolved with the length of the base theme
+  """
+  __slots__ = ('theme', 'base')
+
+  def __init__(self, base):
+    self.theme, self.base = VARIABLES, base
+
+  def colors(self, name):
+    return tuple(self.get(name, i) for i in range(len(self.base.colors(name))))
+
+  def get(self, name, index=None):
+    if index is None:
+      return self.colors(name)
+
+    if -NEGATIVE_VARIABLES <= index < 0:
+      return "var(--epyk-%s-n%s)" % (name, -index)
+
+    if index < 0:
+      index += len(self.base.colors(name))
+    return "var(--epyk-%s-%s)" % (name, index)
+
+  def overlay(self, overrides):
+    if not overrides:
+      return self
+
+    return PaletteOverlay(self, overrides)
+
+
+def themeClass(theme):
+  """
+  Return the CSS class used to activate a theme on the page
+
+  Example
+  >>> themeClass(type('ThemeLightBlue', (object, ), {'name': 'light blue'}))
+  'epyk-theme-light-blue'
+
+  :param theme: The theme class
+
+  :return: The CSS class name
+  """
+  return "epyk-theme-%s" % "-".join(getattr(theme, 'name', theme.__name__).lower().split())
+
+
+def variables(theme, selector=None):
+  """
+  Compile a theme to a block of CSS variables
+
+  Example
+  Palette.variables(ThemeDark.ThemeDark, ':root')
+
+  :param theme: The theme class
+  :param selector: Optional. The CSS selector of the block. Default the theme class
+
+  :return: The CSS text
+  """
+  palette, declarations = get(theme), []
+  for name in CATEGORIES:
+    colors = palette.colors(name)
+    for i, color in enumerate(colors):
+      declarations.append("--epyk-%s-%s:%s" % (name, i, color))
+    for i in range(1, min(NEGATIVE_VARIABLES, len(colors)) + 1):
+      declarations.append("--epyk-%s-n%s:%s" % (name, i, colors[-i]))
+  return "%s{%s}" % (selector or ".%s" % themeClass(theme), ";".join(declarations))
+
+
+def themesCss(default, themes=None):
+  """
+  Compile the default theme to the :root variables and the other themes to classes
+
+  Example
+  Palette.themesCss(ThemeBlue.ThemeBlue, [ThemeDark.ThemeDark, ThemeRed.ThemeRed])
+
+  :param default: The default theme class
+  :param themes: Optional. The other themes available on the page
+
+  :return: The CSS text
+  """
+  blocks = [variables(default, ':root')]
+  for theme in themes or []:
+    blocks.append(variables(theme))
+  return "\n".join(blocks)
+
+
+def switchTheme(theme, themes):
+  """
+  Return the Javascript fragment to change the theme of the page
+
+  :param theme: The theme class to activate (or None for the default one)
+  :param themes: The themes available on the page
+
+  :return: The Javascript String
+  """
+  return "var classes = document.documentElement.classList; %s; %s" % (
+    ";".join(["classes.remove('%s')" % themeClass(t) for t in themes]),
+    "classes.add('%s')" % themeClass(theme) if theme is not None else "")
+
+
+def useTheme(report, theme):
+  """
+  Define the theme of the report CSS classes
+
+  Example
+  Palette.useTheme(rptObj, ThemeDark.ThemeDark)
+
+  :param report: The report object
+  :param theme: The theme class (or VARIABLES). None for the default theme
+  """
+  css = report._props.setdefault('css', {})
+  if theme is None:
+    css.pop('theme', None)
+  else:
+    css['theme'] = theme
+
+
+def useVariables(report, flag=True):
+  """
+  Resolve the colors of the report CSS classes to CSS variables
+
+  :param report: The report object
+  :param flag: Optional. Flag to activate or deactivate the variables. Default True
+  """
+  if flag:
+    useTheme(report, VARIABLES)
+  elif reportTheme(report) == VARIABLES:
+    useTheme(report, None)
+
+
+def reportTheme(report):
+  """
+  Return the theme of a report
+
+  :param report: The report object
+
+  :return: The theme class, VARIABLES or None for the default theme
+  """
+  props = getattr(report, '_props', None)
+  if props is None:
+    return None
+
+  return props.get('css', {}).get('theme')
+
+
+def get(theme=None, report=None):
+  """
+  Return the shared palette of a theme.
+
+  When the theme is not defined the theme of the report is used. There is one palette per theme, the reports are
+  sharing them
+
+  Example
+  Palette.get(ThemeBlue.ThemeBlue)
+
+  :param theme: Optional. The theme
+  :param report: Optional. The report object
+
+  :return: The Palette object
+  """
+  if theme is None and report is not None:
+    theme = reportTheme(report)
+
+  palette = _PALETTES.get(theme)
+  if palette is None:
+    base = get() if theme == VARIABLES else None
+    with _LOCK:
+      palette = _PALETTES.get(theme)
+      if palette is None:
+        if base is not None:
+          palette = VariablesPalette(base)
+        else:
+          # No report in the shared palettes, they should not keep a reference to a given report
+          maker = Color.ColorMaker(None, theme=theme) if theme is not None else Color.ColorMaker(None)
+          palette = Palette(maker, theme)
+        _PALETTES[theme] = palette
+  return palette
+
+
+def reset():
+  """
+  Remove all the shared palettes. This should be used if a theme definition is changed at run time
+  """
+  with _LOCK:
+    _PALETTES.clear()
@@ -0,0 +1,274 @@
+"""
+Registry of the CSS classes defined in the styles modules.
+
+This registry is used by the CSS factory to find the module of a class without having to import all the style modules.
+The CLASSES dictionary is generated, it should be refreshed when a CSS class is added, renamed or moved:
+
+  python -m epyk.core.css.styles.CssRegistry
+"""
+
+import os
+import ast
+
+
+# Generated by build() - mapping class name -> module name
+CLASSES = {
+  'CssBasicList': 'CssStylesList',
+  'CssBasicListItems': 'CssStylesList',
+  'CssBasicListItemsDisabled': 'CssStylesList',
+  'CssBasicListItemsSelected': 'CssStylesList',
+  'CssBigIcon': 'CssStylesIcon',
+  'CssBillboardAxis': 'CssStylesChart',
+  'CssBillboardLegend': 'CssStylesChart',
+  'CssBillboardTitle': 'CssStylesChart',
+  'CssBillboardXAxis': 'CssStylesChart',
+  'CssBillboardYAxis': 'CssStylesChart',
+  'CssBody': 'CssStylesCommon',
+  'CssBodyContent': 'CssStylesCommon',
+  'CssBodyLoading': 'CssStylesCommon',
+  'CssBodyLoadingBack': 'CssStylesCommon',
+  'CssBorderTab': 'CssStylesTabs',
+  'CssBorderTabSelected': 'CssStylesTabs',
+  'CssButtonBasic': 'CssStylesButton',
+  'CssButtonReset': 'CssStylesButton',
+  'CssButtonSuccess': 'CssStylesButton',
+  'CssC3Axis': 'CssStylesChart',
+  'CssC3Legend': 'CssStylesChart',
+  'CssC3Title': 'CssStylesChart',
+  'CssC3XAxis': 'CssStylesChart',
+  'CssC3YAxis': 'CssStylesChart',
+  'CssCarrouselH2': 'CssStylesImg',
+  'CssCarrouselLabel': 'CssStylesImg',
+  'CssCarrouselLi': 'CssStylesImg',
+  'CssCellComment': 'CssStylesTable',
+  'CssCellSave': 'CssStylesTable',
+  'CssCheckMark': 'CssStylesText',
+  'CssCommHeader': 'CssStylesDivComms',
+  'CssCommInput': 'CssStylesDivComms',
+  'CssContent': 'CssStylesImg',
+  'CssDataTable': 'CssStylesTable',
+  'CssDataTableEven': 'CssStylesTable',
+  'CssDataTableFooter': 'CssStylesTable',
+  'CssDataTableHeader': 'CssStylesTable',
+  'CssDataTableOdd': 'CssStylesTable',
+  'CssDatePicker': 'CssStylesDates',
+  'CssDatePickerUI': 'CssStylesDates',
+  'CssDatesTimePicker': 'CssStylesDates',
+  'CssDefaultTab': 'CssStylesTabs',
+  'CssDefaultTabSelected': 'CssStylesTabs',
+  'CssDivBanner': 'CssStylesDiv',
+  'CssDivBorder': 'CssStylesDiv',
+  'CssDivBottomBorder': 'CssStylesDiv',
+  'CssDivBox': 'CssStylesDiv',
+  'CssDivBoxCenter': 'CssStylesDiv',
+  'CssDivBoxWithDotBorder': 'CssStylesDiv',
+  'CssDivBubble': 'CssStylesDiv',
+  'CssDivChart': 'CssStylesChart',
+  'CssDivCommBubble': 'CssStylesDiv',
+  'CssDivComms': 'CssStylesDiv',
+  'CssDivConsole': 'CssStylesDiv',
+  'CssDivCursor': 'CssStylesDiv',
+  'CssDivEditor': 'CssStylesDiv',
+  'CssDivFilter': 'CssStylesDiv',
+  'CssDivFilterItems': 'CssStylesDiv',
+  'CssDivHidden': 'CssStylesDiv',
+  'CssDivLabelPoint': 'CssStylesDiv',
+  'CssDivLeft': 'CssStylesDiv',
+  'CssDivLoading': 'CssStylesDiv',
+  'CssDivNoBorder': 'CssStylesDiv',
+  'CssDivPagination': 'CssStylesDiv',
+  'CssDivRight': 'CssStylesDiv',
+  'CssDivRow': 'CssStylesDiv',
+  'CssDivShadow': 'CssStylesDiv',
+  'CssDivSubBanner': 'CssStylesDiv',
+  'CssDivTableContent': 'CssStylesDiv',
+  'CssDivTextLeft': 'CssStylesDiv',
+  'CssDivWhitePage': 'CssStylesDiv',
+  'CssDivWithBorder': 'CssStylesDiv',
+  'CssDropDownAfterMenu': 'CssStyleDropdown',
+  'CssDropDownMenu': 'CssStyleDropdown',
+  'CssDropDownMenuAAfter': 'CssStyleDropdown',
+  'CssDropDownMenuHoverAAfter': 'CssStyleDropdown',
+  'CssDropDownSubMenu': 'CssStyleDropdown',
+  'CssDropDownSubMenuPullLeft': 'CssStyleDropdown',
+  'CssDropDownSubMenuPullLeftMenu': 'CssStyleDropdown',
+  'CssDropFile': 'CssStylesDrop',
+  'CssEventLoading': 'CssStylesPopup',
+  'CssFeedbackLink': 'CssStylesHref',
+  'CssHr': 'CssStylesHr',
+  'CssHrefContentLevel1': 'CssStylesHref',
+  'CssHrefContentLevel2': 'CssStylesHref',
+  'CssHrefContentLevel3': 'CssStylesHref',
+  'CssHrefContentLevel4': 'CssStylesHref',
+  'CssHrefNoDecoration': 'CssStylesHref',
+  'CssHrefSubMenu': 'CssStylesHref',
+  'CssHreftMenu': 'CssStylesHref',
+  'CssIcon': 'CssStylesIcon',
+  'CssImg': 'CssStylesImg',
+  'CssImgAInfo': 'CssStylesImg',
+  'CssImgBasic': 'CssStylesImg',
+  'CssImgH2': 'CssStylesImg',
+  'CssImgMask': 'CssStylesImg',
+  'CssImgParagraph': 'CssStylesImg',
+  'CssInput': 'CssStylesInput',
+  'CssInputInt': 'CssStylesInput',
+  'CssInputInteger': 'CssStylesInput',
+  'CssInputLabel': 'CssStylesInput',
+  'CssInputRange': 'CssStylesInput',
+  'CssInputRangeThumb': 'CssStylesInput',
+  'CssInputText': 'CssStylesInput',
+  'CssInputTextArea': 'CssStylesInput',
+  'CssLabelCheckMarkHover': 'CssStylesLabel',
+  'CssLabelContainer': 'CssStylesLabel',
+  'CssLabelContainerDisabled': 'CssStylesLabel',
+  'CssLabelDates': 'CssStylesHref',
+  'CssListBase': 'CssStylesList',
+  'CssListLiBase': 'CssStylesList',
+  'CssListLiSubItem': 'CssStylesList',
+  'CssListLiUlContainer': 'CssStylesList',
+  'CssListNoDecoration': 'CssStylesList',
+  'CssMarkBlue': 'CssStylesText',
+  'CssMarkRed': 'CssStylesText',
+  'CssNVD3Axis': 'CssStylesChart',
+  'CssNVD3AxisLabel': 'CssStylesChart',
+  'CssNVD3AxisLegend': 'CssStylesChart',
+  'CssNVD3HideGrid': 'CssStylesChart',
+  'CssNumberCenter': 'CssStylesText',
+  'CssOutIcon': 'CssStylesIcon',
+  'CssPanelTitle': 'CssStylesDiv',
+  'CssParamsBar': 'CssStylesDivMenuBars',
+  'CssPivotAxis': 'CssStylesPivot',
+  'CssPivotCells': 'CssStylesPivot',
+  'CssPivotFilterBox': 'CssStylesPivot',
+  'CssPivotFilterBoxPopUp': 'CssStylesPivot',
+  'CssPivotFilterVals': 'CssStylesPivot',
+  'CssPivotHead': 'CssStylesPivot',
+  'CssPopupTable': 'CssStylesPopup',
+  'CssPopupTableTitle': 'CssStylesPopup',
+  'CssPopupTableTitleContent': 'CssStylesPopup',
+  'CssRadioButton': 'CssStylesRadio',
+  'CssRadioButtonSelected': 'CssStylesRadio',
+  'CssRadioSwitch': 'CssStylesRadio',
+  'CssRadioSwitchChecked': 'CssStylesRadio',
+  'CssRadioSwitchLabel': 'CssStylesRadio',
+  'CssSearch': 'CssStylesSearch',
+  'CssSearchButton': 'CssStylesSearch',
+  'CssSearchExt': 'CssStylesSearch',
+  'CssSelectButton': 'CssStylesSelect',
+  'CssSelectFilterOption': 'CssStylesSelect',
+  'CssSelectOption': 'CssStylesSelect',
+  'CssSelectOptionActive': 'CssStylesSelect',
+  'CssSelectOptionHover': 'CssStylesSelect',
+  'CssSelectStyle': 'CssStylesSelect',
+  'CssSideBar': 'CssStylesDivMenuBars',
+  'CssSideBarBubble': 'CssStylesDivMenuBars',
+  'CssSideBarFixed': 'CssStylesDivMenuBars',
+  'CssSideBarLi': 'CssStylesDivMenuBars',
+  'CssSideBarLiHref': 'CssStylesDivMenuBars',
+  'CssSideBarLinks': 'CssStylesHref',
+  'CssSideBarMenu': 'CssStylesDivMenuBars',
+  'CssSmallIcon': 'CssStylesIcon',
+  'CssSmallIconRed': 'CssStylesIcon',
+  'CssSmallIconRigth': 'CssStylesIcon',
+  'CssSparklines': 'CssStylesChart',
+  'CssSquareList': 'CssStylesList',
+  'CssStandardLinks': 'CssStylesHref',
+  'CssStdIcon': 'CssStylesIcon',
+  'CssTableBackGroundRedCells': 'CssStylesTableExcel',
+  'CssTableBasic': 'CssStylesTable',
+  'CssTableColumnFixed': 'CssStylesTable',
+  'CssTableColumnSystem': 'CssStylesTable',
+  'CssTableExcel': 'CssStylesTableExcel',
+  'CssTableExcelCell': 'CssStylesTableExcel',
+  'CssTableExcelHeaderCell': 'CssStylesTableExcel',
+  'CssTableExcelSelected': 'CssStylesTableExcel',
+  'CssTableExcelSelectedRow': 'CssStylesTableExcel',
+  'CssTableExcelTd': 'CssStylesTableExcel',
+  'CssTableExcelTitle': 'CssStylesTableExcel',
+  'CssTableNewRow': 'CssStylesTable',
+  'CssTableRedCells': 'CssStylesTableExcel',
+  'CssTableSelected': 'CssStylesTable',
+  'CssTabulator': 'CssStylesTabulator',
+  'CssTabulatorCell': 'CssStylesTabulator',
+  'CssTabulatorCol': 'CssStylesTabulator',
+  'CssTabulatorColContent': 'CssStylesTabulator',
+  'CssTabulatorEvenRow': 'CssStylesTabulator',
+  'CssTabulatorFooter': 'CssStylesTabulator',
+  'CssTabulatorFooterPagination': 'CssStylesTabulator',
+  'CssTabulatorGroups': 'CssStylesTabulator',
+  'CssTabulatorHeader': 'CssStylesTabulator',
+  'CssTabulatorHeaders': 'CssStylesTabulator',
+  'CssTabulatorOddRow': 'CssStylesTabulator',
+  'CssTabulatorRow': 'CssStylesTabulator',
+  'CssTabulatorSelected': 'CssStylesTabulator',
+  'CssTabulatorTreeControl': 'CssStylesTabulator',
+  'CssTabulatorTreeControlExpand': 'CssStylesTabulator',
+  'CssTdDetails': 'CssStylesTable',
+  'CssTdDetailsShown': 'CssStylesTable',
+  'CssTdEditor': 'CssStylesTable',
+  'CssText': 'CssStylesText',
+  'CssTextBold': 'CssStylesText',
+  'CssTextItem': 'CssStylesText',
+  'CssTextSelection': 'CssStylesCommon',
+  'CssTextWithBorder': 'CssStylesText',
+  'CssTitle': 'CssStylesText',
+  'CssTitle1': 'CssStylesText',
+  'CssTitle2': 'CssStylesText',
+  'CssTitle3': 'CssStylesText',
+  'CssTitle4': 'CssStylesText',
+  'CssView': 'CssStylesImg',
+  'CsssDivBoxMargin': 'CssStylesDiv',
+}
+
+
+def scan(path=None):
+  """
+  Parse the styles modules to find the CSS classes. The modules are not imported
+
+  Example
+  CssRegistry.scan()
+
+  :param path: Optional. The folder with the styles modules. Default the folder of this module
+
+  :return: A dictionary with the class name and the module name
+  """
+  path = path or os.path.dirname(os.path.abspath(__file__))
+  classes = {}
+  for pyFile in sorted(os.listdir(path)):
+    if not pyFile.endswith(".py") or pyFile in ('__init__.py', 'CssStyle.py', 'CssRegistry.py'):
+      continue
+
+    with open(os.path.join(path, pyFile)) as f:
+      tree = ast.parse(f.read(), pyFile)
+    for node in tree.body:
+      if isinstance(node, ast.ClassDef) and node.name.startswith("Css"):
+        classes.setdefault(node.name, pyFile[:-3])
+  return classes
+
+
+def build(path=None):
+  """
+  Refresh the CLASSES dictionary in this module
+
+  Example
+  CssRegistry.build()
+
+  :param path: Optional. The folder with the styles modules. Default the folder of this module
+
+  :return: The new registry
+  """
+  classes = scan(path)
+  registryFile = os.path.abspath(__file__).replace(".pyc", ".py")
+  with open(registryFile) as f:
+    content = f.read()
+  start = content.index("CLASSES = {")
+  end = content.index("\n}\n", start) + 3
+  lines = ["  %r: %r," % (name, classes[name]) for name in sorted(classes)]
+  content = "%sCLASSES = {\n%s\n}\n%s" % (content[:start], "\n".join(lines), content[end:])
+  with open(registryFile, "w") as f:
+    f.write(content)
+  return classes
+
+
+if __name__ == "__main__":
+  build()
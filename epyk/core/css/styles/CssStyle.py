@@ -2,17 +2,37 @@
 Base class for the CSS Style modules
 """
 
-import os
-import sys
+import types
 import logging
-import inspect
 import importlib
+import threading
+import collections.abc
 
 from epyk.core.css import Color
+from epyk.core.css import Palette
+from epyk.core.css import CssCache
+from epyk.core.css import CssCritical
+from epyk.core.css.styles import CssRegistry
 
-# The CSS module factory in charge of storing all the available styles in the framework
+# The CSS module factory in charge of storing all the available styles in the framework.
+# This is a read only snapshot which is replaced (and never changed) when a class is overridden
 factory = None
 
+# The CSS Python classes already imported from the style modules
+_resolved = {}
+
+# Lock only used by the writers of the factory. The readers are always using the current snapshot
+_LOCK = threading.Lock()
+
+# The overlays of the renders running in the current thread
+_local = threading.local()
+
+# The CSS objects already built. The components are getting a light copy of them (see CssCls.share)
+instances = CssCache.StylesCache(CssCache.MAX_SIZE)
+
+# The classes created by CssCls.clone
+_clones = {}
+
 
 def cssName(cssRef):
   """
@@ -38,39 +58,105 @@ def load(reset=False):
   """
   CSS Factory
 
-  Load the factory with the all the different CSS classes defined in the framework
+  Load the factory with the all the different CSS classes defined in the framework.
+  The factory is built from the CssRegistry and the style modules are only imported when a class is requested.
+
+  The factory is a read only snapshot replaced in one assignment, so the renders running in other threads will
+  either see the previous or the new factory but never a partial one
 
   :param reset: Boolean to force the factory to be reloaded
   :return: The CSS factory
   """
   global factory
 
-  if factory is None or reset:
-    path = os.path.abspath(__file__)
-    dirPath = os.path.dirname(path)
-    sys.path.append(dirPath)
-    tmpFactory = {}
-    for pyFile in os.listdir(dirPath):
-      if pyFile == 'CssStyle.py':
-        continue
+  snapshot = factory
+  if snapshot is None or reset:
+    with _LOCK:
+      if factory is None or reset:
+        tmpFactory = {}
+        for clsName, module in CssRegistry.CLASSES.items():
+          tmpFactory[clsName] = types.MappingProxyType({'module': module, 'file': "%s.py" % module})
+        factory = types.MappingProxyType(tmpFactory)
+        _resolved.clear()
+        instances.invalidate()
+        CssCache.CACHE.invalidate()
+      snapshot = factory
+  return snapshot
+
+
+class overlay(object):
+  """
+  CSS Factory
+
+  Overrides of the factory only visible in the current thread.
+
+  The calls to setCssObj done inside the with statement are stored in the overlay and they are discarded at the end
+  of the render. The overlays can be nested, the last one has the priority
+
+  Example
+  with CssStyle.overlay():
+    CssStyle.setCssObj('CssButtonBasic', cssObj, rptObj)
+    html = rptObj.outs.html()
+  """
+
+  def __init__(self, overrides=None):
+    self.objects = dict(overrides or {})
+
+  def __enter__(self):
+    if not hasattr(_local, 'stack'):
+      _local.stack = []
+    _local.stack.append(self)
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    _local.stack.remove(self)
+
 
-      if pyFile.endswith(".py") and pyFile != '__init__.py':
-        try:
-          pyMod = importlib.import_module("epyk.core.css.styles.%s" % pyFile.replace(".py", ""))
-          for name in dir(pyMod):
-            clssName = getattr(pyMod, name)
-            if inspect.isclass(clssName):
-              if clssName.__name__.startswith("Css"):
-                tmpFactory[str(name)] = {'class': clssName, 'file': pyFile}
-        except Exception as e:
-          # unexpected issue in the factor (A new class might be wrong)
-          logging.warning(e)
-
-    # TODO: Think about a better implementation
-    # Atomic action to update the factor
-    # the above if statement should remain very quick as it might be a source of synchronisation issues in the future
-    factory = tmpFactory
-  return factory
+def getEntry(clsName):
+  """
+  CSS Factory
+
+  Return the factory entry for a class name. The overlays of the current thread are checked first
+
+  :param clsName: The CSS Python class Name
+  :return: A read only dictionary with the module or the object, or None
+  """
+  for layer in reversed(getattr(_local, 'stack', ())):
+    if clsName in layer.objects:
+      return {'object': layer.objects[clsName]}
+
+  return load().get(clsName)
+
+
+def getCssCls(clsName):
+  """
+  CSS Factory
+
+  Return the CSS Python class from the factory. The style module is imported the first time one of its class is requested
+
+  Example:
+    - getCssCls('CssButtonBasic')
+
+  :param clsName: The CSS Python class Name
+  :return: The CSS Python class or None
+  """
+  cls = _resolved.get(clsName)
+  if cls is not None:
+    return cls
+
+  entry = load().get(clsName)
+  if entry is None or 'module' not in entry:
+    return None
+
+  try:
+    pyMod = importlib.import_module("epyk.core.css.styles.%s" % entry['module'])
+    cls = _resolved[clsName] = getattr(pyMod, clsName)
+  except Exception as e:
+    # unexpected issue in the factor (A new class might be wrong or the registry might be outdated)
+    logging.warning(e)
+    return None
+
+  return cls
 
 
 def getCssObj(clsName, context=None, colors=None, theme=None):
@@ -86,15 +172,27 @@ def getCssObj(clsName, context=None, colors=None, theme=None):
   :param colors: The color rules to be overridden
   :return: The CSS Python object
   """
-  global factory
-
-  load()
-  cls = factory.get(clsName)
-  if cls is not None:
-    if 'class' in cls:
-      return cls['class'](context, colors=colors, theme=theme)
-    if 'object' in cls:
-      return cls['object']
+  entry = getEntry(clsName)
+  if entry is not None:
+    if 'object' in entry:
+      return entry['object']
+
+    cssCls = getCssCls(clsName)
+    if cssCls is not None:
+      # The CSS object only depends on the class, the theme (or the report theme) and the colors overrides
+      themeRef = CssCache.themeKey(theme if theme is not None else Palette.reportTheme(context))
+      cacheKey = (clsName, themeRef, CssCache.colorsKey(colors))
+      cssObj = instances.get(cacheKey)
+      if cssObj is None:
+        # The shared object is built without the report, it should not keep a reference to the first one
+        cssObj = cssCls(None, colors=colors, theme=theme if theme is not None else Palette.reportTheme(context))
+        cssObj._cacheKey = cacheKey
+        cssObj._freeze()
+        instances.set(cacheKey, cssObj)
+      if getattr(context, '_props', None) is not None:
+        # The classnames used by the report are needed to split the critical CSS
+        CssCritical.track(context, cssObj)
+      return cssObj.share(context)
 
   return None
 
@@ -107,7 +205,10 @@ def setCssObj(clsName, cssAttrs, context, theme=None, forceReload=False):
   This will also provide some options in order to override the object attributes.
 
   All the different overrides should be done according to the CSS official definition.
-  Indeed this will be directly converted to CSS and added to the result page
+  Indeed this will be directly converted to CSS and added to the result page.
+
+  Inside an overlay the override is only visible by the current render. Otherwise a new factory is created with the
+  override (copy on write)
 
   :param clsName: The CSS classname as a string
   :param cssAttrs: A Python dictionary with all the CSS attributes
@@ -116,12 +217,75 @@ def setCssObj(clsName, cssAttrs, context, theme=None, forceReload=False):
   """
   global factory
 
-  load()
-  if not clsName in factory or forceReload:
-    factory[clsName] = {'object': cssAttrs}
+  stack = getattr(_local, 'stack', None)
+  if stack:
+    if getEntry(clsName) is None or forceReload:
+      stack[-1].objects[clsName] = cssAttrs
+  elif clsName not in load() or forceReload:
+    with _LOCK:
+      tmpFactory = dict(factory)
+      tmpFactory[clsName] = types.MappingProxyType({'object': cssAttrs})
+      factory = types.MappingProxyType(tmpFactory)
+    CssCache.CACHE.invalidate(clsName)
+    instances.invalidate(clsName)
   return getCssObj(clsName, context, theme=theme)
 
 
+class CopyOnWrite(collections.abc.MutableMapping):
+  """
+  Dictionary sharing a read only definition until it is changed (copy on write).
+
+  The style definitions of the objects from the factory are shared by all the components. Each component gets its own
+  CopyOnWrite view and the definition is only copied for the view which is changed. With nested, the values are also
+  views (e.g. eventsStyles['hover'])
+  """
+
+  def __init__(self, data, nested=False):
+    self._data, self._nested, self._owned = data, nested, False
+    self._children, self._assigned = {}, set()
+
+  def _own(self):
+    if not self._owned:
+      self._data, self._owned = dict(self._data), True
+
+  @property
+  def changed(self):
+    """
+    Flag set when the view (or one of its nested views) is not the shared definition anymore
+    """
+    return self._owned or any(child.changed for child in self._children.values())
+
+  def __getitem__(self, key):
+    if not self._nested or key in self._assigned:
+      return self._data[key]
+
+    child = self._children.get(key)
+    if child is None:
+      child = self._children[key] = CopyOnWrite(self._data[key])
+    return child
+
+  def __setitem__(self, key, value):
+    self._own()
+    self._data[key] = value
+    if self._nested:
+      self._assigned.add(key)
+      self._children.pop(key, None)
+
+  def __delitem__(self, key):
+    self._own()
+    del self._data[key]
+    self._children.pop(key, None)
+
+  def __iter__(self):
+    return iter(self._data)
+
+  def __len__(self):
+    return len(self._data)
+
+  def __repr__(self):
+    return repr(dict(self.items()))
+
+
 class CssCls(object):
   """
   CSS Base class of all the derived styles
@@ -143,6 +307,8 @@ class CssCls(object):
   # Default values for the style in the web portal
   fontSize, headerFontSize, fontFamily = '12px', '14px', 'Calibri'
 
+  _palette, _key, _shared = None, None, False
+
   def __init__(self, context=None, colors=None, theme=None):
     self.rptObj = context
     self.setId({} if self.cssId is None else self.cssId)
@@ -153,14 +319,53 @@ class CssCls(object):
     self.style.update(dict(self.attrs) if self.attrs is not None else {})
     self.eventsStyles = {}
     for state in ['hover', 'active', 'checked', 'disabled', 'empty', 'enabled', 'focus', 'link', 'visited', 'after', 'before']:
-      self.eventsStyles[state] = getattr(self, state, {})
+      # Copy of the class definition as customize() is updating it
+      self.eventsStyles[state] = dict(getattr(self, state, None) or {})
     if self.childKinds is not None: # To add CSS Style link tr:nth-child(even)
       if not isinstance(self.childKinds, list):
         self.childKinds = [self.childKinds]
       for childKind in self.childKinds:
-        self.eventsStyles["%(type)s%(value)s" % childKind] = childKind['style']
+        self.eventsStyles["%(type)s%(value)s" % childKind] = dict(childKind['style'])
     self.customize(self.style, self.eventsStyles)
 
+  def share(self, context=None):
+    """
+    CSS Style Builder
+
+    Return a light copy of the object sharing its style definition (flyweight).
+    The definition is only copied if the new object is changed (see CopyOnWrite)
+
+    :param context: The underlying Framework object
+    :return: The new CSS Python object
+    """
+    cssObj = object.__new__(self.__class__)
+    cssObj.__dict__.update(self.__dict__)
+    cssObj.rptObj, cssObj._shared = context, True
+    cssObj.style, cssObj.eventsStyles = CopyOnWrite(self.style), CopyOnWrite(self.eventsStyles, nested=True)
+    return cssObj
+
+  def _freeze(self):
+    """
+    Make the style definition of the factory object read only. The objects sharing it are using CopyOnWrite views
+    """
+    self.style = types.MappingProxyType(self.style)
+    self.eventsStyles = types.MappingProxyType(
+      dict((state, types.MappingProxyType(cssRecord)) for state, cssRecord in self.eventsStyles.items()))
+
+  @property
+  def _cacheKey(self):
+    """
+    The factory key of the object. None when the shared definition has been changed, the styles are then not cached
+    """
+    if self._shared and (self.style.changed or self.eventsStyles.changed):
+      return None
+
+    return self._key
+
+  @_cacheKey.setter
+  def _cacheKey(self, key):
+    self._key = key
+
   def customize(self, style, eventsStyles):
     """
     CSS Style Builder
@@ -257,6 +462,24 @@ class CssCls(object):
     CSS Style Builder
 
     Function to process the Static CSS Python configuration and to convert it to String fragments following the CSS Web standard.
+    The result is cached for the objects coming from the factory which have not been changed
+
+    :return: A Python dictionary with all the different styles and selector to be written to the page for a given Python CSS Class
+    """
+    cacheKey = self._cacheKey
+    if cacheKey is None:
+      return self.compileStyles()
+
+    styles = CssCache.CACHE.get(cacheKey)
+    if styles is None:
+      styles = CssCache.CACHE.set(cacheKey, self.compileStyles())
+    return dict(styles)
+
+  def compileStyles(self):
+    """
+    CSS Style Builder
+
+    Convert the CSS Python configuration to the CSS String fragments without using the cache
 
     :return: A Python dictionary with all the different styles and selector to be written to the page for a given Python CSS Class
     """
@@ -366,6 +589,20 @@ class CssCls(object):
       self.eventsStyles[event].update(css)
     return self
 
+  @property
+  def palette(self):
+    """
+    CSS Color definition
+
+    The resolved colors of the theme with the overrides defined for this object.
+    The theme palette is shared by all the CSS objects
+
+    :return: A Palette object
+    """
+    if self._palette is None:
+      self._palette = Palette.get(self.theme, self.rptObj).overlay(self.colorsCalc)
+    return self._palette
+
   def getColor(self, name, index):
     """
     CSS Color definition
@@ -376,26 +613,7 @@ class CssCls(object):
     :param index: The color index in the list
     :return: The hexadecimal color code
     """
-    if self.theme is not None:
-      colorObj = Color.ColorMaker(self.rptObj, theme=self.theme)
-    else:
-      colorObj = Color.ColorMaker(self.rptObj)
-    if self.colorsCalc is not None and name in self.colorsCalc:
-      countCategory = len(colorObj.get(name))
-      if index > 0:
-        invIndex = index - countCategory - 1
-        if index in self.colorsCalc[name]:
-          return self.colorsCalc[name][index]
-        elif invIndex in self.colorsCalc[name]:
-          return self.colorsCalc[name][invIndex]
-      if index < 0:
-        invIndex = countCategory + index + 1
-        if index in self.colorsCalc[name]:
-          return self.colorsCalc[name][index]
-        elif invIndex in self.colorsCalc[name]:
-          return self.colorsCalc[name][invIndex]
-
-    return colorObj.get(name, index)
+    return self.palette.get(name, index)
 
   def color(self, category, index=None, color=None):
     """
@@ -406,8 +624,13 @@ class CssCls(object):
     :param color: The hexadecimal color code
     :return: The hexadecimal color code
     """
-    colorObj = Color.ColorMaker(self.rptObj, theme=self.theme)
-    return colorObj.get(category, index, color)
+    if color is not None:
+      theme = Palette.reportTheme(self.rptObj) if self.theme is None else self.theme
+      # The CSS variables are not a theme for the ColorMaker, the default theme is used instead
+      colorObj = Color.ColorMaker(self.rptObj, theme=None if theme == Palette.VARIABLES else theme)
+      return colorObj.get(category, index, color)
+
+    return Palette.get(self.theme, self.rptObj).get(category, index)
 
   def toCss(self, paramsCss):
     """
@@ -426,12 +649,18 @@ class CssCls(object):
     CSS Object function
 
     Create a new CSS object derived from the existing one.
+    The class is only created once for a given name
 
     :param name: The new CSS reference
     :return: The CSS Class
     """
-    clsVirt = type(name, (self.__class__,), {})
-    clsVirt.name = name
+    key = (self.__class__, name)
+    clsVirt = _clones.get(key)
+    if clsVirt is None:
+      with _LOCK:
+        clsVirt = _clones.get(key)
+        if clsVirt is None:
+          clsVirt = _clones[key] = type(name, (self.__class__,), {'name': name})
     return clsVirt
 
 
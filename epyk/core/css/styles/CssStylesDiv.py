@@ -26,7 +26,7 @@ class CssDivWithBorder(CssStyle.CssCls):
 class CssDivConsole(CssStyle.CssCls):
   attrs = {'margin': '0', 'padding': '5px', 'border': '0', 'outline': 'none'}
   
-  before = [{'attr': 'content', 'value': r"'C:\Users\LONDON>'"}]
+  before = {'content': r"'C:\Users\LONDON>'"}
   
   def customize(self, style, eventsStyles):
     style.update({'background-color': self.getColor('greys', 9)})
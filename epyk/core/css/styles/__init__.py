@@ -1,20 +1,44 @@
-from . import CssStylesDiv as divs
-from . import CssStylesButton as buttons
-from . import CssStylesList as lists
-from . import CssStylesChart as charts
-from . import CssStylesCommon as commons
-from . import CssStyleDropdown as dropdowns
-from . import CssStylesHr as hr
-from . import CssStylesHref as links
-from . import CssStylesIcon as icons
-from . import CssStylesImg as images
-from . import CssStylesInput as inputs
-from . import CssStylesLabel as labels
-from . import CssStylesPivot as pivots
-from . import CssStylesPopup as popups
-from . import CssStylesRadio as radios
-from . import CssStylesSelect as selects
-from . import CssStylesTable as tables
-from . import CssStylesTabs as tabs
-from . import CssStylesText as texts
-from . import CssStylesDates as dates
+"""
+CSS Style modules.
+
+The modules are exposed with their short aliases (divs, buttons, charts...) but they are only imported when the
+alias is accessed (PEP 562)
+"""
+
+import importlib
+
+_MODULES = {
+  'divs': 'CssStylesDiv',
+  'buttons': 'CssStylesButton',
+  'lists': 'CssStylesList',
+  'charts': 'CssStylesChart',
+  'commons': 'CssStylesCommon',
+  'dropdowns': 'CssStyleDropdown',
+  'hr': 'CssStylesHr',
+  'links': 'CssStylesHref',
+  'icons': 'CssStylesIcon',
+  'images': 'CssStylesImg',
+  'inputs': 'CssStylesInput',
+  'labels': 'CssStylesLabel',
+  'pivots': 'CssStylesPivot',
+  'popups': 'CssStylesPopup',
+  'radios': 'CssStylesRadio',
+  'selects': 'CssStylesSelect',
+  'tables': 'CssStylesTable',
+  'tabs': 'CssStylesTabs',
+  'texts': 'CssStylesText',
+  'dates': 'CssStylesDates',
+}
+
+
+def __getattr__(name):
+  if name in _MODULES:
+    mod = importlib.import_module(".%s" % _MODULES[name], __name__)
+    globals()[name] = mod
+    return mod
+
+  raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+  return sorted(set(globals()) | set(_MODULES))
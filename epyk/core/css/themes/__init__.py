@@ -1,4 +1,27 @@
-from . import ThemeDark as darks
-from . import ThemeRed as reds
-from . import ThemeGreen as greens
-from . import ThemeBlue as blues
\ No newline at end of file
+"""
+Themes modules.
+
+The modules are exposed with their aliases and imported on first access (PEP 562)
+"""
+
+import importlib
+
+_MODULES = {
+  'darks': 'ThemeDark',
+  'reds': 'ThemeRed',
+  'greens': 'ThemeGreen',
+  'blues': 'ThemeBlue',
+}
+
+
+def __getattr__(name):
+  if name in _MODULES:
+    mod = importlib.import_module(".%s" % _MODULES[name], __name__)
+    globals()[name] = mod
+    return mod
+
+  raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+  return sorted(set(globals()) | set(_MODULES))
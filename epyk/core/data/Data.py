@@ -14,9 +14,18 @@ charge of parsing the data.
 import os
 import sys
 import json
-import pickle
 import importlib
 
+from epyk.core.data import DataCache
+from epyk.core.data import DataColumnar
+from epyk.core.data import DataCsv
+from epyk.core.data import DataDelta
+from epyk.core.data import DataFetch
+from epyk.core.data import DataFlight
+from epyk.core.data import DataMemo
+from epyk.core.data import DataPush
+from epyk.core.data import DataShared
+from epyk.core.data import DataSocket
 from epyk.core.data import DataDb
 from epyk.core.data import DataGrpc
 from epyk.core.data import DataOffice
@@ -39,47 +48,102 @@ class DataSrc(object):
   def office(self):
     return DataOffice.DataOffice(self._report)
 
-  def from_cache(self, code, is_secured=False, report_name=None):
+  def _cache_path(self, report_name=None):
+    """
+    Return the folder with the cached data of a report
+
+    :param report_name: Optional, the environment in which cache are stored. Default current one
+    """
+    report_name = report_name or self._report.run.report_name
+    path = self._report.run.local_path
+    if report_name != self._report.run.report_name:
+      path = self._report.run.local_path.replace(self._report.run.report_name, report_name)
+    return os.path.join(path, "tmp")
+
+  def _cache_expiry(self, cache_path, code):
+    """
+    Return the expiry timestamp of a cached data (0 for no expiry) or None if it is not available
+    """
+    meta = DataColumnar.read_meta(cache_path, code)
+    if meta is not None:
+      return meta['expiry']
+
+    return DataCache.get_cache(cache_path).expiry(code)
+
+  def from_cache(self, code, is_secured=False, report_name=None, columns=None, shared=False, ttl=None):
     """
     Loads data from a cached files
 
+    The data is first looked up in the memory cache shared by all the reports and then in the cache files.
+    The expired data is not returned (the data of the shared memory tier expires at the latest with its cache file)
+
+    The data is returned without any copy and the same object is returned to all the reports of the process.
+    It should not be changed, a copy should be done first (e.g. copy.deepcopy or DataFrame.copy)
+
+    The data saved in the columnar format is opened memory-mapped and only the columns used are read
+
+    With the shared flag the first worker loading the data publishes it in shared memory and the other workers of the
+    machine attach it read only (the arrays are not copied). The data returned should not be changed
+
+    Example
+    rptObj.data.from_cache("reference", shared=True, ttl=3600)
+
     :param code: The code for the data
     :param is_secured: Optional, boolean to set if the file should be secured. Default False
     :param report_name: Optional, the environment in which cache are stored. Default current one
+    :param columns: Optional, the columns to load for the data saved in the columnar format. Default all
+    :param shared: Optional, boolean to use the shared memory tier of the workers. Default False
+    :param ttl: Optional, the time to live in seconds of the data in the shared memory tier. Default the expiry of the cache
 
     :return: Return the data
     """
     if getattr(self._report, "run", None) is not None:
-      report_name = report_name or self._report.run.report_name
-      path = self._report.run.local_path
-      if report_name != self._report.run.report_name:
-        path = self._report.run.local_path.replace(self._report.run.report_name, report_name)
-      cache_path = os.path.join(path, "tmp")
-      if not os.path.exists(cache_path):
-        os.mkdir(cache_path) # Create the path to store the temp files
-      file_path = os.path.join(path, "tmp", code)
-      if os.path.exists(file_path):
-        file_obj = open(file_path, 'rb')
-        return pickle.load(file_obj)
+      cache_path = self._cache_path(report_name)
+      if shared:
+        key = os.path.join(cache_path, code) if columns is None else "%s:%s" % (os.path.join(cache_path, code), ",".join(columns))
+        return DataShared.get_shared().get_or_load(
+          key, lambda: self.from_cache(code, is_secured, report_name, columns), ttl=ttl,
+          expiry=lambda: self._cache_expiry(cache_path, code))
+
+      if DataColumnar.exists(cache_path, code):
+        return DataColumnar.load(cache_path, code, columns=columns)
 
-      return None
+      return DataCache.get_cache(cache_path).get(code)
 
-  def save_cache(self, data, code, is_secured=False, if_missing=True):
+  def save_cache(self, data, code, is_secured=False, if_missing=True, ttl=None, compression=None, cache_format=None):
     """
     Temporary files are saved in a pickle manner in order to avoid having to parse those files again.
 
+    Large tabular data (pandas DataFrame, dictionary of arrays or numpy arrays) can be saved in a columnar format
+    (npy or arrow) to be opened memory-mapped by from_cache
+
+    Example
+    rptObj.data.save_cache(data, "prices", ttl=3600, compression="gzip")
+    rptObj.data.save_cache(df, "prices", cache_format="npy")
+
     :param data: The data to be saved
     :param code: The code for the data
     :param is_secured: Optional, boolean to set if the file should be secured. Default False
-    :param if_missing: Optional, boolean to set the fact that caches are only saved if missing
+    :param if_missing: Optional, boolean to set the fact that caches are only saved if missing (or expired)
+    :param ttl: Optional, the time to live of the data in seconds. Default DataCache.DEFAULT_TTL
+    :param compression: Optional, the compression of the file (gzip or zstd). Default DataCache.COMPRESSION
+    :param cache_format: Optional, the columnar format (npy or arrow). Default pickle
     """
     if getattr(self._report, "run", None) is not None:
-      cache_path = os.path.join(self._report.run.local_path, "tmp")
-      if not os.path.exists(cache_path):
-        os.mkdir(cache_path)  # Create the path to store the temp files
-      if if_missing and not os.path.exists(os.path.join(cache_path, code)):
-        file_obj = open(os.path.join(cache_path, code), 'wb')
-        pickle.dump(data, file_obj)
+      cache_path = self._cache_path()
+      cache = DataCache.get_cache(cache_path)
+      if if_missing and (DataColumnar.read_meta(cache_path, code) is not None or cache.exists(code)):
+        return
+
+      DataShared.invalidate(os.path.join(cache_path, code))
+      if cache_format is not None:
+        if not os.path.exists(cache_path):
+          os.makedirs(cache_path)
+        DataColumnar.save(cache_path, code, data, ttl=ttl, format=cache_format)
+        cache.invalidate(code)
+      else:
+        DataColumnar.remove(cache_path, code)
+        cache.set(code, data, ttl=ttl, compression=compression)
 
   def from_file(self, filename, isSecured=False, report_name=None):
     """
@@ -101,16 +165,69 @@ class DataSrc(object):
       filePath = os.path.join(path, "data", "%s.csv" % filename)
       return open(filePath)
 
-  def from_source(self, http_data, fileName, fncName="getData", report_name=None, folder="sources", path=None):
+  def from_csv(self, filename, batch_size=None, columns=None, output="records", delimiter=",", encoding="utf-8",
+               types=None, workers=None, report_name=None):
+    """
+    Read a CSV file of the data folder in batches of typed values.
+
+    The types of the columns are inferred from the first rows and cached until the file changes.
+    Large files can be parsed in parallel on several cores with workers (not for files with line breaks in quoted values)
+
+    Example
+    for batch in rptObj.data.from_csv("prices", batch_size=5000, columns=["date", "close"]):
+      print(batch[0]["close"])
+
+    :param filename: The file name (without the .csv extension) in the data folder
+    :param batch_size: Optional, the number of rows of a batch. Default DataCsv.BATCH_SIZE
+    :param columns: Optional, the columns to read. Default all the columns
+    :param output: Optional, the format of the batches: records (list of dictionaries) or columns (dictionary of lists)
+    :param delimiter: Optional, the delimiter of the values. Default ,
+    :param encoding: Optional, the encoding of the file. Default utf-8
+    :param types: Optional, a dictionary with the types of some columns (int, float, bool, date or str)
+    :param workers: Optional, the number of processes used to parse the file. Default no parallel parsing
+    :param report_name: Optional, the environment with the file. Default current one
+
+    :return: A generator of batches
+    """
+    if getattr(self._report, "run", None) is not None:
+      report_name = report_name or self._report.run.report_name
+      path = self._report.run.local_path
+      if report_name != self._report.run.report_name:
+        path = self._report.run.local_path.replace(self._report.run.report_name, report_name)
+      return DataCsv.read(os.path.join(path, "data", "%s.csv" % filename), batch_size=batch_size, columns=columns,
+                          output=output, delimiter=delimiter, encoding=encoding, types=types, workers=workers)
+
+  def from_source(self, http_data, fileName, fncName="getData", report_name=None, folder="sources", path=None,
+                  shared=False, ttl=None, memoize=False, coalesce=None):
     """
     Returns data from a internal data service defined in the sources folder
 
+    With the memoize flag the result is kept in memory for the same service, function and input data. The results are
+    invalidated when the service file changes (the new version of the module is then loaded) and the concurrent calls
+    with the same inputs are computed once. The data returned should not be changed
+
+    With the coalesce flag the concurrent identical calls wait for the one running and share its result
+
+    The report object is not in the keys of memoize and coalesce, they must only be used for the services which do not
+    depend on the report (e.g. on its user or its session)
+
+    With the shared flag the result is published in shared memory for the other workers of the machine (for the same
+    service, function and input data). The data returned should not be changed
+
+    Example
+    rptObj.data.from_source({"ccy": "EUR"}, "reference", shared=True, ttl=3600)
+    rptObj.data.from_source({"ccy": "EUR"}, "prices", memoize=True, ttl=60)
+
     :param http_data: The input data for the service
     :param fileName: The service file name
     :param fncName: Optional, the function name in the service. Default getData
     :param report_name: Optional, the report name. Default the current one
     :param folder: Optional, the folder with the services. Default sources
     :param path: Optional, the path to be added to the python system path
+    :param shared: Optional, boolean to use the shared memory tier of the workers. Default False
+    :param ttl: Optional, the time to live in seconds of the shared or memoized data. Default no expiry
+    :param memoize: Optional, boolean to keep the result in memory for the next calls. Default False
+    :param coalesce: Optional, boolean to share the result of the identical calls running. Default DataFlight.COALESCE
     :return: The data
     """
     fileName = fileName.replace(".py", "")
@@ -125,17 +242,53 @@ class DataSrc(object):
       if report_name is None:
         report_name = self._report.run.report_name
       mod = importlib.import_module("%s.%s.%s" % (report_name, folder, fileName))
+    if memoize:
+      key = (getattr(getattr(self._report, "run", None), "report_name", None), mod.__name__, fncName, http_data)
+      return DataMemo.get_memo().call(key, mod, lambda module: self._call_source(module, fncName, http_data, shared, ttl), ttl=ttl)
+
+    return DataFlight.do("source", (mod.__name__, fncName, http_data),
+                         lambda: self._call_source(mod, fncName, http_data, shared, ttl), coalesce)
+
+  def _call_source(self, mod, fncName, http_data, shared=False, ttl=None):
+    if shared:
+      key = "%s.%s:%s" % (mod.__name__, fncName, json.dumps(http_data, sort_keys=True, default=str))
+      return DataShared.get_shared().get_or_load(key, lambda: getattr(mod, fncName)(self._report, http_data), ttl=ttl)
+
     return getattr(mod, fncName)(self._report, http_data)
 
-  def from_post_source(self, script, data=None, successFncs=None, udpate_freq=None, interval_name=None):
+  def from_post_source(self, script, data=None, successFncs=None, udpate_freq=None, interval_name=None, delta=None,
+                       key="id"):
     """
+    Call a post service from the page (optionally at a regular interval).
+
+    With delta the dataset is kept on the client and the version token is sent with the request (_version). The
+    service returns only the rows inserted, updated and deleted since this version with DataDelta.respond and the
+    patch is applied on the client. The success functions then receive in data the rows (data.rows) and the changes
+    (data.inserts, data.updates, data.deletes, data.full). The scope parameter of DataDelta.respond must be used when the
+    same dataset name returns different data (e.g. per user)
+
+    Example
+    rptObj.data.from_post_source("prices", udpate_freq=5, delta="prices", successFncs=["console.log(data.updates)"])
+
+    # In the service
+    def getData(report, http_data):
+      return DataDelta.respond("prices", load_prices(), http_data.get("_version"), key="id")
 
     :param script:
     :param data:
     :param successFncs:
     :param udpate_freq: Optional, Set the data update frequency in second
+    :param interval_name:
+    :param delta: Optional, the dataset name for the delta updates. Default full data for each call
+    :param key: Optional, the key column of the rows for the delta updates. Default id
     :return:
     """
+    if delta is not None:
+      prototypes = self._report._props.setdefault('js', {}).setdefault('prototypes', {})
+      prototypes['window.epykApplyDelta'] = DataDelta.JS_APPLY_DELTA
+      prototypes['window.epykDeltaVersion'] = DataDelta.JS_DELTA_VERSION
+      data = dict(data or {}, _version=self._report.js.objects.get("epykDeltaVersion(%s)" % json.dumps(delta)))
+      successFncs = ["data = epykApplyDelta(%s, data, %s)" % (json.dumps(delta), json.dumps(key))] + list(successFncs or [])
     if udpate_freq is not None:
       return self._report.js.window.setInterval(JsQuery.JQuery(self._report).getPyScript(script, data, successFncs=successFncs), milliseconds=udpate_freq * 1000).setVar(interval_name)
 
@@ -192,7 +345,8 @@ class DataSrc(object):
     soap = requires("zeep", reason='Missing Package', install="zeep", sourceScript=__file__, raiseExcept=True)
     return soap.Client(wsdl).service
 
-  def rest(self, url, data=None, method=None, encoding='utf-8', headers=None, unverifiable=False, proxy=None):
+  def rest(self, url, data=None, method=None, encoding='utf-8', headers=None, unverifiable=False, proxy=None, timeout=None,
+           coalesce=None):
     """
     Interface to a REST server.
 
@@ -206,32 +360,168 @@ class DataSrc(object):
 
     :param url: The REST service url
     :param data: The input data for the service
+    :param timeout: Optional, the timeout in seconds of the connection
+    :param coalesce: Optional, boolean to share the result of the identical calls running. Default DataFlight.COALESCE
     :return:
     """
-    return json.loads(self._report.py.request(url, data, method, encoding, headers, unverifiable, proxy=proxy))
+    return DataFlight.do("rest", (url, method, data, headers), lambda: json.loads(
+      self._report.py.request(url, data, method, encoding, headers, unverifiable, proxy=proxy, timeout=timeout)), coalesce)
 
-  def socket(self, data, host='localhost', port=5000, encoding='utf-8'):
+  def socket(self, data, host='localhost', port=5000, encoding='utf-8', timeout=None, framed=False, read_all=False):
     """
+    Interface to a socket service.
+
+    By default a connection is opened for the call and a single read of 1024 bytes is done. With the read_all flag the
+    full response is read until the server closes the connection, the timeout is then DataSocket.TIMEOUT if it is not
+    defined.
+    With the framed flag the messages are JSON documents prefixed by their length and the connections are kept open in
+    a pool (see DataSocket.Server for the server side)
+
+    Example
+    rptObj.data.socket({"ccy": "EUR"}, port=5000, framed=True, timeout=2)
 
     :param data: The input data for the service
     :param host: The service host name (e.g localhost)
     :param port: The service port
     :param encoding:
-    :return:
+    :param timeout: Optional, the timeout in seconds of the connection
+    :param framed: Optional, boolean to use the framed protocol with the persistent connections. Default False
+    :param read_all: Optional, boolean to read the response until the server closes the connection. Default False
+    :return: The bytes received or the decoded JSON response in the framed protocol
     """
+    if framed:
+      return DataSocket.get_pool(host, port, timeout=timeout if timeout is not None else DataSocket.TIMEOUT,
+                                 encoding=encoding).request(data)
+
     import socket
 
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if read_all and timeout is None:
+      # The server might never close the connection
+      timeout = DataSocket.TIMEOUT
+    if timeout is not None:
+      s.settimeout(timeout)
     s.connect((host, port))
-    s.sendall(json.dumps(data).encode(encoding=encoding))
-    result = s.recv(1024)
-    s.close()
-    return result
+    try:
+      s.sendall(json.dumps(data).encode(encoding=encoding))
+      if not read_all:
+        return s.recv(1024)
+
+      chunks = []
+      while True:
+        chunk = s.recv(65536)
+        if not chunk:
+          break
+
+        chunks.append(chunk)
+    finally:
+      s.close()
+    return b"".join(chunks)
+
+  def socket_pool(self, host='localhost', port=5000, size=DataSocket.POOL_SIZE, timeout=DataSocket.TIMEOUT,
+                  encoding='utf-8'):
+    """
+    Return the pool of persistent connections to a framed socket service.
+    The pool can send several requests on a connection before reading the responses
+
+    Example
+    prices = rptObj.data.socket_pool(port=5000).pipeline([{"ccy": "EUR"}, {"ccy": "USD"}])
+
+    :param host: The service host name (e.g localhost)
+    :param port: The service port
+    :param size: Optional, the maximum number of connections. Default DataSocket.POOL_SIZE
+    :param timeout: Optional, the timeout in seconds of the connections. Default DataSocket.TIMEOUT
+    :param encoding: Optional, the encoding of the messages. Default utf-8
+    :return: A DataSocket.SocketPool object
+    """
+    return DataSocket.get_pool(host, port, size, timeout, encoding)
+
+  def request(self, source, *args, **kwargs):
+    """
+    Describe a call to a data source for fetch_many
+
+    Example
+    rptObj.data.request("rest", "http://localhost:8080/prices", method="GET", timeout=2)
+
+    :param source: The name of the DataSrc entry point (rest, socket, rss...) or a function
+    :param args: The arguments of the call
+    :param kwargs: The named arguments of the call. timeout is the timeout of this request
+
+    :return: A DataFetch.Request object
+    """
+    return DataFetch.Request(source, *args, **kwargs)
+
+  def fetch_many(self, requests, concurrency=None, timeout=DataFetch.TIMEOUT, return_exceptions=False):
+    """
+    Run several calls to the data sources concurrently. The results are returned in the order of the requests.
 
+    Example
+    prices, positions = rptObj.data.fetch_many([
+      rptObj.data.request("rest", "http://localhost:8080/prices"),
+      rptObj.data.request("socket", {"book": "A"}, port=5000, timeout=2)], concurrency=4)
+
+    :param requests: A list of requests (DataSrc.request objects, dictionaries or functions)
+    :param concurrency: Optional, the maximum number of calls run at the same time. Default DataFetch.CONCURRENCY
+    :param timeout: Optional, the timeout of each call in seconds. Default DataFetch.TIMEOUT
+    :param return_exceptions: Optional, flag to return the errors in the results instead of raising the first one
+
+    :return: The list of results
+    """
+    return DataFetch.fetch_many(self, requests, concurrency, timeout, return_exceptions)
+
+  async def afetch_many(self, requests, concurrency=None, timeout=DataFetch.TIMEOUT, return_exceptions=False):
+    """
+    Run several calls to the data sources concurrently from an asyncio event loop.
+    The results are returned in the order of the requests.
 
+    Example
+    prices, positions = await rptObj.data.afetch_many([...])
+
+    :param requests: A list of requests (DataSrc.request objects, dictionaries or functions)
+    :param concurrency: Optional, the maximum number of calls run at the same time. Default DataFetch.CONCURRENCY
+    :param timeout: Optional, the timeout of each call in seconds. Default DataFetch.TIMEOUT
+    :param return_exceptions: Optional, flag to return the errors in the results instead of raising the first one
+
+    :return: The list of results
+    """
+    return await DataFetch.afetch_many(self, requests, concurrency, timeout, return_exceptions)
+
+  def websocket(self, url, components, reconnect=3000, var_name=None, max_failures=3):
+    """
+    Subscribe the components to a push channel.
 
-  def websocket(self):
-    pass
+    The Python producers publish the updates with rptObj.data.channel(name).publish(component, data) and the channels
+    are served by DataPush.PushServer. The updates are sent with a websocket (Server-Sent Events if websockets are not
+    available), they are batched and only the last update of a component is sent to the slow clients
+
+    Example
+    rptObj.data.websocket("ws://localhost:8765/prices", {"table_prices": "function(data){console.log(data)}"})
+    rptObj.data.channel("prices").publish("table_prices", rows)
+
+    Documentation
+    https://developer.mozilla.org/en-US/docs/Web/API/WebSocket
+    https://developer.mozilla.org/en-US/docs/Web/API/EventSource
+
+    :param url: The channel url (ws:// or http://)
+    :param components: A dictionary with the component identifiers and the Javascript functions receiving the data
+    :param reconnect: Optional, the delay in milliseconds before a new connection. Default 3000
+    :param var_name: Optional, the Javascript variable with the subscription
+    :param max_failures: Optional, the number of failed websocket connections before using EventSource. Default 3
+    :return: The Javascript string
+    """
+    return DataPush.js_subscribe(url, components, reconnect=reconnect, var_name=var_name, max_failures=max_failures)
+
+  def channel(self, name):
+    """
+    Return a push channel of the process to publish the updates of the components
+
+    Example
+    rptObj.data.channel("prices").publish("table_prices", rows)
+
+    :param name: The channel name (the path of the channel url)
+    :return: A DataPush.Channel object
+    """
+    return DataPush.get_channel(name)
 
   def rss(self, url, proxy=None, method="GET"):
     """
@@ -288,7 +578,7 @@ class DataSrc(object):
 
 
 
-  def rpc(self, url, data=None, headers=None, is_secured=False):
+  def rpc(self, url, data=None, headers=None, is_secured=False, coalesce=None):
     """
     Interface to a RPC server.
 
@@ -303,6 +593,7 @@ class DataSrc(object):
 
     :param url: The RPC service url
     :param data: The input data for the service
+    :param coalesce: Optional, boolean to share the result of the identical calls running. Default DataFlight.COALESCE
     :return:
     """
     http_client = requires("jsonrpcclient.clients.http_client", reason='Missing Package', install="jsonrpcclient[requests]", sourceScript=__file__, raiseExcept=True)
@@ -314,7 +605,7 @@ class DataSrc(object):
     if data is None or "method" not in data:
       raise Exception("data must of a method defined")
 
-    return client.send(json.dumps(data))
+    return DataFlight.do("rpc", (url, data, headers, is_secured), lambda: client.send(json.dumps(data)), coalesce)
 
   def grpc(self, serviceName, path, module, host="localhost", port=50051):
     """
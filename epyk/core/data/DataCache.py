@@ -0,0 +1,442 @@
+"""
+Module in charge of the cached data.
+
+The cache has two tiers:
+  - A memory LRU shared by all the reports of the process and limited in bytes
+  - A disk tier in the report tmp folder with an optional time to live and an optional compression (gzip or zstd)
+
+The files are written in a temporary file and then renamed in order to be safe with concurrent processes.
+The data of the memory tier is checked against the modification time and the size of the file, so a file rewritten
+or removed by another process is not served from the memory of this one.
+The files saved by the previous versions (raw pickle files) are still loaded, they do not have any expiry
+
+The cached data is returned without any copy and it is shared by all the reports of the process, it should not be
+changed by the caller
+
+Example
+  cache = DataCache.get_cache(r"/reports/test/tmp")
+  cache.set("prices", data, ttl=3600, compression="gzip")
+  cache.get("prices")
+"""
+
+import os
+import gzip
+import time
+import pickle
+import struct
+import threading
+import collections
+
+
+# Maximum size of the memory tier (in bytes) for each cache folder
+MAX_BYTES = 64 * 1024 * 1024
+
+# Default time to live of the cached data (in seconds). None means no expiry
+DEFAULT_TTL = None
+
+# Default compression of the files (None, gzip or zstd)
+COMPRESSION = None
+
+# Header of the cache files: magic, expiry timestamp (0 for no expiry), compression code
+_HEADER = struct.Struct(">5sdB")
+_MAGIC = b"EPYK1"
+_COMPRESSIONS = {None: 0, 'gzip': 1, 'zstd': 2}
+
+# Marker for the missing entries (None is a valid cached value)
+MISSING = object()
+
+
+def _stamp(stat):
+  return stat.st_mtime_ns, stat.st_size
+
+
+def _zstd():
+  from epyk.core.js.Imports import requires
+
+  return requires("zstandard", reason='Missing Package', install='zstandard', source_script=__file__, raise_except=True)
+
+
+def compress(payload, compression):
+  """
+  Compress the pickled data
+
+  :param payload: The bytes to compress
+  :param compression: The compression name (None, gzip or zstd)
+
+  :return: The compressed bytes
+  """
+  if compression is None:
+    return payload
+
+  if compression == 'gzip':
+    return gzip.compress(payload, compresslevel=6)
+
+  if compression == 'zstd':
+    return _zstd().ZstdCompressor().compress(payload)
+
+  raise ValueError("Unknown compression %s, available ones are gzip and zstd" % compression)
+
+
+def decompress(payload, code):
+  """
+  Decompress the content of a cache file
+
+  :param payload: The compressed bytes
+  :param code: The compression code of the file header
+
+  :return: The pickled bytes
+  """
+  if code == 0:
+    return payload
+
+  if code == 1:
+    return gzip.decompress(payload)
+
+  return _zstd().ZstdDecompressor().decompress(payload)
+
+
+class MemoryCache(object):
+  """
+  LRU cache limited by the size in bytes of the pickled data.
+
+  The values are returned without any copy, they should not be changed by the caller
+  """
+
+  def __init__(self, max_bytes=MAX_BYTES):
+    self.max_bytes, self.size = max_bytes, 0
+    self._lru, self._lock = collections.OrderedDict(), threading.Lock()
+    self.hits, self.misses, self.evictions, self.expired = 0, 0, 0, 0
+
+  def get(self, key, stamp=None):
+    """
+    Return the cached value
+
+    :param key: The cache code
+    :param stamp: Optional. The modification time and size of the file, the entry is discarded if it is different
+
+    :return: The value or MISSING
+    """
+    with self._lock:
+      record = self._lru.get(key)
+      if record is None:
+        self.misses += 1
+        return MISSING
+
+      expiry, size, value, record_stamp = record
+      if stamp is not None and stamp != record_stamp:
+        # The file was changed by another process
+        del self._lru[key]
+        self.size -= size
+        self.misses += 1
+        return MISSING
+
+      if expiry and expiry < time.time():
+        del self._lru[key]
+        self.size -= size
+        self.expired += 1
+        self.misses += 1
+        return MISSING
+
+      self._lru.move_to_end(key)
+      self.hits += 1
+      return value
+
+  def set(self, key, value, size, expiry=0, stamp=None):
+    with self._lock:
+      self._discard(key)
+      if size > self.max_bytes:
+        return
+
+      self._lru[key] = (expiry, size, value, stamp)
+      self.size += size
+      while self.size > self.max_bytes:
+        _, (_, evicted, _, _) = self._lru.popitem(last=False)
+        self.size -= evicted
+        self.evictions += 1
+
+  def invalidate(self, key=None):
+    with self._lock:
+      if key is None:
+        self._lru.clear()
+        self.size = 0
+      else:
+        self._discard(key)
+
+  def _discard(self, key):
+    record = self._lru.pop(key, None)
+    if record is not None:
+      self.size -= record[1]
+
+
+class DiskCache(object):
+  """
+  Cache files in a folder with an optional expiry and compression
+  """
+
+  def __init__(self, path):
+    self.path = path
+    self.hits, self.misses, self.expired, self.writes = 0, 0, 0, 0
+
+  def file_path(self, key):
+    return os.path.join(self.path, key)
+
+  def stamp(self, key):
+    """
+    Return the modification time and the size of a cache file
+
+    :param key: The cache code
+
+    :return: A tuple (mtime, size) or None if the file does not exist
+    """
+    try:
+      return _stamp(os.stat(self.file_path(key)))
+
+    except (IOError, OSError):
+      return None
+
+  def expiry(self, key):
+    """
+    Return the expiry of a cache file. Only the header of the file is read
+
+    :param key: The cache code
+
+    :return: The expiry timestamp (0 for no expiry) or None if the file does not exist or if it is expired
+    """
+    try:
+      with open(self.file_path(key), 'rb') as file_obj:
+        header = file_obj.read(_HEADER.size)
+    except (IOError, OSError):
+      return None
+
+    if len(header) < _HEADER.size or header[:len(_MAGIC)] != _MAGIC:
+      # Raw pickle file written by the previous versions
+      return 0
+
+    expiry = _HEADER.unpack(header)[1]
+    if expiry and expiry < time.time():
+      self.remove(key)
+      self.expired += 1
+      return None
+
+    return expiry
+
+  def check(self, key):
+    """
+    Check if a cache file exists and is not expired. Only the header of the file is read
+
+    :param key: The cache code
+
+    :return: A boolean
+    """
+    return self.expiry(key) is not None
+
+  def read(self, key):
+    """
+    Read a cache file
+
+    :param key: The cache code
+
+    :return: A tuple (expiry, size, value, stamp) or None
+    """
+    file_path = self.file_path(key)
+    try:
+      with open(file_path, 'rb') as file_obj:
+        stamp = _stamp(os.fstat(file_obj.fileno()))
+        content = file_obj.read()
+    except (IOError, OSError):
+      self.misses += 1
+      return None
+
+    if content[:len(_MAGIC)] != _MAGIC:
+      # Raw pickle file written by the previous versions
+      self.hits += 1
+      return 0, len(content), pickle.loads(content), stamp
+
+    _, expiry, code = _HEADER.unpack(content[:_HEADER.size])
+    if expiry and expiry < time.time():
+      self.remove(key)
+      self.expired += 1
+      self.misses += 1
+      return None
+
+    payload = decompress(content[_HEADER.size:], code)
+    self.hits += 1
+    return expiry, len(payload), pickle.loads(payload), stamp
+
+  def write(self, key, payload, expiry=0, compression=None):
+    """
+    Write a cache file. The file is written in a temporary file which is then renamed
+
+    :param key: The cache code
+    :param payload: The pickled data
+    :param expiry: Optional. The expiry timestamp. Default 0 (no expiry)
+    :param compression: Optional. The compression (None, gzip or zstd)
+
+    :return: The modification time and the size of the file written
+    """
+    if not os.path.exists(self.path):
+      os.makedirs(self.path)
+    content = _HEADER.pack(_MAGIC, expiry, _COMPRESSIONS[compression]) + compress(payload, compression)
+    tmp_path = "%s.%s.%s.tmp" % (self.file_path(key), os.getpid(), threading.get_ident())
+    with open(tmp_path, 'wb') as file_obj:
+      file_obj.write(content)
+      file_obj.flush()
+      # The rename keeps the modification time and the size
+      stamp = _stamp(os.fstat(file_obj.fileno()))
+    os.replace(tmp_path, self.file_path(key))
+    self.writes += 1
+    return stamp
+
+  def remove(self, key):
+    try:
+      os.remove(self.file_path(key))
+    except (IOError, OSError):
+      pass
+
+  def purge(self):
+    """
+    Remove the expired files of the folder
+
+    :return: The number of files removed
+    """
+    count = 0
+    if not os.path.exists(self.path):
+      return count
+
+    now = time.time()
+    for file_name in os.listdir(self.path):
+      file_path = os.path.join(self.path, file_name)
+      try:
+        with open(file_path, 'rb') as file_obj:
+          header = file_obj.read(_HEADER.size)
+      except (IOError, OSError):
+        continue
+
+      if len(header) == _HEADER.size and header[:len(_MAGIC)] == _MAGIC:
+        expiry = _HEADER.unpack(header)[1]
+        if expiry and expiry < now:
+          self.remove(file_name)
+          count += 1
+    self.expired += count
+    return count
+
+
+class DataCache(object):
+  """
+  Data cache with a memory tier and a disk tier
+  """
+
+  def __init__(self, path, max_bytes=MAX_BYTES):
+    self.memory, self.disk = MemoryCache(max_bytes), DiskCache(path)
+
+  def get(self, key, default=None):
+    """
+    Return the cached data
+
+    Example
+    cache.get("prices")
+
+    :param key: The cache code
+    :param default: Optional. The value returned if the data is not in the cache or if it is expired
+
+    :return: The cached data
+    """
+    stamp = self.disk.stamp(key)
+    if stamp is None:
+      # The file was removed, possibly by another process
+      self.memory.invalidate(key)
+      self.disk.misses += 1
+      return default
+
+    value = self.memory.get(key, stamp)
+    if value is not MISSING:
+      return value
+
+    record = self.disk.read(key)
+    if record is None:
+      return default
+
+    expiry, size, value, stamp = record
+    self.memory.set(key, value, size, expiry, stamp)
+    return value
+
+  def exists(self, key):
+    """
+    Check if a not expired data is available in the cache. The data is not loaded
+
+    :param key: The cache code
+
+    :return: A boolean
+    """
+    return self.disk.check(key)
+
+  def expiry(self, key):
+    """
+    Return the expiry of a data in the cache. The data is not loaded
+
+    :param key: The cache code
+
+    :return: The expiry timestamp (0 for no expiry) or None if the data is not available
+    """
+    return self.disk.expiry(key)
+
+  def set(self, key, value, ttl=None, compression=None):
+    """
+    Save the data in the cache
+
+    Example
+    cache.set("prices", data, ttl=3600, compression="gzip")
+
+    :param key: The cache code
+    :param value: The data to be saved
+    :param ttl: Optional. The time to live in seconds. Default DEFAULT_TTL
+    :param compression: Optional. The compression of the file (gzip or zstd). Default COMPRESSION
+    """
+    ttl = ttl if ttl is not None else DEFAULT_TTL
+    expiry = time.time() + ttl if ttl else 0
+    payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    stamp = self.disk.write(key, payload, expiry, compression or COMPRESSION)
+    self.memory.set(key, value, len(payload), expiry, stamp)
+
+  def invalidate(self, key=None):
+    """
+    Remove a data from the cache (or all the data of the memory tier)
+
+    :param key: Optional. The cache code
+    """
+    self.memory.invalidate(key)
+    if key is not None:
+      self.disk.remove(key)
+
+  def stats(self):
+    """
+    Return the counters of the cache
+
+    :return: A dictionary
+    """
+    return {
+      'memory': {'hits': self.memory.hits, 'misses': self.memory.misses, 'evictions': self.memory.evictions,
+                 'expired': self.memory.expired, 'bytes': self.memory.size, 'entries': len(self.memory._lru)},
+      'disk': {'hits': self.disk.hits, 'misses': self.disk.misses, 'expired': self.disk.expired,
+               'writes': self.disk.writes}}
+
+
+_CACHES, _LOCK = {}, threading.Lock()
+
+
+def get_cache(path):
+  """
+  Return the cache of a folder. The caches are shared by all the reports of the process
+
+  :param path: The cache folder
+
+  :return: The DataCache object
+  """
+  path = os.path.abspath(path)
+  cache = _CACHES.get(path)
+  if cache is None:
+    with _LOCK:
+      cache = _CACHES.get(path)
+      if cache is None:
+        cache = _CACHES[path] = DataCache(path)
+  return cache
@@ -0,0 +1,339 @@
+"""
+Columnar format for the large cached datasets.
+
+The tabular data (pandas DataFrame, dictionary of arrays or numpy arrays) is saved with one .npy file per column and a
+small JSON file with the description of the columns. The columns are then opened memory-mapped:
+  - the reads are near instant as nothing is parsed,
+  - the memory is shared by all the workers through the OS page cache,
+  - only the columns used are paged in.
+
+The columns with Python objects (e.g. strings) cannot be mapped, they are pickled and only loaded when they are used.
+The categorical columns are saved with their codes and their categories. The Arrow IPC format can also be used if
+pyarrow is installed.
+
+The mapped columns are read only (any change raises a ValueError), a copy must be done to change the data
+(e.g. df.copy()). Only the columns with simple names (strings or numbers) can be saved, the MultiIndex are not supported
+
+The description file is replaced in one rename with a new data folder, the readers with a column already opened are not
+impacted by a new version of the data
+
+Example
+  DataColumnar.save(r"/reports/test/tmp", "prices", df, ttl=3600)
+  df = DataColumnar.load(r"/reports/test/tmp", "prices", columns=["date", "close"])
+"""
+
+import os
+import json
+import time
+import uuid
+import pickle
+import shutil
+import threading
+
+
+# Extension of the description file of a columnar dataset
+EXTENSION = ".cols"
+
+# Time (in seconds) before the removal of the previous versions of a dataset. This is for the readers which have read
+# the previous description but have not yet opened the columns
+GRACE_PERIOD = 60
+
+
+def _package(name):
+  from epyk.core.js.Imports import requires
+
+  return requires(name, reason='Missing Package', install=name, source_script=__file__, raise_except=True)
+
+
+def _numpy():
+  return _package("numpy")
+
+
+def meta_path(path, code):
+  return os.path.join(path, "%s%s" % (code, EXTENSION))
+
+
+def exists(path, code):
+  """
+  Check if a columnar dataset is available
+
+  :param path: The cache folder
+  :param code: The code for the data
+
+  :return: A boolean
+  """
+  return os.path.exists(meta_path(path, code))
+
+
+def to_columns(data):
+  """
+  Split the data in columns
+
+  :param data: A pandas DataFrame, a dictionary of arrays or a numpy array
+
+  :return: A tuple (kind, list of (name, array), index)
+  """
+  np = _numpy()
+  if isinstance(data, dict):
+    for name in data:
+      _check_name(name)
+    return "dict", [(name, np.asarray(values)) for name, values in data.items()], None
+
+  if isinstance(data, np.ndarray):
+    return "ndarray", [(None, data)], None
+
+  if hasattr(data, "columns") and hasattr(data, "index"):
+    if getattr(data.columns, "nlevels", 1) > 1 or getattr(data.index, "nlevels", 1) > 1:
+      raise TypeError("MultiIndex are not supported by the columnar format")
+
+    if data.index.name is not None:
+      _check_name(data.index.name)
+    columns = []
+    for name in data.columns:
+      _check_name(name)
+      series = data[name]
+      # The categorical columns are kept to save their codes and their categories
+      columns.append((name, series.array if str(series.dtype) == "category" else series.to_numpy()))
+    index = None
+    if not (data.index.dtype.kind == 'i' and data.index.equals(type(data.index)(range(len(data.index))))):
+      index = data.index.to_numpy()
+    return "dataframe", columns, index
+
+  raise TypeError("Columnar format is only available for DataFrame, dictionaries of arrays and numpy arrays")
+
+
+def _check_name(name):
+  if not isinstance(name, (str, int, float)) or isinstance(name, bool):
+    raise TypeError("Column names must be strings or numbers in the columnar format, not %r" % (name, ))
+
+
+def _write_column(folder, file_name, name, values):
+  if str(values.dtype) == "category":
+    np = _numpy()
+    return {'name': name, 'file': _write_array(folder, file_name, np.asarray(values.codes)), 'dtype': "category",
+            'categories': _write_array(folder, "%s.categories" % file_name, np.asarray(values.categories)),
+            'ordered': bool(values.ordered)}
+
+  return {'name': name, 'file': _write_array(folder, file_name, values), 'dtype': str(values.dtype)}
+
+
+def _write_array(folder, file_name, values):
+  np = _numpy()
+  if values.dtype.hasobject:
+    with open(os.path.join(folder, "%s.pkl" % file_name), "wb") as file_obj:
+      pickle.dump(values, file_obj, protocol=pickle.HIGHEST_PROTOCOL)
+    return "%s.pkl" % file_name
+
+  np.save(os.path.join(folder, "%s.npy" % file_name), np.ascontiguousarray(values), allow_pickle=False)
+  return "%s.npy" % file_name
+
+
+def _read_array(folder, file_name):
+  if file_name.endswith(".pkl"):
+    with open(os.path.join(folder, file_name), "rb") as file_obj:
+      return pickle.load(file_obj)
+
+  np = _numpy()
+  try:
+    # Plain array on top of the memory map, the data is not copied
+    return np.load(os.path.join(folder, file_name), mmap_mode="r", allow_pickle=False).view(np.ndarray)
+
+  except ValueError:
+    # Empty arrays cannot be mapped
+    return np.load(os.path.join(folder, file_name), allow_pickle=False)
+
+
+def save(path, code, data, ttl=None, format="npy"):
+  """
+  Save tabular data in the columnar format
+
+  Example
+  DataColumnar.save(r"/reports/test/tmp", "prices", df)
+
+  :param path: The cache folder
+  :param code: The code for the data
+  :param data: A pandas DataFrame, a dictionary of arrays or a numpy array
+  :param ttl: Optional. The time to live in seconds. Default no expiry
+  :param format: Optional. The file format (npy or arrow). Default npy
+
+  :return: The description of the dataset
+  """
+  if format != "arrow":
+    # The data is checked before creating the folder
+    kind, columns, index = to_columns(data)
+  folder_name = "%s.%s" % (code, uuid.uuid4().hex[:12])
+  folder = os.path.join(path, folder_name)
+  os.makedirs(folder)
+  meta = {'version': 1, 'format': format, 'folder': folder_name, 'expiry': time.time() + ttl if ttl else 0}
+  if format == "arrow":
+    pa = _package("pyarrow")
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data)
+    with pa.OSFile(os.path.join(folder, "data.arrow"), "wb") as sink:
+      with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    meta.update({'kind': "dataframe" if not isinstance(data, pa.Table) else "table", 'columns': table.column_names})
+  else:
+    meta.update({'kind': kind, 'columns': [], 'index': None, 'index_name': None})
+    for i, (name, values) in enumerate(columns):
+      meta['columns'].append(_write_column(folder, "c%s" % i, name, values))
+    if index is not None:
+      meta['index'] = _write_array(folder, "index", index)
+    if kind == "dataframe" and data.index.name is not None:
+      meta['index_name'] = data.index.name
+
+  tmp_path = "%s.%s.%s.tmp" % (meta_path(path, code), os.getpid(), threading.get_ident())
+  with open(tmp_path, "w") as file_obj:
+    json.dump(meta, file_obj)
+  os.replace(tmp_path, meta_path(path, code))
+  cleanup(path, code, keep=folder_name)
+  return meta
+
+
+def cleanup(path, code, keep=None, grace_period=None):
+  """
+  Remove the previous versions of a dataset.
+  The files already mapped by the readers stay available until they are closed (POSIX)
+
+  :param path: The cache folder
+  :param code: The code for the data
+  :param keep: Optional. The data folder to keep
+  :param grace_period: Optional. The minimum age of the folders removed. Default GRACE_PERIOD
+  """
+  grace_period = GRACE_PERIOD if grace_period is None else grace_period
+  prefix, now = "%s." % code, time.time()
+  for folder_name in os.listdir(path):
+    folder = os.path.join(path, folder_name)
+    if folder_name.startswith(prefix) and folder_name != keep and os.path.isdir(folder):
+      if len(folder_name) == len(prefix) + 12 and os.path.getmtime(folder) < now - grace_period:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def read_meta(path, code, check_expiry=True):
+  """
+  Return the description of a columnar dataset
+
+  :param path: The cache folder
+  :param code: The code for the data
+  :param check_expiry: Optional. Flag to ignore the expired datasets
+
+  :return: The description dictionary or None
+  """
+  try:
+    with open(meta_path(path, code)) as file_obj:
+      meta = json.load(file_obj)
+  except (IOError, OSError, ValueError):
+    return None
+
+  if check_expiry and meta['expiry'] and meta['expiry'] < time.time():
+    return None
+
+  return meta
+
+
+class ColumnarFrame(object):
+  """
+  Lazy access to the columns of a dataset saved in the npy format.
+  The columns are only opened (memory-mapped) when they are requested. They are read only
+  """
+
+  def __init__(self, path, meta):
+    self.folder, self.meta = os.path.join(path, meta['folder']), meta
+    self._records = dict((column['name'], column) for column in meta['columns'])
+    self._columns = {}
+
+  @property
+  def columns(self):
+    return [column['name'] for column in self.meta['columns']]
+
+  def __len__(self):
+    return len(self[self.columns[0]]) if self.columns else 0
+
+  def __getitem__(self, name):
+    if name not in self._columns:
+      record = self._records[name]
+      values = _read_array(self.folder, record['file'])
+      if record.get('categories') is not None:
+        pd = _package("pandas")
+        values = pd.Categorical.from_codes(
+          values, _read_array(self.folder, record['categories']), ordered=record['ordered'])
+      self._columns[name] = values
+    return self._columns[name]
+
+  @property
+  def index(self):
+    if self.meta.get('index'):
+      pd = _package("pandas")
+      return pd.Index(_read_array(self.folder, self.meta['index']), name=self.meta.get('index_name'), copy=False)
+
+    if self.meta.get('index_name') is not None:
+      pd = _package("pandas")
+      return pd.RangeIndex(len(self), name=self.meta['index_name'])
+
+    return None
+
+  def to_dict(self, columns=None):
+    return dict((name, self[name]) for name in columns or self.columns)
+
+  def to_pandas(self, columns=None):
+    """
+    Return a DataFrame based on the memory-mapped columns (without any copy of the numeric columns)
+
+    :param columns: Optional. The columns to load. Default all the columns
+
+    :return: A pandas DataFrame
+    """
+    pd = _package("pandas")
+    return pd.DataFrame(self.to_dict(columns), index=self.index, copy=False)
+
+
+def load(path, code, columns=None, lazy=False):
+  """
+  Open a columnar dataset. The data is returned with the type used to save it.
+  The memory-mapped data is read only
+
+  Example
+  DataColumnar.load(r"/reports/test/tmp", "prices", columns=["date", "close"])
+
+  :param path: The cache folder
+  :param code: The code for the data
+  :param columns: Optional. The columns to load. Default all the columns
+  :param lazy: Optional. Flag to return the ColumnarFrame object instead of the data
+
+  :return: The data or None if the dataset is missing or expired
+  """
+  meta = read_meta(path, code)
+  if meta is None:
+    return None
+
+  if meta['format'] == "arrow":
+    pa = _package("pyarrow")
+    source = pa.memory_map(os.path.join(path, meta['folder'], "data.arrow"), "r")
+    table = pa.ipc.open_file(source).read_all()
+    if columns is not None:
+      table = table.select(columns)
+    return table.to_pandas(split_blocks=True) if meta['kind'] == "dataframe" else table
+
+  frame = ColumnarFrame(path, meta)
+  if lazy:
+    return frame
+
+  if meta['kind'] == "ndarray":
+    return frame[None]
+
+  if meta['kind'] == "dict":
+    return frame.to_dict(columns)
+
+  return frame.to_pandas(columns)
+
+
+def remove(path, code):
+  """
+  Remove a columnar dataset
+
+  :param path: The cache folder
+  :param code: The code for the data
+  """
+  meta = read_meta(path, code, check_expiry=False)
+  if meta is not None:
+    os.remove(meta_path(path, code))
+    shutil.rmtree(os.path.join(path, meta['folder']), ignore_errors=True)
@@ -0,0 +1,299 @@
+"""
+Streaming reader for the CSV files of the reports.
+
+The files are read in batches of typed records (or columns), they are never fully loaded in memory.
+The types of the columns (int, float, bool, date or str) are inferred from the first rows and the schema is cached for
+each file until its modification time or its size change.
+
+Large files can be parsed in parallel on several cores. The file is then split in chunks of bytes aligned on the lines,
+this cannot be used for files with line breaks in quoted values.
+
+Example
+  for batch in DataCsv.read(r"/reports/test/data/prices.csv", batch_size=10000, columns=["date", "close"]):
+    print(len(batch))
+
+  for batch in DataCsv.read(r"/reports/test/data/prices.csv", output="columns", workers=4):
+    print(batch["close"][:10])
+"""
+
+import io
+import os
+import re
+import csv
+import datetime
+import threading
+import collections
+import concurrent.futures
+
+
+# Number of rows used to infer the types of the columns
+SAMPLE_ROWS = 1000
+
+# Default number of rows in a batch
+BATCH_SIZE = 10000
+
+# Size in bytes of the chunks parsed in parallel
+CHUNK_BYTES = 16 * 1024 * 1024
+
+_BOOLEANS = {'true': True, 'false': False, 'True': True, 'False': False, 'TRUE': True, 'FALSE': False}
+
+
+def to_bool(value):
+  return _BOOLEANS[value]
+
+
+def to_date(value):
+  if len(value) != 10 or value[4] != '-' or value[7] != '-':
+    raise ValueError("Invalid ISO date %s" % value)
+
+  return datetime.date(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+
+
+# Candidate types of the inference, in order of priority
+CONVERTERS = collections.OrderedDict([('int', int), ('float', float), ('bool', to_bool), ('date', to_date), ('str', str)])
+
+# Formats of the numbers accepted by the inference. The converters are more permissive (e.g. 00123, 1_000, nan or inf),
+# those values are only converted when the type is set with the types parameter (codes, identifiers...)
+FORMATS = {
+  'int': re.compile(r"^[+-]?(?:0|[1-9][0-9]*)$"),
+  'float': re.compile(r"^[+-]?(?:(?:0|[1-9][0-9]*)(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?$"),
+}
+
+
+class Schema(object):
+  """
+  Names and types of the columns of a CSV file
+  """
+
+  def __init__(self, columns, types):
+    self.columns, self.types = list(columns), list(types)
+
+  def __repr__(self):
+    return "Schema(%s)" % ", ".join("%s: %s" % (name, col_type) for name, col_type in zip(self.columns, self.types))
+
+  def to_dict(self):
+    return collections.OrderedDict(zip(self.columns, self.types))
+
+  def indices(self, columns=None):
+    """
+    Return the position of the columns in the file
+
+    :param columns: Optional. The columns to read. Default all the columns
+
+    :return: A list of indices
+    """
+    if columns is None:
+      return list(range(len(self.columns)))
+
+    missing = [name for name in columns if name not in self.columns]
+    if missing:
+      raise KeyError("Unknown columns %s, available columns: %s" % (", ".join(missing), ", ".join(self.columns)))
+
+    return [self.columns.index(name) for name in columns]
+
+
+def infer_type(values):
+  """
+  Return the first type able to convert all the values (empty values are ignored)
+
+  :param values: A list of strings
+
+  :return: The type name
+  """
+  values = [value for value in values if value != '']
+  if not values:
+    return 'str'
+
+  for name, converter in CONVERTERS.items():
+    if name in FORMATS and not all(FORMATS[name].match(value) for value in values):
+      continue
+
+    try:
+      for value in values:
+        converter(value)
+      return name
+
+    except (ValueError, KeyError, IndexError):
+      continue
+
+
+_SCHEMAS, _LOCK = {}, threading.Lock()
+
+
+def schema(path, delimiter=",", encoding="utf-8", sample=None, types=None):
+  """
+  Return the schema of a CSV file.
+  The schema is cached until the modification time or the size of the file change
+
+  Example
+  DataCsv.schema(r"/reports/test/data/prices.csv").to_dict()
+
+  :param path: The CSV file path
+  :param delimiter: Optional. The delimiter of the values. Default ,
+  :param encoding: Optional. The encoding of the file. Default utf-8
+  :param sample: Optional. The number of rows used for the inference. Default SAMPLE_ROWS
+  :param types: Optional. A dictionary with the types of some columns (int, float, bool, date or str)
+
+  :return: A Schema object
+  """
+  stat = os.stat(path)
+  key = (os.path.abspath(path), delimiter, encoding, sample)
+  with _LOCK:
+    cached = _SCHEMAS.get(key)
+  if cached is None or cached[0] != (stat.st_mtime_ns, stat.st_size):
+    with open(path, newline='', encoding=encoding) as file_obj:
+      reader = csv.reader(file_obj, delimiter=delimiter)
+      header = next(reader, [])
+      rows = [row for _, row in zip(range(sample or SAMPLE_ROWS), reader)]
+    inferred = Schema(header, [infer_type([row[i] for row in rows if i < len(row)]) for i in range(len(header))])
+    cached = ((stat.st_mtime_ns, stat.st_size), inferred)
+    with _LOCK:
+      _SCHEMAS[key] = cached
+  if types:
+    return Schema(cached[1].columns, [types.get(name, col_type) for name, col_type in cached[1].to_dict().items()])
+
+  return cached[1]
+
+
+def _converters(file_schema, indices):
+  return [(i, file_schema.columns[i], CONVERTERS[file_schema.types[i]]) for i in indices]
+
+
+def _convert(rows, converters, line):
+  """
+  Convert the rows to columns of typed values
+
+  :param rows: The list of rows (lists of strings)
+  :param converters: The list of (index, name, converter)
+  :param line: The line number of the first row (for the error messages)
+
+  :return: An ordered dictionary with the columns
+  """
+  columns = collections.OrderedDict()
+  for i, name, converter in converters:
+    values = []
+    for n, row in enumerate(rows):
+      value = row[i] if i < len(row) else ''
+      try:
+        values.append(None if value == '' else converter(value))
+      except (ValueError, KeyError, IndexError):
+        raise ValueError("Line %s, column %s: cannot convert %r, use the types parameter to change the type" % (
+          line + n if line else "?", name, value))
+
+    columns[name] = values
+  return columns
+
+
+def _batch(columns, output):
+  if output == "columns":
+    return columns
+
+  names = list(columns)
+  return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def _parse_chunk(path, start, end, file_schema, indices, delimiter, encoding):
+  """
+  Parse a chunk of bytes of the file (in a worker process)
+  """
+  with open(path, 'rb') as file_obj:
+    file_obj.seek(start)
+    content = file_obj.read(end - start)
+  rows = [row for row in csv.reader(io.StringIO(content.decode(encoding), newline=''), delimiter=delimiter) if row]
+  return _convert(rows, _converters(file_schema, indices), None)
+
+
+def chunks(path, start, chunk_bytes=None):
+  """
+  Split a file in chunks of bytes aligned on the lines
+
+  :param path: The file path
+  :param start: The offset of the first line
+  :param chunk_bytes: Optional. The approximate size of the chunks. Default CHUNK_BYTES
+
+  :return: A list of tuples (start, end)
+  """
+  size, offsets = os.path.getsize(path), [start]
+  with open(path, 'rb') as file_obj:
+    while offsets[-1] < size:
+      file_obj.seek(offsets[-1] + (chunk_bytes or CHUNK_BYTES))
+      file_obj.readline()
+      offsets.append(min(file_obj.tell(), size))
+  return list(zip(offsets[:-1], offsets[1:]))
+
+
+def _header_size(path):
+  with open(path, 'rb') as file_obj:
+    file_obj.readline()
+    return file_obj.tell()
+
+
+def read(path, batch_size=None, columns=None, output="records", delimiter=",", encoding="utf-8", types=None,
+         workers=None, chunk_bytes=None):
+  """
+  Read a CSV file in batches of typed values
+
+  Example
+  for batch in DataCsv.read(r"/reports/test/data/prices.csv", batch_size=1000, columns=["date", "close"]):
+    print(batch[0]["close"])
+
+  :param path: The CSV file path
+  :param batch_size: Optional. The number of rows of a batch. Default BATCH_SIZE
+  :param columns: Optional. The columns to read. Default all the columns
+  :param output: Optional. The format of the batches: records (list of dictionaries) or columns (dictionary of lists)
+  :param delimiter: Optional. The delimiter of the values. Default ,
+  :param encoding: Optional. The encoding of the file. Default utf-8
+  :param types: Optional. A dictionary with the types of some columns (int, float, bool, date or str)
+  :param workers: Optional. The number of processes used to parse the file in parallel. Default no parallel parsing
+  :param chunk_bytes: Optional. The size in bytes of the chunks parsed in parallel. Default CHUNK_BYTES
+
+  :return: A generator of batches
+  """
+  if output not in ("records", "columns"):
+    raise ValueError("Unknown output %s, available ones are records and columns" % output)
+
+  batch_size = batch_size or BATCH_SIZE
+  file_schema = schema(path, delimiter, encoding, types=types)
+  indices = file_schema.indices(columns)
+  if workers and workers > 1:
+    return _read_parallel(path, batch_size, file_schema, indices, output, delimiter, encoding, workers, chunk_bytes)
+
+  return _read(path, batch_size, file_schema, indices, output, delimiter, encoding)
+
+
+def _read(path, batch_size, file_schema, indices, output, delimiter, encoding):
+  converters = _converters(file_schema, indices)
+  with open(path, newline='', encoding=encoding) as file_obj:
+    reader = csv.reader(file_obj, delimiter=delimiter)
+    next(reader, None)
+    rows, line = [], 2
+    for row in reader:
+      if not row:
+        continue
+
+      rows.append(row)
+      if len(rows) == batch_size:
+        yield _batch(_convert(rows, converters, line), output)
+        rows, line = [], reader.line_num + 1
+    if rows:
+      yield _batch(_convert(rows, converters, line), output)
+
+
+def _read_parallel(path, batch_size, file_schema, indices, output, delimiter, encoding, workers, chunk_bytes):
+  pending, rest = collections.deque(), None
+  ranges = collections.deque(chunks(path, _header_size(path), chunk_bytes))
+  with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+    # Only a few chunks are parsed in advance to limit the memory
+    while ranges or pending:
+      while ranges and len(pending) < workers * 2:
+        start, end = ranges.popleft()
+        pending.append(pool.submit(_parse_chunk, path, start, end, file_schema, indices, delimiter, encoding))
+      parsed = pending.popleft().result()
+      if rest is not None:
+        # The rows of the previous chunk not yet sent
+        parsed = collections.OrderedDict((name, rest[name] + values) for name, values in parsed.items())
+      count = len(next(iter(parsed.values()))) if parsed else 0
+      full = count - count % batch_size if ranges or pending else count
+      for i in range(0, full, batch_size):
+        yield _batch(collections.OrderedDict((name, values[i:i + batch_size]) for name, values in parsed.items()), output)
+      rest = collections.OrderedDict((name, values[full:]) for name, values in parsed.items())
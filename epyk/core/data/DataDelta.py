@@ -0,0 +1,198 @@
+"""
+Delta updates for the periodic refreshes of the components.
+
+The server keeps the last version of each dataset with the history of the changes (rows inserted, updated and deleted).
+The client sends the version token it has, the server only returns the changes since this version. The full data is
+returned for a new client or if the version is unknown or too old.
+
+The version token is a hash of the rows, it only depends on the data. A token received by another worker of the server
+(or after a restart) is then either a version it knows, with the same rows, or an unknown one.
+
+The datasets are scoped (e.g. by report or by user) when the same name is used for different data
+
+The client keeps the rows of each dataset and applies the patches, the components receive the full rows and the patch.
+
+Example
+  # In the post service
+  def getData(report, http_data):
+    return DataDelta.respond("prices", load_prices(), http_data.get("_version"), key="id")
+
+  # In the report
+  rptObj.data.from_post_source("prices", udpate_freq=5, delta="prices", successFncs=[...])
+"""
+
+import json
+import hashlib
+import threading
+import collections
+
+
+# Number of versions kept in the history of a dataset
+MAX_HISTORY = 100
+
+# Javascript function applying a patch to the rows kept for a dataset
+JS_APPLY_DELTA = '''function(name, patch, key){
+  var stores = window.epykDeltaStores || (window.epykDeltaStores = {}), store = stores[name], i;
+  if(patch.full || store === undefined){
+    store = stores[name] = {version: patch.version, rows: patch.rows.slice(), index: {}};
+    for(i = 0; i < store.rows.length; i++){store.index[store.rows[i][key]] = i}
+    return {rows: store.rows, full: true, inserts: store.rows, updates: [], deletes: [], version: patch.version}}
+  if(patch.deletes.length > 0){
+    var removed = {}; for(i = 0; i < patch.deletes.length; i++){removed[patch.deletes[i]] = true}
+    store.rows = store.rows.filter(function(row){return removed[row[key]] !== true}); store.index = {};
+    for(i = 0; i < store.rows.length; i++){store.index[store.rows[i][key]] = i}}
+  for(i = 0; i < patch.updates.length; i++){store.rows[store.index[patch.updates[i][key]]] = patch.updates[i]}
+  for(i = 0; i < patch.inserts.length; i++){store.index[patch.inserts[i][key]] = store.rows.length; store.rows.push(patch.inserts[i])}
+  store.version = patch.version;
+  return {rows: store.rows, full: false, inserts: patch.inserts, updates: patch.updates, deletes: patch.deletes, version: patch.version}}'''
+
+# Javascript function returning the version token of a dataset
+JS_DELTA_VERSION = '''function(name){
+  var stores = window.epykDeltaStores || {}; return stores[name] === undefined ? null : stores[name].version}'''
+
+
+def content_token(rows):
+  """
+  Return the version token of a list of rows
+
+  :param rows: The list of rows (JSON serializable, the other objects are converted to strings)
+
+  :return: A string
+  """
+  return hashlib.sha1(json.dumps(rows, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+class VersionedTable(object):
+  """
+  Last version of a dataset with the history of the changes
+  """
+
+  def __init__(self, key="id", max_history=MAX_HISTORY):
+    self.key, self.max_history = key, max_history
+    self.version, self.rows, self.history = 0, collections.OrderedDict(), collections.deque()
+    self._token = content_token([])
+    # The versions of the tokens still in the history
+    self._tokens = {self._token: 0}
+    self._lock = threading.Lock()
+
+  @property
+  def token(self):
+    return self._token
+
+  def update(self, rows):
+    """
+    Replace the rows of the dataset and record the changes
+
+    :param rows: The list of rows (dictionaries with the key column)
+
+    :return: The new version token
+    """
+    new_rows = collections.OrderedDict((row[self.key], row) for row in rows)
+    with self._lock:
+      changes = []
+      for key, row in new_rows.items():
+        if key not in self.rows:
+          changes.append(('insert', key))
+        elif self.rows[key] != row:
+          changes.append(('update', key))
+      changes.extend(('delete', key) for key in self.rows if key not in new_rows)
+      if changes:
+        self.version += 1
+        self._token = content_token(list(new_rows.values()))
+        self._tokens[self._token] = self.version
+        self.history.append((self.version, changes))
+        if len(self.history) > self.max_history:
+          self.history.popleft()
+          oldest = self.history[0][0] - 1
+          self._tokens = dict((token, version) for token, version in self._tokens.items() if version >= oldest)
+      self.rows = new_rows
+      return self.token
+
+  def since(self, token=None):
+    """
+    Return the changes since a version
+
+    :param token: Optional. The version token of the client. Default None (full data)
+
+    :return: A dictionary with the new version, the full flag and the rows or the inserts, updates and deletes
+    """
+    with self._lock:
+      version = self._version(token)
+      if version is None:
+        return {'version': self.token, 'full': True, 'rows': list(self.rows.values())}
+
+      # The first change of a key after the client version tells if the client has this key
+      first, touched = {}, []
+      for change_version, changes in self.history:
+        if change_version > version:
+          for kind, key in changes:
+            if key not in first:
+              first[key] = kind
+              touched.append(key)
+      patch = {'version': self.token, 'full': False, 'inserts': [], 'updates': [], 'deletes': []}
+      for key in touched:
+        known = first[key] != 'insert'
+        if key in self.rows:
+          patch['updates' if known else 'inserts'].append(self.rows[key])
+        elif known:
+          patch['deletes'].append(key)
+      return patch
+
+  def _version(self, token):
+    """
+    Return the version of a client token or None if the full data must be sent
+    """
+    version = self._tokens.get(str(token)) if token else None
+    if version is None:
+      return None
+
+    if version < self.version and (not self.history or self.history[0][0] > version + 1):
+      # The history does not go back to this version
+      return None
+
+    return version
+
+
+_TABLES, _LOCK = {}, threading.Lock()
+
+
+def get_table(name, key="id", scope=None):
+  """
+  Return a versioned dataset of the process
+
+  :param name: The dataset name
+  :param key: Optional. The key column of the rows. Default id
+  :param scope: Optional. The scope of the dataset (e.g. the report name or the user). Default None (process)
+
+  :return: The VersionedTable object
+  """
+  table = _TABLES.get((scope, name))
+  if table is None:
+    with _LOCK:
+      table = _TABLES.get((scope, name))
+      if table is None:
+        table = _TABLES[(scope, name)] = VersionedTable(key)
+  if table.key != key:
+    raise ValueError("Dataset %s already defined with the key %s, not %s" % (name, table.key, key))
+
+  return table
+
+
+def respond(name, rows, token=None, key="id", scope=None):
+  """
+  Update a dataset and return the changes since the version of the client
+
+  Example
+  DataDelta.respond("prices", rows, http_data.get("_version"), key="id", scope=report.run.report_name)
+
+  :param name: The dataset name
+  :param rows: The current rows (dictionaries with the key column)
+  :param token: Optional. The version token sent by the client
+  :param key: Optional. The key column of the rows. Default id
+  :param scope: Optional. The scope of the dataset (e.g. the report name or the user). Default None (process)
+
+  :return: The patch dictionary
+  """
+  table = get_table(name, key, scope)
+  table.update(rows)
+  return table.since(token)
@@ -0,0 +1,219 @@
+"""
+Concurrent calls to the remote data sources.
+
+The blocking entry points of DataSrc (rest, rss, webscrapping, rpc, soap, socket...) are run in a pool of threads with
+a limited concurrency. Each request has its own timeout, started when the call is started (and not when it is queued).
+The results are returned in the order of the requests.
+
+The timeout is also given to the sources supporting it (e.g. rest and socket) to stop the underlying connection. The
+other sources are only abandoned, the thread is released when the call ends.
+
+Example
+  results = rptObj.data.fetch_many([
+    rptObj.data.request("rest", "http://localhost:8080/prices"),
+    rptObj.data.request("socket", {"ccy": "EUR"}, port=5000, timeout=2),
+    lambda: my_service(rptObj)], concurrency=8, timeout=10)
+
+  # From an asyncio server
+  results = await rptObj.data.afetch_many([...])
+"""
+
+import time
+import asyncio
+import inspect
+import concurrent.futures
+
+
+# Default maximum number of requests run at the same time
+CONCURRENCY = 8
+
+# Default timeout of a request (in seconds). None means no timeout
+TIMEOUT = 30
+
+
+class Request(object):
+  """
+  Description of a call to a data source
+  """
+
+  def __init__(self, source, *args, **kwargs):
+    self.timeout = kwargs.pop('timeout', None)
+    self.source, self.args, self.kwargs = source, args, kwargs
+    self.started = None
+
+  @classmethod
+  def create(cls, request):
+    """
+    Return a Request object
+
+    :param request: A Request object, a dictionary (with the keys source, args, kwargs and timeout) or a function
+
+    :return: A Request object
+    """
+    if isinstance(request, Request):
+      return request
+
+    if isinstance(request, dict):
+      return cls(request['source'], *request.get('args', ()), timeout=request.get('timeout'), **request.get('kwargs', {}))
+
+    if callable(request):
+      return cls(request)
+
+    raise TypeError("A request must be a Request, a dictionary or a function, not %s" % type(request))
+
+  def __repr__(self):
+    return "Request(%s)" % getattr(self.source, '__name__', self.source)
+
+  def function(self, data_src, timeout):
+    """
+    Return the function to run in the thread pool
+
+    :param data_src: The DataSrc object with the sources
+    :param timeout: The timeout of the request
+
+    :return: A function without parameter
+    """
+    if callable(self.source):
+      func, kwargs = self.source, self.kwargs
+    else:
+      func, kwargs = getattr(data_src, self.source), dict(self.kwargs)
+      # The sources supporting a timeout stop the connection
+      if timeout is not None and 'timeout' not in kwargs and 'timeout' in inspect.signature(func).parameters:
+        kwargs['timeout'] = timeout
+
+    self.started = None
+
+    def run():
+      self.started = time.time()
+      return func(*self.args, **kwargs)
+
+    return run
+
+
+class Fetcher(object):
+  """
+  Run the requests with a limited concurrency
+  """
+
+  def __init__(self, data_src, concurrency=None, timeout=TIMEOUT, return_exceptions=False):
+    self.data_src, self.timeout, self.return_exceptions = data_src, timeout, return_exceptions
+    self.concurrency = concurrency or CONCURRENCY
+
+  def _timeout(self, request):
+    return request.timeout if request.timeout is not None else self.timeout
+
+  def _error(self, request, timeout):
+    return concurrent.futures.TimeoutError("%s timed out after %ss" % (request, timeout))
+
+  def _result(self, request, future):
+    """
+    Wait for the result of a request. The timeout is counted from the start of the call
+    """
+    timeout = self._timeout(request)
+    while True:
+      if timeout is None:
+        return future.result()
+
+      remaining = timeout if request.started is None else request.started + timeout - time.time()
+      try:
+        return future.result(timeout=max(remaining, 0))
+
+      except concurrent.futures.TimeoutError:
+        if future.done():
+          raise
+
+        if request.started is not None and request.started + timeout <= time.time():
+          future.cancel()
+          raise self._error(request, timeout)
+
+  def run(self, requests):
+    """
+    Run the requests in a thread pool
+
+    :param requests: A list of requests (Request objects, dictionaries or functions)
+
+    :return: The list of results in the order of the requests
+    """
+    requests = [Request.create(request) for request in requests]
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=min(self.concurrency, len(requests) or 1))
+    try:
+      futures = [pool.submit(request.function(self.data_src, self._timeout(request))) for request in requests]
+      results = []
+      for request, future in zip(requests, futures):
+        try:
+          results.append(self._result(request, future))
+        except Exception as err:
+          if not self.return_exceptions:
+            for pending in futures:
+              pending.cancel()
+            raise
+
+          results.append(err)
+      return results
+
+    finally:
+      # The abandoned calls are not waited for
+      pool.shutdown(wait=False)
+
+  async def arun(self, requests, executor=None):
+    """
+    Run the requests from an asyncio event loop
+
+    :param requests: A list of requests (Request objects, dictionaries or functions)
+    :param executor: Optional. The executor used for the blocking calls. Default the loop executor
+
+    :return: The list of results in the order of the requests
+    """
+    requests = [Request.create(request) for request in requests]
+    semaphore, loop = asyncio.Semaphore(self.concurrency), asyncio.get_running_loop()
+
+    async def call(request):
+      async with semaphore:
+        timeout = self._timeout(request)
+        future = loop.run_in_executor(executor, request.function(self.data_src, timeout))
+        if timeout is None:
+          return await future
+
+        # The timeout is counted from the start of the call, the executor might have fewer workers than the concurrency
+        while True:
+          remaining = timeout if request.started is None else request.started + timeout - time.time()
+          done, _ = await asyncio.wait([future], timeout=max(remaining, 0))
+          if done:
+            return future.result()
+
+          if request.started is not None and request.started + timeout <= time.time():
+            future.cancel()
+            raise self._error(request, timeout)
+
+    return await asyncio.gather(*[call(request) for request in requests], return_exceptions=self.return_exceptions)
+
+
+def fetch_many(data_src, requests, concurrency=None, timeout=TIMEOUT, return_exceptions=False):
+  """
+  Run requests concurrently from synchronous code
+
+  :param data_src: The DataSrc object with the sources
+  :param requests: A list of requests (Request objects, dictionaries or functions)
+  :param concurrency: Optional. The maximum number of requests run at the same time. Default CONCURRENCY
+  :param timeout: Optional. The timeout of each request in seconds. Default TIMEOUT
+  :param return_exceptions: Optional. Flag to return the errors in the results instead of raising the first one
+
+  :return: The list of results in the order of the requests
+  """
+  return Fetcher(data_src, concurrency, timeout, return_exceptions).run(requests)
+
+
+async def afetch_many(data_src, requests, concurrency=None, timeout=TIMEOUT, return_exceptions=False, executor=None):
+  """
+  Run requests concurrently from an asyncio event loop
+
+  :param data_src: The DataSrc object with the sources
+  :param requests: A list of requests (Request objects, dictionaries or functions)
+  :param concurrency: Optional. The maximum number of requests run at the same time. Default CONCURRENCY
+  :param timeout: Optional. The timeout of each request in seconds. Default TIMEOUT
+  :param return_exceptions: Optional. Flag to return the errors in the results instead of raising the first one
+  :param executor: Optional. The executor used for the blocking calls. Default the loop executor
+
+  :return: The list of results in the order of the requests
+  """
+  return await Fetcher(data_src, concurrency, timeout, return_exceptions).arun(requests, executor)
@@ -0,0 +1,123 @@
+"""
+Coalescing of the concurrent identical calls to the remote data sources (single flight).
+
+When a call is already running for a key (same URL, method and body or same service and arguments) the other callers
+wait for it and share its result (or its error). Nothing is cached, the next call once the first one is done runs again.
+
+The result is shared by all the callers, it should not be changed. The report object is not in the key, the calls
+depending on the report (e.g. on its user) should not be coalesced
+
+Example
+  DataFlight.get_flight().do(DataFlight.key("rest", url, "GET", data), lambda: call(url))
+  rptObj.data.rest("http://localhost:8080/prices", method="GET", coalesce=True)
+"""
+
+import json
+import hashlib
+import threading
+import collections
+import concurrent.futures
+
+
+# Default for the coalesce parameter of the DataSrc entry points
+COALESCE = False
+
+
+def key(*parts):
+  """
+  Return the key of a call
+
+  :param parts: The source name and the parameters of the call (JSON serializable, the other objects are converted)
+
+  :return: A string
+  """
+  return "%s:%s" % (parts[0], hashlib.sha1(json.dumps(parts[1:], sort_keys=True, default=str).encode("utf-8")).hexdigest())
+
+
+class SingleFlight(object):
+  """
+  Run only one call at a time for a key, the concurrent callers share the result
+  """
+
+  def __init__(self):
+    self._calls, self._lock = {}, threading.Lock()
+    self.calls, self.executions, self.coalesced, self.errors = 0, 0, 0, 0
+    self.sources = collections.Counter()
+
+  def do(self, key, func):
+    """
+    Run a call or wait for the same call already running
+
+    :param key: The key of the call (see DataFlight.key)
+    :param func: The function without parameter running the call
+
+    :return: The result of the call
+    """
+    with self._lock:
+      self.calls += 1
+      future = self._calls.get(key)
+      owner = future is None
+      if owner:
+        future = self._calls[key] = concurrent.futures.Future()
+        self.executions += 1
+      else:
+        self.coalesced += 1
+        self.sources[key.split(":")[0]] += 1
+    if not owner:
+      return future.result()
+
+    try:
+      future.set_result(func())
+    except BaseException as err:
+      future.set_exception(err)
+      with self._lock:
+        self.errors += 1
+    finally:
+      with self._lock:
+        del self._calls[key]
+    return future.result()
+
+  def in_flight(self):
+    """
+    Return the number of calls running
+    """
+    return len(self._calls)
+
+  def stats(self):
+    """
+    Return the counters of the coalescing (sources are the coalesced calls per source)
+
+    :return: A dictionary
+    """
+    with self._lock:
+      return {'calls': self.calls, 'executions': self.executions, 'coalesced': self.coalesced, 'errors': self.errors,
+              'in_flight': len(self._calls), 'sources': dict(self.sources)}
+
+
+_FLIGHT = SingleFlight()
+
+
+def get_flight():
+  """
+  Return the single flight object of the process
+
+  :return: The SingleFlight object
+  """
+  return _FLIGHT
+
+
+def do(source, parts, func, coalesce=None):
+  """
+  Run a call of a data source, coalesced with the identical calls running if coalesce is set
+
+  :param source: The source name (rest, rpc...)
+  :param parts: The parameters identifying the call
+  :param func: The function without parameter running the call
+  :param coalesce: Optional. Flag to coalesce the call. Default COALESCE
+
+  :return: The result of the call
+  """
+  if not (COALESCE if coalesce is None else coalesce):
+    return func()
+
+  return _FLIGHT.do(key(source, *parts), func)
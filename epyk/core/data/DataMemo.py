@@ -0,0 +1,227 @@
+"""
+Memoization of the results of the data services (DataSrc.from_source).
+
+The results are kept in memory for each (report name, module, function, input data) with an optional time to live.
+The entries of a service are invalidated when its source file changes, the new version of the module is then loaded
+in a new module object (the threads still running the previous version are not impacted).
+The concurrent calls with the same inputs are computed only once, the other callers wait for the result.
+
+The report object is not part of the key, only the services which do not depend on the report (its inputs, its
+user...) should be memoized. The results are shared by all the callers, they should not be changed
+
+Example
+  data = DataMemo.get_memo().call(("report", "sources.prices", "getData", {"ccy": "EUR"}), sources.prices,
+                                  lambda mod: mod.getData(report, {"ccy": "EUR"}), ttl=60)
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+import importlib.util
+import collections
+
+
+# Maximum number of results kept in memory
+MAX_ENTRIES = 1024
+
+# Marker for the missing entries (None is a valid result)
+MISSING = object()
+
+
+def hash_data(data):
+  """
+  Return a stable hash of the input data of a service
+
+  :param data: The input data (JSON serializable, the other objects are converted to strings)
+
+  :return: A string
+  """
+  return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def source_stamp(module):
+  """
+  Return the modification time and the size of the source file of a module
+
+  :param module: The Python module
+
+  :return: A tuple or None for the modules without file
+  """
+  file_path = getattr(module, "__file__", None)
+  if file_path is None:
+    return None
+
+  try:
+    stat = os.stat(file_path)
+  except OSError:
+    return None
+
+  return stat.st_mtime_ns, stat.st_size
+
+
+def load_module(module):
+  """
+  Load the current version of a module in a new module object.
+  Unlike importlib.reload the previous module object is not changed, the threads using it are not impacted
+
+  :param module: The Python module
+
+  :return: The new module
+  """
+  locations = getattr(module.__spec__, "submodule_search_locations", None)
+  spec = importlib.util.spec_from_file_location(module.__name__, module.__file__, submodule_search_locations=locations)
+  new_module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(new_module)
+  sys.modules[module.__name__] = new_module
+  parent, _, name = module.__name__.rpartition(".")
+  if parent in sys.modules:
+    setattr(sys.modules[parent], name, new_module)
+  return new_module
+
+
+class KeyLocks(object):
+  """
+  One lock per key, the locks are removed when they are not used anymore
+  """
+
+  def __init__(self):
+    self._locks, self._lock = {}, threading.Lock()
+
+  def acquire(self, key):
+    with self._lock:
+      lock, count = self._locks.get(key, (None, 0))
+      if lock is None:
+        lock = threading.Lock()
+      self._locks[key] = (lock, count + 1)
+    lock.acquire()
+
+  def release(self, key):
+    with self._lock:
+      lock, count = self._locks[key]
+      if count == 1:
+        del self._locks[key]
+      else:
+        self._locks[key] = (lock, count - 1)
+    lock.release()
+
+
+class Memo(object):
+  """
+  Memory cache of the results of the data services
+  """
+
+  def __init__(self, max_entries=MAX_ENTRIES):
+    self.max_entries = max_entries
+    self._entries, self._stamps = collections.OrderedDict(), {}
+    self._lock, self._keys = threading.RLock(), KeyLocks()
+    self.hits, self.misses, self.reloads = 0, 0, 0
+
+  def check_source(self, module):
+    """
+    Load the new version of a module and invalidate its results if its source file has changed
+
+    :param module: The Python module of the service
+
+    :return: The module to be used
+    """
+    stamp = source_stamp(module)
+    with self._lock:
+      known = self._stamps.setdefault(module.__name__, stamp)
+      if known == stamp:
+        return sys.modules.get(module.__name__, module)
+
+      self.invalidate(module=module.__name__)
+      self._stamps[module.__name__] = stamp
+      self.reloads += 1
+      return load_module(module)
+
+  def call(self, key, module, func, ttl=None):
+    """
+    Return the memoized result of a service or compute it
+
+    :param key: A tuple (report name, module name, function name, input data)
+    :param module: The Python module of the service
+    :param func: The function computing the result. It receives the module (which might have been reloaded)
+    :param ttl: Optional. The time to live in seconds of the result. Default no expiry
+
+    :return: The result of the service
+    """
+    module = self.check_source(module)
+    # The version of the source is in the key to ignore the results computed with a previous version
+    key = tuple(key[:3]) + (hash_data(key[3]), self._stamps.get(module.__name__))
+    value = self.get(key)
+    if value is not MISSING:
+      return value
+
+    self._keys.acquire(key)
+    try:
+      value = self.get(key, count=False)
+      if value is not MISSING:
+        return value
+
+      value = func(module)
+      self.set(key, value, ttl)
+      return value
+
+    finally:
+      self._keys.release(key)
+
+  def get(self, key, count=True):
+    with self._lock:
+      record = self._entries.get(key)
+      if record is None or (record[0] and record[0] < time.time()):
+        if count:
+          self.misses += 1
+        return MISSING
+
+      self._entries.move_to_end(key)
+      if count:
+        self.hits += 1
+      return record[1]
+
+  def set(self, key, value, ttl=None):
+    with self._lock:
+      self._entries[key] = (time.time() + ttl if ttl else 0, value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def invalidate(self, report_name=None, module=None, function=None):
+    """
+    Remove the memoized results. All the results are removed without any filter
+
+    Example
+    DataMemo.get_memo().invalidate(module="reports.test.sources.prices")
+
+    :param report_name: Optional. The report name
+    :param module: Optional. The module name of the service
+    :param function: Optional. The function name
+    """
+    with self._lock:
+      for key in list(self._entries):
+        if ((report_name is None or key[0] == report_name) and (module is None or key[1] == module)
+              and (function is None or key[2] == function)):
+          del self._entries[key]
+
+  def stats(self):
+    """
+    Return the counters of the cache
+
+    :return: A dictionary
+    """
+    return {'hits': self.hits, 'misses': self.misses, 'reloads': self.reloads, 'entries': len(self._entries)}
+
+
+_MEMO = Memo()
+
+
+def get_memo():
+  """
+  Return the memoization cache of the process
+
+  :return: The Memo object
+  """
+  return _MEMO
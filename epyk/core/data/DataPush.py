@@ -0,0 +1,473 @@
+"""
+Push channels for the live dashboards.
+
+The Python producers publish the updates of the components in a channel. The updates are pushed to the browsers with a
+websocket (or Server-Sent Events when websockets are not available) instead of polling the server.
+
+Each subscriber has its own buffer with the last update of each component:
+  - the updates of a component not yet sent are coalesced (only the last one is sent),
+  - the updates are sent in batches (one message for several components),
+  - a slow client does not block the producers nor the other clients. Its buffer cannot grow above the number of
+    components, the intermediate updates are dropped.
+
+The browsers of other sites can open a websocket to the server (there is no CORS check for websockets), the allowed
+origins should be defined when the server is reachable from them. The Server-Sent Events are then only allowed for
+those origins (there is no Access-Control-Allow-Origin: * header)
+
+Example
+  server = DataPush.PushServer(port=8765).start()
+  channel = DataPush.get_channel("prices")
+  channel.publish("table_prices", rows)
+
+  # In the report, the Javascript subscription
+  rptObj.data.websocket("ws://localhost:8765/prices", {"table_prices": "function(data){...}"})
+"""
+
+import json
+import time
+import base64
+import socket
+import struct
+import hashlib
+import threading
+import collections
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+
+# Maximum number of components in a message
+MAX_BATCH = 100
+
+# Minimum delay (in seconds) between two messages of a subscriber, to group the updates
+FLUSH_INTERVAL = 0.05
+
+# Delay (in seconds) of the keep alive messages
+HEARTBEAT = 15
+
+# Timeout (in seconds) of a write to a client. The client is disconnected after it
+SEND_TIMEOUT = 10
+
+# Origins allowed to subscribe (e.g. ["https://reports.example.com"]). None means no check of the Origin header
+ALLOWED_ORIGINS = None
+
+# Maximum size (in bytes) of the frames sent by the websocket clients
+MAX_CLIENT_FRAME = 64 * 1024
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WS_PING = b"\x89\x00"
+_WS_CLOSE, _WS_PING_CODE, _WS_PONG = 0x8, 0x9, 0xA
+
+
+class Subscriber(object):
+  """
+  Buffer of the updates not yet sent to a client
+  """
+
+  def __init__(self, channel):
+    self.channel, self.pending, self.closed = channel, collections.OrderedDict(), False
+    self._cond = threading.Condition()
+    self.sent, self.coalesced = 0, 0
+
+  def push(self, component, data):
+    with self._cond:
+      if component in self.pending:
+        self.coalesced += 1
+        del self.pending[component]
+      self.pending[component] = data
+      self._cond.notify()
+
+  def next_batch(self, timeout=None, max_batch=None):
+    """
+    Wait for the next updates
+
+    :param timeout: Optional. The maximum time to wait in seconds
+    :param max_batch: Optional. The maximum number of components. Default MAX_BATCH
+
+    :return: An ordered dictionary (empty after the timeout) or None if the subscriber is closed
+    """
+    with self._cond:
+      if not self.pending and not self.closed:
+        self._cond.wait(timeout)
+      if self.closed:
+        return None
+
+      batch = collections.OrderedDict()
+      while self.pending and len(batch) < (max_batch or MAX_BATCH):
+        component, data = self.pending.popitem(last=False)
+        batch[component] = data
+      self.sent += len(batch)
+      return batch
+
+  def close(self):
+    with self._cond:
+      self.closed = True
+      self._cond.notify_all()
+    self.channel.unsubscribe(self)
+
+
+class Channel(object):
+  """
+  Channel of updates for a set of components
+  """
+
+  def __init__(self, name):
+    self.name, self.seq = name, 0
+    self.subscribers, self.state = [], collections.OrderedDict()
+    self._lock = threading.Lock()
+    self.published, self.disconnected = 0, 0
+
+  def subscribe(self, snapshot=True):
+    """
+    Add a subscriber to the channel
+
+    :param snapshot: Optional. Flag to send the last state of all the components first. Default True
+
+    :return: The Subscriber object
+    """
+    subscriber = Subscriber(self)
+    with self._lock:
+      if snapshot:
+        for component, data in self.state.items():
+          subscriber.push(component, data)
+      self.subscribers.append(subscriber)
+    return subscriber
+
+  def unsubscribe(self, subscriber):
+    with self._lock:
+      if subscriber in self.subscribers:
+        self.subscribers.remove(subscriber)
+
+  def publish(self, component, data):
+    """
+    Publish the new data of a component. This never blocks on the clients
+
+    Example
+    DataPush.get_channel("prices").publish("table_prices", rows)
+
+    :param component: The component identifier (the key of the Javascript handlers)
+    :param data: The data (JSON serializable)
+    """
+    with self._lock:
+      self.state[component] = data
+      self.published += 1
+      subscribers = list(self.subscribers)
+    for subscriber in subscribers:
+      subscriber.push(component, data)
+
+  def message(self, batch):
+    """
+    Return the JSON message of a batch of updates
+
+    :param batch: The dictionary with the updates of the components
+
+    :return: A tuple (sequence number, message)
+    """
+    with self._lock:
+      self.seq += 1
+      seq = self.seq
+    return seq, json.dumps({'channel': self.name, 'seq': seq, 'updates': batch}, default=str)
+
+  def stats(self):
+    """
+    Return the counters of the channel
+
+    :return: A dictionary
+    """
+    with self._lock:
+      subscribers = list(self.subscribers)
+    return {'published': self.published, 'subscribers': len(subscribers), 'disconnected': self.disconnected,
+            'sent': sum(subscriber.sent for subscriber in subscribers),
+            'coalesced': sum(subscriber.coalesced for subscriber in subscribers),
+            'pending': sum(len(subscriber.pending) for subscriber in subscribers)}
+
+
+_CHANNELS, _LOCK = {}, threading.Lock()
+
+
+def get_channel(name):
+  """
+  Return a channel of the process
+
+  :param name: The channel name
+
+  :return: The Channel object
+  """
+  channel = _CHANNELS.get(name)
+  if channel is None:
+    with _LOCK:
+      channel = _CHANNELS.get(name)
+      if channel is None:
+        channel = _CHANNELS[name] = Channel(name)
+  return channel
+
+
+def ws_frame(text):
+  """
+  Return a websocket text frame (server to client, not masked)
+
+  :param text: The message
+
+  :return: The bytes of the frame
+  """
+  payload = text.encode("utf-8")
+  if len(payload) < 126:
+    header = struct.pack(">BB", 0x81, len(payload))
+  elif len(payload) < 65536:
+    header = struct.pack(">BBH", 0x81, 126, len(payload))
+  else:
+    header = struct.pack(">BBQ", 0x81, 127, len(payload))
+  return header + payload
+
+
+def ws_control(opcode, payload=b""):
+  """
+  Return a websocket control frame (close, ping or pong) from the server
+
+  :param opcode: The frame opcode
+  :param payload: Optional. The frame payload (at most 125 bytes)
+
+  :return: The bytes of the frame
+  """
+  return struct.pack(">BB", 0x80 | opcode, len(payload)) + payload
+
+
+def ws_accept(key):
+  return base64.b64encode(hashlib.sha1((key + _WS_GUID).encode("ascii")).digest()).decode("ascii")
+
+
+def ws_valid_key(key):
+  """
+  Check the Sec-WebSocket-Key of a handshake (16 random bytes encoded in base64)
+
+  :param key: The header value or None
+
+  :return: A boolean
+  """
+  if not key:
+    return False
+
+  try:
+    return len(base64.b64decode(key.strip(), validate=True)) == 16
+
+  except (ValueError, TypeError):
+    return False
+
+
+def _recv_exact(sock, size):
+  chunks, remaining = [], size
+  while remaining:
+    try:
+      chunk = sock.recv(remaining)
+    except socket.timeout:
+      # The timeout of the connection is for the writes, the client can stay silent
+      continue
+
+    if not chunk:
+      return None
+
+    chunks.append(chunk)
+    remaining -= len(chunk)
+  return b"".join(chunks)
+
+
+def ws_read_frame(sock, max_size=None):
+  """
+  Read a frame sent by a websocket client (the client frames are masked)
+
+  :param sock: The socket
+  :param max_size: Optional. The maximum payload size. Default MAX_CLIENT_FRAME
+
+  :return: A tuple (opcode, payload) or None if the connection is closed
+  """
+  header = _recv_exact(sock, 2)
+  if header is None:
+    return None
+
+  opcode, size = header[0] & 0x0F, header[1] & 0x7F
+  if size >= 126:
+    extended = _recv_exact(sock, 2 if size == 126 else 8)
+    if extended is None:
+      return None
+
+    size = struct.unpack(">H" if size == 126 else ">Q", extended)[0]
+  if size > (max_size or MAX_CLIENT_FRAME):
+    raise ValueError("Websocket frame of %s bytes above the limit" % size)
+
+  mask = _recv_exact(sock, 4) if header[1] & 0x80 else b"\x00" * 4
+  payload = _recv_exact(sock, size) if size else b""
+  if mask is None or payload is None:
+    return None
+
+  return opcode, bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+class _PushHandler(BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"
+
+  def log_message(self, *args):
+    pass
+
+  def _write(self, content):
+    with self._write_lock:
+      self.wfile.write(content)
+      self.wfile.flush()
+
+  def _read_client(self, subscriber):
+    """
+    Read the frames of a websocket client. The pings are answered and the subscriber is closed with the connection
+    """
+    try:
+      while True:
+        frame = ws_read_frame(self.connection)
+        if frame is None:
+          return
+
+        opcode, payload = frame
+        if opcode == _WS_CLOSE:
+          self._write(ws_control(_WS_CLOSE, payload[:2]))
+          return
+
+        if opcode == _WS_PING_CODE:
+          self._write(ws_control(_WS_PONG, payload[:125]))
+
+    except (ValueError, OSError):
+      pass
+
+    finally:
+      subscriber.close()
+
+  def do_GET(self):
+    channel = get_channel(self.path.split("?")[0].strip("/"))
+    websocket = self.headers.get("Upgrade", "").lower() == "websocket"
+    origin, allowed_origins = self.headers.get("Origin"), self.server.allowed_origins
+    if origin is not None and allowed_origins is not None and origin not in allowed_origins:
+      self.send_error(403, "Origin not allowed")
+      return
+
+    if websocket:
+      if not ws_valid_key(self.headers.get("Sec-WebSocket-Key")):
+        self.send_error(400, "Invalid websocket handshake")
+        return
+
+      if self.headers.get("Sec-WebSocket-Version", "13").strip() != "13":
+        self.send_response(426, "Upgrade Required")
+        self.send_header("Sec-WebSocket-Version", "13")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return
+
+      self.send_response(101, "Switching Protocols")
+      self.send_header("Upgrade", "websocket")
+      self.send_header("Connection", "Upgrade")
+      self.send_header("Sec-WebSocket-Accept", ws_accept(self.headers["Sec-WebSocket-Key"].strip()))
+    else:
+      self.send_response(200)
+      self.send_header("Content-Type", "text/event-stream")
+      self.send_header("Cache-Control", "no-cache")
+      if origin is not None and allowed_origins is not None:
+        self.send_header("Access-Control-Allow-Origin", origin)
+        self.send_header("Vary", "Origin")
+    self.end_headers()
+    self.wfile.flush()
+    self.connection.settimeout(self.server.send_timeout)
+    self._write_lock = threading.Lock()
+    subscriber, last_sent = channel.subscribe(), 0
+    if websocket:
+      threading.Thread(target=self._read_client, args=(subscriber, ), daemon=True).start()
+    try:
+      while True:
+        delay = self.server.flush_interval - (time.time() - last_sent)
+        if delay > 0:
+          # The updates received in the meantime are coalesced and sent together
+          time.sleep(delay)
+        batch = subscriber.next_batch(self.server.heartbeat, self.server.max_batch)
+        if batch is None:
+          return
+
+        if batch:
+          seq, message = channel.message(batch)
+          content = ws_frame(message) if websocket else ("id: %s\ndata: %s\n\n" % (seq, message)).encode("utf-8")
+          last_sent = time.time()
+        else:
+          content = _WS_PING if websocket else b": ping\n\n"
+        self._write(content)
+
+    except (socket.timeout, OSError):
+      channel.disconnected += 1
+
+    finally:
+      subscriber.close()
+
+
+class PushServer(ThreadingMixIn, HTTPServer):
+  """
+  Server pushing the updates of the channels. The channel is the path of the URL.
+  The websocket connections are upgraded, the other ones receive Server-Sent Events.
+  The requests with an Origin header not in allowed_origins are rejected (403)
+
+  Example
+  server = DataPush.PushServer(port=8765, allowed_origins=["https://reports.example.com"]).start()
+  """
+  daemon_threads, allow_reuse_address = True, True
+
+  def __init__(self, host="localhost", port=8765, max_batch=MAX_BATCH, flush_interval=FLUSH_INTERVAL,
+               heartbeat=HEARTBEAT, send_timeout=SEND_TIMEOUT, allowed_origins=None):
+    self.max_batch, self.flush_interval, self.heartbeat = max_batch, flush_interval, heartbeat
+    self.send_timeout = send_timeout
+    allowed_origins = allowed_origins if allowed_origins is not None else ALLOWED_ORIGINS
+    self.allowed_origins = set(allowed_origins) if allowed_origins is not None else None
+    HTTPServer.__init__(self, (host, port), _PushHandler)
+
+  def start(self):
+    """
+    Serve the clients in a background thread
+
+    :return: The server
+    """
+    threading.Thread(target=self.serve_forever, daemon=True).start()
+    return self
+
+  def stop(self):
+    self.shutdown()
+    self.server_close()
+
+
+def js_subscribe(url, handlers, reconnect=3000, var_name=None, max_failures=3):
+  """
+  Return the Javascript subscription to a channel.
+  A websocket is used if available, Server-Sent Events otherwise. The connection is opened again when it is lost.
+  After max_failures websocket connections failing to open (e.g. a proxy blocking the upgrade), the Server-Sent Events
+  are used instead
+
+  :param url: The channel url (ws:// or http://)
+  :param handlers: A dictionary with the component identifiers and the Javascript functions receiving the data
+  :param reconnect: Optional. The delay in milliseconds before a new connection. Default 3000
+  :param var_name: Optional. The Javascript variable with the subscription. Default none
+  :param max_failures: Optional. The number of failed websocket connections before using EventSource. Default 3
+
+  :return: The Javascript string
+  """
+  ws_url = url.replace("http://", "ws://", 1).replace("https://", "wss://", 1)
+  sse_url = url.replace("ws://", "http://", 1).replace("wss://", "https://", 1)
+  js_handlers = "{%s}" % ", ".join("%s: %s" % (json.dumps(component), handler) for component, handler in handlers.items())
+  script = '''(function(){
+  var handlers = %(handlers)s, sub = {handlers: handlers, seq: 0, failures: 0};
+  function dispatch(raw){
+    var msg = JSON.parse(raw); sub.seq = msg.seq;
+    for(var c in msg.updates){if(handlers[c] !== undefined){handlers[c](msg.updates[c])}}};
+  function connect(){
+    var useWs = typeof WebSocket !== 'undefined' && (sub.failures < %(failures)s || typeof EventSource === 'undefined');
+    if(useWs){
+      var ws = sub.socket = new WebSocket(%(ws)s), opened = false;
+      ws.onopen = function(){opened = true; sub.failures = 0};
+      ws.onmessage = function(e){dispatch(e.data)};
+      ws.onclose = function(){if(!opened){sub.failures++}; setTimeout(connect, %(reconnect)s)}}
+    else{
+      var es = sub.socket = new EventSource(%(sse)s); es.onmessage = function(e){dispatch(e.data)}}};
+  connect(); return sub})()''' % {'handlers': js_handlers, 'ws': json.dumps(ws_url), 'sse': json.dumps(sse_url),
+                                  'reconnect': reconnect, 'failures': max_failures}
+  if var_name is not None:
+    return "var %s = %s" % (var_name, script)
+
+  return script
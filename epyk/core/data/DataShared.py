@@ -0,0 +1,389 @@
+"""
+Shared memory tier for the data used by several worker processes.
+
+The first worker loading a dataset publishes it in a shared memory segment and the other workers attach it read only.
+The data is pickled with the protocol 5 and the buffers (numpy arrays, pandas columns...) are stored out of band in the
+segment. They are then used without any copy by the other workers. The Python objects outside of those buffers are
+still unpickled in each process.
+
+The segments are listed in a small JSON index (key, segment name, layout, expiry). The index is replaced with a rename
+and the writers are synchronised with a file lock. The readers only parse it again when the file has changed.
+
+The loaders returning None are also recorded in the index (without any segment) so they are not run again before the
+end of the time to live.
+
+The segments are not removed when the publishing worker stops, they are removed with remove() or clear() (or when they
+are expired and a new version is published)
+
+Example
+  cache = DataShared.get_shared()
+  df = cache.get_or_load("reference", lambda: pd.read_csv("reference.csv"), ttl=3600)
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import pickle
+import tempfile
+import threading
+
+try:
+  from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+  # Python < 3.8
+  shared_memory, resource_tracker = None, None
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+  import msvcrt
+
+
+# Folder of the index. Default /dev/shm/epyk if available, the temporary folder otherwise
+SHARED_PATH = None
+
+# Alignment of the out of band buffers in the segments
+ALIGNMENT = 64
+
+# Marker for the missing entries (None is a valid shared value)
+MISSING = object()
+
+# Maximum time to live (in seconds) of the None recorded when a loader does not return any data
+NONE_TTL = 60
+
+
+def default_path():
+  if SHARED_PATH is not None:
+    return SHARED_PATH
+
+  if os.path.isdir("/dev/shm"):
+    return os.path.join("/dev/shm", "epyk")
+
+  return os.path.join(tempfile.gettempdir(), "epyk_shared")
+
+
+class FileLock(object):
+  """
+  Exclusive lock on a file shared by all the processes
+  """
+
+  def __init__(self, path):
+    self.path, self._file = path, None
+
+  def __enter__(self):
+    self._file = open(self.path, "a+")
+    if fcntl is not None:
+      fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+    else:
+      self._file.seek(0)
+      msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    if fcntl is not None:
+      fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+    else:
+      self._file.seek(0)
+      msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+    self._file.close()
+
+
+if shared_memory is not None:
+
+  class Segment(shared_memory.SharedMemory):
+    """
+    Shared memory segment which can be closed while its buffers are still used.
+    The mapping is then released with the last buffer
+    """
+
+    def close(self):
+      try:
+        super(Segment, self).close()
+      except BufferError:
+        pass
+
+
+def _open(name=None, size=0):
+  """
+  Open a segment without the resource tracker. Otherwise it would be removed when the process stops
+  """
+  if sys.version_info >= (3, 13):
+    return Segment(name=name, create=name is None, size=size, track=False)
+
+  segment = Segment(name=name, create=name is None, size=size)
+  resource_tracker.unregister(segment._name, "shared_memory")
+  return segment
+
+
+def _destroy(segment):
+  segment.close()
+  if sys.version_info < (3, 13):
+    # unlink() also unregisters the segment from the resource tracker
+    resource_tracker.register(segment._name, "shared_memory")
+  segment.unlink()
+
+
+class SharedCache(object):
+  """
+  Shared memory cache with a JSON index
+  """
+
+  def __init__(self, path=None, prefix="epyk"):
+    if shared_memory is None:
+      raise Exception("Shared memory is only available from Python 3.8")
+
+    self.path, self.prefix = path or default_path(), prefix
+    if not os.path.exists(self.path):
+      os.makedirs(self.path)
+    self.index_path = os.path.join(self.path, "index.json")
+    self._attached, self._lock, self._index_cache = {}, threading.Lock(), (None, {})
+    self.hits, self.misses, self.published, self.attached = 0, 0, 0, 0
+
+  def _index(self):
+    """
+    Return the index of the published segments. The file is only parsed again if it has been replaced.
+    The dictionary returned is shared and it should not be changed
+    """
+    try:
+      stat = os.stat(self.index_path)
+    except (IOError, OSError):
+      return {}
+
+    stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    cached_stamp, index = self._index_cache
+    if stamp == cached_stamp:
+      return index
+
+    try:
+      with open(self.index_path) as file_obj:
+        index = json.load(file_obj)
+    except (IOError, OSError, ValueError):
+      return {}
+
+    self._index_cache = (stamp, index)
+    return index
+
+  def index(self):
+    """
+    Return the index of the published segments
+
+    :return: A dictionary
+    """
+    return dict(self._index())
+
+  def _write_index(self, index):
+    tmp_path = "%s.%s.%s.tmp" % (self.index_path, os.getpid(), threading.get_ident())
+    with open(tmp_path, "w") as file_obj:
+      json.dump(index, file_obj)
+    os.replace(tmp_path, self.index_path)
+
+  def get(self, key, default=None):
+    """
+    Return the data published by a worker
+
+    Example
+    cache.get("reference")
+
+    :param key: The data key
+    :param default: Optional. The value returned if the data is not published or if it is expired
+
+    :return: The data (with read only buffers)
+    """
+    record = self._index().get(key)
+    if record is None or (record['expiry'] and record['expiry'] < time.time()):
+      self.misses += 1
+      return default
+
+    if record['name'] is None:
+      # The loader did not return any data
+      self.hits += 1
+      return None
+
+    with self._lock:
+      attached = self._attached.get(key)
+      if attached is not None and attached[0].name == record['name']:
+        self.hits += 1
+        return attached[1]
+
+    try:
+      segment = _open(record['name'])
+    except FileNotFoundError:
+      self.misses += 1
+      return default
+
+    view = segment.buf.toreadonly()
+    buffers = [view[start:start + size] for start, size in record['buffers']]
+    value = pickle.loads(view[:record['size']], buffers=buffers)
+    with self._lock:
+      self._attached[key] = (segment, value)
+    self.hits += 1
+    self.attached += 1
+    return value
+
+  def publish(self, key, value, ttl=None):
+    """
+    Publish data in a shared memory segment.
+    If a valid version is already published by another worker this one is used (a recorded None is replaced)
+
+    Example
+    cache.publish("reference", df, ttl=3600)
+
+    :param key: The data key
+    :param value: The data to be published
+    :param ttl: Optional. The time to live in seconds. Default no expiry
+
+    :return: The published data (with read only buffers)
+    """
+    buffers = []
+    payload = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    layout, offset = [], len(payload)
+    for raw in raws:
+      offset += -offset % ALIGNMENT
+      layout.append([offset, raw.nbytes])
+      offset += raw.nbytes
+
+    with FileLock("%s.lock" % self.index_path):
+      index = self.index()
+      record = index.get(key)
+      if record is None or record['name'] is None or (record['expiry'] and record['expiry'] < time.time()):
+        # The segment is only created if no other worker has published a valid version
+        segment = _open(None, size=max(offset, 1))
+        segment.buf[:len(payload)] = payload
+        for (start, size), raw in zip(layout, raws):
+          segment.buf[start:start + size] = raw.cast("B")
+        self._replace(index, key, record, {
+          'name': segment.name, 'size': len(payload), 'bytes': offset, 'buffers': layout, 'pid': os.getpid(),
+          'created': time.time(), 'expiry': time.time() + ttl if ttl else 0})
+        segment.close()
+        self.published += 1
+    return self.get(key)
+
+  def _replace(self, index, key, record, new_record):
+    if record is not None and record['name'] is not None:
+      self._unlink(record['name'])
+    index[key] = new_record
+    self._write_index(index)
+
+  def get_or_load(self, key, loader, ttl=None, expiry=None):
+    """
+    Return the shared data or load it and publish it.
+    Only one worker is loading the data, the other ones are waiting for it. When the loader returns None this is
+    recorded in the index for the time to live, at most NONE_TTL seconds
+
+    Example
+    cache.get_or_load("reference", lambda: pd.read_csv("reference.csv"))
+
+    :param key: The data key
+    :param loader: The function loading the data
+    :param ttl: Optional. The time to live in seconds. Default no expiry
+    :param expiry: Optional. A function returning the expiry timestamp of the source of the data (0 for no expiry).
+      It is called before the loader and the shared data expires at the latest with its source
+
+    :return: The data (with read only buffers)
+    """
+    value = self.get(key, MISSING)
+    if value is not MISSING:
+      return value
+
+    with FileLock(os.path.join(self.path, "%s.%s.lock" % (self.prefix, uuid.uuid5(uuid.NAMESPACE_URL, key).hex))):
+      value = self.get(key, MISSING)
+      if value is not MISSING:
+        return value
+
+      limit = expiry() if expiry is not None else 0
+      value = loader()
+      now = time.time()
+      expires = [deadline for deadline in (now + ttl if ttl else 0, limit) if deadline]
+      if value is None:
+        expires.append(now + NONE_TTL)
+        with FileLock("%s.lock" % self.index_path):
+          index = self.index()
+          self._replace(index, key, index.get(key), {
+            'name': None, 'size': 0, 'bytes': 0, 'buffers': [], 'pid': os.getpid(), 'created': now,
+            'expiry': min(expires)})
+        return value
+
+      if expires and min(expires) <= now:
+        # The source expired while loading, the data is not shared
+        return value
+
+      return self.publish(key, value, ttl=min(expires) - now if expires else None)
+
+  def _unlink(self, name):
+    try:
+      _destroy(_open(name))
+    except FileNotFoundError:
+      pass
+
+  def remove(self, key, variants=False):
+    """
+    Remove a shared data. The workers already using it keep their mapping
+
+    :param key: The data key
+    :param variants: Optional. Flag to also remove the keys with a column selection (key:columns)
+    """
+    with FileLock("%s.lock" % self.index_path):
+      index = self.index()
+      keys = [k for k in index if k == key or (variants and k.startswith("%s:" % key))]
+      for k in keys:
+        record = index.pop(k)
+        if record['name'] is not None:
+          self._unlink(record['name'])
+      if keys:
+        self._write_index(index)
+
+  def clear(self):
+    """
+    Remove all the shared data
+    """
+    with FileLock("%s.lock" % self.index_path):
+      for record in self.index().values():
+        if record['name'] is not None:
+          self._unlink(record['name'])
+      self._write_index({})
+
+  def stats(self):
+    """
+    Return the counters of the cache
+
+    :return: A dictionary
+    """
+    index = self._index()
+    return {'hits': self.hits, 'misses': self.misses, 'published': self.published, 'attached': self.attached,
+            'segments': len([record for record in index.values() if record['name'] is not None]), 'bytes': sum(record['bytes'] for record in index.values())}
+
+
+_CACHES, _LOCK = {}, threading.Lock()
+
+
+def get_shared(path=None):
+  """
+  Return the shared cache of the process for an index folder
+
+  :param path: Optional. The index folder. Default SHARED_PATH
+
+  :return: The SharedCache object
+  """
+  path = os.path.abspath(path or default_path())
+  cache = _CACHES.get(path)
+  if cache is None:
+    with _LOCK:
+      cache = _CACHES.get(path)
+      if cache is None:
+        cache = _CACHES[path] = SharedCache(path)
+  return cache
+
+
+def invalidate(key, path=None):
+  """
+  Remove a shared data, and its column selections, if the shared cache is used on this machine
+
+  :param key: The data key
+  :param path: Optional. The index folder. Default SHARED_PATH
+  """
+  if shared_memory is not None and os.path.exists(os.path.join(path or default_path(), "index.json")):
+    get_shared(path).remove(key, variants=True)
@@ -0,0 +1,312 @@
+"""
+Persistent socket client for the internal services.
+
+The messages are JSON documents in frames prefixed by their length (4 bytes, big endian). The connections are kept
+open and reused from a pool, several requests can be sent on a connection before reading the responses (pipelining).
+The server must answer the requests of a connection in order.
+
+A reference server is available to write the services (and to test them)
+
+Example
+  server = DataSocket.Server(lambda data: {"echo": data}, port=5000).start()
+
+  pool = DataSocket.get_pool("localhost", 5000, timeout=2)
+  pool.request({"ccy": "EUR"})
+  pool.pipeline([{"ccy": "EUR"}, {"ccy": "USD"}])
+"""
+
+import json
+import queue
+import socket
+import struct
+import threading
+import socketserver
+
+
+# Default number of connections kept in a pool
+POOL_SIZE = 4
+
+# Default timeout of the connections and the reads (in seconds). None means no timeout
+TIMEOUT = 30
+
+# Maximum size of a frame (in bytes)
+MAX_FRAME = 64 * 1024 * 1024
+
+# Maximum number of requests sent before reading their responses
+PIPELINE_WINDOW = 64
+
+_LENGTH = struct.Struct(">I")
+
+
+def recv_exact(sock, size):
+  """
+  Read an exact number of bytes from a socket
+
+  :param sock: The socket
+  :param size: The number of bytes
+
+  :return: The bytes
+  """
+  chunks, remaining = [], size
+  while remaining:
+    chunk = sock.recv(min(remaining, 1024 * 1024))
+    if not chunk:
+      raise ConnectionError("Connection closed after %s bytes out of %s" % (size - remaining, size))
+
+    chunks.append(chunk)
+    remaining -= len(chunk)
+  return b"".join(chunks)
+
+
+class _CountingSocket(object):
+  """
+  Socket wrapper counting the bytes received
+  """
+
+  def __init__(self, sock):
+    self.sock, self.received = sock, 0
+
+  def recv(self, size):
+    chunk = self.sock.recv(size)
+    self.received += len(chunk)
+    return chunk
+
+
+def send_frame(sock, payload):
+  sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def recv_frame(sock):
+  """
+  Read a frame from a socket
+
+  :param sock: The socket
+
+  :return: The payload or None if the connection is closed before a new frame
+  """
+  header = sock.recv(_LENGTH.size)
+  if not header:
+    return None
+
+  if len(header) < _LENGTH.size:
+    header += recv_exact(sock, _LENGTH.size - len(header))
+  size = _LENGTH.unpack(header)[0]
+  if size > MAX_FRAME:
+    raise ValueError("Frame of %s bytes above the limit of %s bytes" % (size, MAX_FRAME))
+
+  return recv_exact(sock, size)
+
+
+class Connection(object):
+  """
+  Persistent connection to a framed service
+  """
+
+  def __init__(self, host, port, timeout=TIMEOUT, encoding="utf-8"):
+    self.encoding = encoding
+    self.sock = socket.create_connection((host, port), timeout=timeout)
+    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    self.requests, self._reader = 0, None
+
+  def pipeline(self, requests):
+    """
+    Send several requests and then read the responses.
+    The number of bytes received by the call is available in the received attribute
+
+    :param requests: The list of input data (JSON serializable)
+
+    :return: The list of responses in the order of the requests
+    """
+    payloads = [json.dumps(data).encode(self.encoding) for data in requests]
+    self._reader, responses, sent = _CountingSocket(self.sock), [], 0
+    for i in range(len(payloads)):
+      if sent == i:
+        # The responses are read by windows to avoid a deadlock with full buffers on both sides
+        window = payloads[sent:sent + PIPELINE_WINDOW]
+        self.sock.sendall(b"".join(_LENGTH.pack(len(payload)) + payload for payload in window))
+        sent += len(window)
+      payload = recv_frame(self._reader)
+      if payload is None:
+        raise ConnectionError("Connection closed by the server")
+
+      responses.append(json.loads(payload.decode(self.encoding)))
+    self.requests += len(requests)
+    return responses
+
+  @property
+  def received(self):
+    """
+    The number of bytes received by the last pipeline call
+    """
+    return self._reader.received if self._reader is not None else 0
+
+  def close(self):
+    try:
+      self.sock.close()
+    except OSError:
+      pass
+
+
+class SocketPool(object):
+  """
+  Pool of persistent connections to a service.
+  The connections with an error are closed and replaced
+  """
+
+  def __init__(self, host, port, size=POOL_SIZE, timeout=TIMEOUT, encoding="utf-8"):
+    self.host, self.port, self.timeout, self.encoding = host, port, timeout, encoding
+    self._idle, self._slots = queue.LifoQueue(), threading.BoundedSemaphore(size)
+    self.opened, self.reused, self.errors = 0, 0, 0
+
+  def _acquire(self):
+    if not self._slots.acquire(timeout=self.timeout):
+      raise TimeoutError("No connection available to %s:%s after %ss" % (self.host, self.port, self.timeout))
+
+    try:
+      connection = self._idle.get_nowait()
+      self.reused += 1
+      return connection, True
+
+    except queue.Empty:
+      try:
+        connection = Connection(self.host, self.port, self.timeout, self.encoding)
+      except BaseException:
+        self._slots.release()
+        raise
+
+      self.opened += 1
+      return connection, False
+
+  def pipeline(self, requests):
+    """
+    Send several requests on one connection
+
+    Example
+    pool.pipeline([{"ccy": "EUR"}, {"ccy": "USD"}])
+
+    :param requests: The list of input data (JSON serializable)
+
+    :return: The list of responses in the order of the requests
+    """
+    connection, reused = self._acquire()
+    try:
+      try:
+        responses = connection.pipeline(requests)
+      except ConnectionError:
+        if not reused or connection.received:
+          # Some requests might have been processed, they are not sent again
+          raise
+
+        # The idle connection was closed by the server, the requests are sent again on a new connection
+        connection.close()
+        connection = Connection(self.host, self.port, self.timeout, self.encoding)
+        self.opened += 1
+        responses = connection.pipeline(requests)
+
+    except BaseException:
+      self.errors += 1
+      connection.close()
+      self._slots.release()
+      raise
+
+    self._idle.put(connection)
+    self._slots.release()
+    return responses
+
+  def request(self, data):
+    """
+    Send a request and return the response
+
+    :param data: The input data (JSON serializable)
+
+    :return: The response
+    """
+    return self.pipeline([data])[0]
+
+  def close(self):
+    """
+    Close the idle connections
+    """
+    while True:
+      try:
+        self._idle.get_nowait().close()
+      except queue.Empty:
+        return
+
+  def stats(self):
+    return {'opened': self.opened, 'reused': self.reused, 'errors': self.errors, 'idle': self._idle.qsize()}
+
+
+_POOLS, _LOCK = {}, threading.Lock()
+
+
+def get_pool(host="localhost", port=5000, size=POOL_SIZE, timeout=TIMEOUT, encoding="utf-8"):
+  """
+  Return the pool of connections of the process for a service
+
+  :param host: Optional. The service host name. Default localhost
+  :param port: Optional. The service port. Default 5000
+  :param size: Optional. The maximum number of connections. Default POOL_SIZE
+  :param timeout: Optional. The timeout of the connections in seconds. Default TIMEOUT
+  :param encoding: Optional. The encoding of the messages. Default utf-8
+
+  :return: The SocketPool object
+  """
+  key = (host, port, size, timeout, encoding)
+  pool = _POOLS.get(key)
+  if pool is None:
+    with _LOCK:
+      pool = _POOLS.get(key)
+      if pool is None:
+        pool = _POOLS[key] = SocketPool(host, port, size, timeout, encoding)
+  return pool
+
+
+class _Handler(socketserver.BaseRequestHandler):
+
+  def handle(self):
+    self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    encoding = self.server.encoding
+    while True:
+      try:
+        payload = recv_frame(self.request)
+      except (ConnectionError, OSError):
+        return
+
+      if payload is None:
+        return
+
+      try:
+        result = self.server.handler(json.loads(payload.decode(encoding)))
+      except Exception as err:
+        result = {'error': str(err)}
+      send_frame(self.request, json.dumps(result).encode(encoding))
+
+
+class Server(socketserver.ThreadingTCPServer):
+  """
+  Reference server for the framed protocol. Each connection is served in a thread
+
+  Example
+  server = DataSocket.Server(lambda data: {"echo": data}, port=0).start()
+  server.server_address[1]
+  server.stop()
+  """
+  daemon_threads, allow_reuse_address = True, True
+
+  def __init__(self, handler, host="localhost", port=5000, encoding="utf-8"):
+    self.handler, self.encoding = handler, encoding
+    socketserver.ThreadingTCPServer.__init__(self, (host, port), _Handler)
+
+  def start(self):
+    """
+    Serve the requests in a background thread
+
+    :return: The server
+    """
+    threading.Thread(target=self.serve_forever, daemon=True).start()
+    return self
+
+  def stop(self):
+    self.shutdown()
+    self.server_close()
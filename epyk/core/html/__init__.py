@@ -1,23 +1,25 @@
-from . import HtmlButton
-from . import HtmlContainer
-from . import HtmlEvent
-from . import HtmlFiles
-from . import HtmlLinks
-from . import HtmlImage
-from . import HtmlInput
-from . import HtmlList
-from . import HtmlNavBar
-from . import HtmlOthers
-from . import HtmlRadio
-from . import HtmlSelect
-from . import HtmlSideBar
-from . import HtmlText
-from . import HtmlTextComp
-from . import HtmlTextEditor
-from . import HtmlSystem
-from . import HtmlMedia
-from . import Html
-from . import HtmlPopup
-from . import HtmlMessaging
-from . import HtmlDates
-from . import templates
\ No newline at end of file
+"""
+HTML components package.
+
+The component modules are loaded on first access (PEP 562) so that a report only pays the import cost of the
+components it is really using
+"""
+
+import importlib
+
+_MODULES = ('HtmlButton', 'HtmlContainer', 'HtmlEvent', 'HtmlFiles', 'HtmlLinks', 'HtmlImage', 'HtmlInput', 'HtmlList',
+            'HtmlNavBar', 'HtmlOthers', 'HtmlRadio', 'HtmlSelect', 'HtmlSideBar', 'HtmlText', 'HtmlTextComp',
+            'HtmlTextEditor', 'HtmlSystem', 'HtmlMedia', 'Html', 'HtmlPopup', 'HtmlMessaging', 'HtmlDates', 'templates')
+
+
+def __getattr__(name):
+  if name in _MODULES:
+    mod = importlib.import_module(".%s" % name, __name__)
+    globals()[name] = mod
+    return mod
+
+  raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+  return sorted(set(globals()) | set(_MODULES))
@@ -1,11 +1,24 @@
-from . import GraphC3
-from . import GraphNVD3
-from . import GraphChartJs
-from . import GraphVis
-from . import GraphBillboard
-from . import GraphDC
-from . import GraphD3
-from . import GraphPlotly
-from . import GraphFabric
-from . import GraphD3Bespoke
-from . import GraphSparklines
+"""
+Chart wrappers package.
+
+Each wrapper is only imported when it is accessed (PEP 562) so a worker serving a single chart family does not load
+all the others
+"""
+
+import importlib
+
+_MODULES = ('GraphC3', 'GraphNVD3', 'GraphChartJs', 'GraphVis', 'GraphBillboard', 'GraphDC', 'GraphD3', 'GraphPlotly',
+            'GraphFabric', 'GraphD3Bespoke', 'GraphSparklines')
+
+
+def __getattr__(name):
+  if name in _MODULES:
+    mod = importlib.import_module(".%s" % name, __name__)
+    globals()[name] = mod
+    return mod
+
+  raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+  return sorted(set(globals()) | set(_MODULES))
@@ -1,5 +1,22 @@
-from . import HtmlTableConfig
-from . import HtmlTablePivot
-from . import HtmlTable
-from . import HtlmTableDatatable
-from . import HtmlTableTabulator
+"""
+Table components package.
+
+Modules are imported on first access (PEP 562)
+"""
+
+import importlib
+
+_MODULES = ('HtmlTableConfig', 'HtmlTablePivot', 'HtmlTable', 'HtlmTableDatatable', 'HtmlTableTabulator')
+
+
+def __getattr__(name):
+  if name in _MODULES:
+    mod = importlib.import_module(".%s" % name, __name__)
+    globals()[name] = mod
+    return mod
+
+  raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+  return sorted(set(globals()) | set(_MODULES))
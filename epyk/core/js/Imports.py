@@ -155,7 +155,7 @@ JS_IMPORTS = {
     'website': 'https://getbootstrap.com/'},
 
   'moment': {
-    'dsc': 'Module used by Tabulator for datetime objects',
+    'dsc': 'Module used by Tabulator for datetime objects. Not required by JsDate.format and JsString.toDate',
     'modules': [
       {'reqAlias': 'moment', 'script': 'moment.min.js', 'version': '2.24.0', 'path': '%(version)s/',
        'cdnjs': 'https://cdnjs.cloudflare.com/ajax/libs/moment.js'},
@@ -4,6 +4,8 @@ Module dedicated to wrap the Javascript Array
 https://www.w3schools.com/jsref/jsref_obj_array.asp
 """
 
+import json
+
 from epyk.core.js.primitives import JsObject
 from epyk.core.js.fncs import JsFncs
 
@@ -500,5 +502,43 @@ class JsArray(JsObject.JsObject):
       ''', pmts=["data"])
     return JsBoolean.JsBoolean("%s.contains(%s)" % (self.varId, JsUtils.jsConvertData(data, None)), isPyData=False)
 
+  @classmethod
+  def proto(cls, jsObj, fncName):
+    """
+    Add the predefined function to the Array prototype
+
+    :param jsObj: The base Javascript Python object
+    :param fncName: The function name to be added to the prototype
+    """
+    if fncName == "formatLocale":
+      from epyk.core.js.primitives import JsNumber
+
+      jsObj.extendProto(cls, "formatLocale", '''%s;
+        var result = new Array(this.length); for(var i = 0; i < this.length; i++){result[i] = fmt.format(this[i])}; return result
+        ''' % JsNumber.JS_NUMBER_FORMATTER, pmts=["decPlaces", "locale", "currency"])
+
+  def formatLocale(self, jsObj, decPlaces=0, locale='en-GB', currency=None):
+    """
+    Prototype Extension
+
+    Format all the numbers of an array (for example a table column) in one call.
+    A single cached Intl.NumberFormat is used for the full array
+
+    Example
+    jsObj.objects.array.get("MyColumn").formatLocale(jsObj, 2, 'en-US', currency='USD')
+
+    Documentation
+    https://developer.mozilla.org/en-US/docs/Web/JavaScript/Reference/Global_Objects/Intl/NumberFormat
+
+    :param jsObj: The Python Javascript base object
+    :param decPlaces: Optional. The number of decimal. Default 0
+    :param locale: Optional. A BCP 47 language tag. Default en-GB
+    :param currency: Optional. The ISO 4217 currency code. Default None
+
+    :return: A new Python Javascript Array with the formatted strings
+    """
+    self.proto(jsObj, "formatLocale")
+    return JsArray("%s.formatLocale(%s, %s, %s)" % (self.varId, decPlaces, json.dumps(locale), json.dumps(currency)), isPyData=False)
+
   def toArgs(self):
     return JsObject.JsObject("...%s" % self.varId)
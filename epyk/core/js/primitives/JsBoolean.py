@@ -32,8 +32,9 @@ class JsBoolean(JsObject.JsObject):
 
     :return: The Python Javascript Boolean Object
     """
-    self.varName = "!%s" % self.varId
-    return self
+    obj = self._mutable()
+    obj.varName = "!%s" % obj.varId
+    return obj
 
   def valueOf(self):
     """
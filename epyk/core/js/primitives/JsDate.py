@@ -5,12 +5,184 @@ https://www.w3schools.com/jsref/jsref_obj_date.asp
 """
 
 
+import re
 import json
+import calendar
+import datetime
 
 from epyk.core.js.primitives import JsObject
+from epyk.core.js.primitives import JsArray
 from epyk.core.js import JsUtils
 
 
+# Moment like tokens supported by the precompiled formatters and parsers (expression, width, Date setter position)
+DATE_TOKENS = {
+  'YYYY': ("%s.getFullYear()", 4, 0),
+  'MM': ("('0' + (%s.getMonth() + 1)).slice(-2)", 2, 1),
+  'DD': ("('0' + %s.getDate()).slice(-2)", 2, 2),
+  'HH': ("('0' + %s.getHours()).slice(-2)", 2, 3),
+  'mm': ("('0' + %s.getMinutes()).slice(-2)", 2, 4),
+  'ss': ("('0' + %s.getSeconds()).slice(-2)", 2, 5),
+  'SSS': ("('00' + %s.getMilliseconds()).slice(-3)", 3, 6),
+}
+
+# Formats natively understood by the Date constructor. No parsing function is needed for those ones.
+# As before the date only strings are UTC dates, the date time strings are local dates (ECMAScript rules)
+ISO_FORMATS = {"YYYY-MM-DD": "%s", "YYYY-MM-DDTHH:mm": "%s", "YYYY-MM-DDTHH:mm:ss": "%s",
+               "YYYY-MM-DDTHH:mm:ss.SSS": "%s"}
+
+_TOKENS_REGEX = re.compile(r"YYYY|SSS|MM|DD|HH|mm|ss|\[[^\]]*\]")
+
+_COMPILED_FORMATS, _COMPILED_PARSERS = {}, {}
+
+
+def tokenize(jsFormat):
+  """
+  Split a moment like format string into tokens and literals
+
+  Example
+  >>> tokenize("DD/MM/YYYY")
+  [('DD', True), ('/', False), ('MM', True), ('/', False), ('YYYY', True)]
+
+  :param jsFormat: The date format (e.g YYYY-MM-DD). Text between brackets is kept as it is
+
+  :return: A list of tuples (value, isToken)
+  """
+  parts, pos = [], 0
+  for match in _TOKENS_REGEX.finditer(jsFormat):
+    if match.start() > pos:
+      parts.append((jsFormat[pos:match.start()], False))
+    token = match.group(0)
+    if token.startswith("["):
+      parts.append((token[1:-1], False))
+    else:
+      parts.append((token, True))
+    pos = match.end()
+  if pos < len(jsFormat):
+    parts.append((jsFormat[pos:], False))
+  return parts
+
+
+def compileFormat(jsFormat, utc=False):
+  """
+  Produce the Javascript function to convert a Date to a String for a given format.
+  The result is cached so the format is only parsed once on the Python side
+
+  Example
+  compileFormat("DD/MM/YYYY")
+
+  :param jsFormat: The date format (e.g YYYY-MM-DD)
+  :param utc: Optional. Flag to use the UTC getters (getUTCHours...) instead of the local ones. Default False
+
+  :return: The Javascript function definition as a String
+  """
+  if (jsFormat, utc) not in _COMPILED_FORMATS:
+    exprs = []
+    for value, isToken in tokenize(jsFormat):
+      if isToken:
+        expr = DATE_TOKENS[value][0] % "d"
+        exprs.append(expr.replace(".get", ".getUTC") if utc else expr)
+      else:
+        exprs.append(json.dumps(value))
+    _COMPILED_FORMATS[(jsFormat, utc)] = "function(d){return %s}" % " + ".join(exprs or ["''"])
+  return _COMPILED_FORMATS[(jsFormat, utc)]
+
+
+def compileParser(jsFormat):
+  """
+  Produce the Javascript function to convert a String to a number of milliseconds for a given format.
+  All the tokens are fixed width so the parser is only based on substr calls.
+
+  Example
+  compileParser("DD/MM/YYYY")
+
+  :param jsFormat: The date format (e.g YYYY-MM-DD)
+
+  :return: The Javascript function definition as a String
+  """
+  if jsFormat not in _COMPILED_PARSERS:
+    args, pos = ["1970", "0", "1", "0", "0", "0", "0"], 0
+    for value, isToken in tokenize(jsFormat):
+      if not isToken:
+        pos += len(value)
+        continue
+
+      _, width, index = DATE_TOKENS[value]
+      args[index] = "+s.substr(%s, %s)" % (pos, width)
+      if value == 'MM':
+        args[index] = "%s - 1" % args[index]
+      pos += width
+    _COMPILED_PARSERS[jsFormat] = "function(s){return new Date(%s).getTime()}" % ", ".join(args)
+  return _COMPILED_PARSERS[jsFormat]
+
+
+def toEpochMillis(values):
+  """
+  Convert a sequence of dates to a list of milliseconds since January 1, 1970 00:00:00 UTC.
+
+  NumPy datetime64 arrays and pandas series or indexes are converted in one vectorized step. Other sequences can mix
+  datetime, date and ISO strings. Naive dates are considered as UTC and missing values (None, NaN, NaT) are set to None.
+  The series are formatted with the UTC getters on the Javascript side so the naive dates are displayed unchanged
+
+  Example
+  >>> toEpochMillis(["2019-05-03", datetime.date(2019, 5, 4), None, float("nan")])
+  [1556841600000, 1556928000000, None, None]
+
+  :param values: A sequence of dates
+
+  :return: A list of integers (or None for the missing values)
+  """
+  if type(values).__module__.split(".")[0] in ('numpy', 'pandas'):
+    import numpy
+
+    if getattr(getattr(values, 'dt', values), 'tz', None) is not None:
+      # Timezone aware pandas objects are converted to naive UTC dates
+      values = values.dt.tz_convert(None) if hasattr(values, 'dt') else values.tz_convert(None)
+    array = numpy.asarray(values)
+    if array.dtype.kind in 'MU':
+      array = array.astype('datetime64[ms]')
+      results = array.astype('int64').tolist()
+      for i in numpy.flatnonzero(numpy.isnat(array)).tolist():
+        results[i] = None
+      return results
+
+    values = array.tolist()
+
+  results = []
+  for value in values:
+    if _isMissing(value):
+      results.append(None)
+    elif isinstance(value, datetime.datetime):
+      if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc)
+      results.append(calendar.timegm(value.timetuple()) * 1000 + value.microsecond // 1000)
+    elif isinstance(value, datetime.date):
+      results.append(calendar.timegm(value.timetuple()) * 1000)
+    else:
+      # ISO strings and the numpy datetime64 values of the object arrays
+      results.extend(toEpochMillis([datetime.datetime.fromisoformat(str(value))]))
+  return results
+
+
+def _isMissing(value):
+  """
+  Check if a value of a date sequence is missing (None, NaN, NaT)
+
+  :param value: The value
+
+  :return: A boolean
+  """
+  if value is None:
+    return True
+
+  try:
+    # NaN and NaT are the only values not equal to themselves
+    return bool(value != value)
+
+  except (TypeError, ValueError):
+    return False
+
+
 class JsDate(JsObject.JsObject):
   _jsClass = "Date"
 
@@ -71,6 +243,24 @@ class JsDate(JsObject.JsObject):
     from epyk.core.js.primitives import JsBoolean
     return JsBoolean.JsBoolean("(%(varId)s.getDay() === 6) || (%(varId)s.getDay() === 0)" % {"varId": self.varId}, isPyData=False)
 
+  @classmethod
+  def series(cls, values, varName=None):
+    """
+    Create a series of dates from a Python sequence (list, NumPy datetime64 array, pandas Series...).
+
+    The dates are sent as milliseconds since epoch and the Javascript Date objects are only created when they are
+    used. This is much lighter than a JsDate.new() per value
+
+    Example
+    jsObj.objects.date.series(df["date"], varName="MyDates")
+
+    :param values: A sequence of dates
+    :param varName: Optional, The object variable name
+
+    :return: A Python Javascript Date series
+    """
+    return JsDateSeries.new(values, varName=varName)
+
   @staticmethod
   def now():
     """
@@ -289,6 +479,51 @@ class JsDate(JsObject.JsObject):
     from epyk.core.js.primitives import JsString
     return JsString.JsString("%s.toISOString().replace('T', ' ').slice(0, 19)" % self.varId, isPyData=False)
 
+  def format(self, jsFormat="YYYY-MM-DD"):
+    """
+    Convert the date to a String without any external package (like moment).
+
+    The format is compiled once on the Python side to a small Javascript function.
+    The supported tokens are YYYY, MM, DD, HH, mm, ss and SSS. Text between brackets is escaped
+
+    Example
+    jsObj.objects.date.get("dateTest").format("DD/MM/YYYY")
+
+    :param jsFormat: Optional. The date format. Default YYYY-MM-DD
+
+    :return: A Python Javascript String
+    """
+    from epyk.core.js.primitives import JsString
+
+    return JsString.JsString("(%s)(%s)" % (compileFormat(jsFormat), self.varId), isPyData=False)
+
+  def formatLocale(self, jsObj, locale='en-GB', options=None):
+    """
+    Convert the date to a String according to the locale conventions.
+
+    The Intl.DateTimeFormat object is created only once on the Javascript side for a given (locale, options)
+
+    Example
+    jsObj.objects.date.get("dateTest").formatLocale(jsObj, 'fr-FR', {'year': 'numeric', 'month': 'long'})
+
+    Documentation
+    https://developer.mozilla.org/en-US/docs/Web/JavaScript/Reference/Global_Objects/Intl/DateTimeFormat
+
+    :param jsObj: The base Javascript Python object
+    :param locale: Optional. A BCP 47 language tag. Default en-GB
+    :param options: Optional. The Intl.DateTimeFormat options
+
+    :return: A Python Javascript String
+    """
+    from epyk.core.js.primitives import JsString
+
+    jsObj.extendProto(self, "formatLocale", '''
+      var key = locale + '|' + options, cache = Date.formatters || (Date.formatters = {}), fmt = cache[key];
+      if(fmt === undefined){fmt = cache[key] = new Intl.DateTimeFormat(locale, JSON.parse(options))}; return fmt.format(this)
+      ''', pmts=["locale", "options"])
+    options = json.dumps(json.dumps(options or {}, sort_keys=True))
+    return JsString.JsString("%s.formatLocale(%s, %s)" % (self.varId, json.dumps(locale), options), isPyData=False)
+
   def add(self, n):
     """
     Simple wrapper to the Javascript add method.
@@ -332,3 +567,67 @@ class JsDate(JsObject.JsObject):
       jsObj.return_(jsObj.objects.date.this())
     ], pmts=["n", "weekend"])
     return JsDate("%s.addDays(%s, %s)" % (self.varId, n, json.dumps(weekend)))
+
+
+class JsDateSeries(JsArray.JsArray):
+  """
+  Javascript array of dates stored as milliseconds since epoch.
+
+  The Date objects are only created on the Javascript side when a value is accessed.
+  The naive Python dates are stored as UTC dates, the UTC getters (getUTCHours...) give back their values
+  """
+
+  @classmethod
+  def new(cls, data=None, varName=None, isPyData=True):
+    """
+    Create a Python Javascript Date series
+
+    Example
+    JsDateSeries.new(["2019-05-03", "2019-05-04"], varName="MyDates")
+
+    :param data: Optional, The sequence of dates
+    :param varName: Optional, The object variable name
+    :param isPyData: Optional, Boolean to specify if it is a Python sequence to be converted
+
+    :return: The Python Javascript Date series
+    """
+    if isPyData:
+      data = json.dumps(toEpochMillis(data if data is not None else []), separators=(',', ':'))
+    return cls(data=data, varName=varName, setVar=True, isPyData=False)
+
+  def __getitem__(self, index):
+    """
+    Return the Date for a given position in the series
+
+    Example
+    jsObj.objects.date.series(dates, varName="MyDates")[0].getFullYear()
+
+    :param index: The position in the series
+
+    :return: A Python Javascript Date or null for a missing value
+    """
+    return JsDate("(%(x)s[%(i)s] === null ? null : new Date(%(x)s[%(i)s]))" % {"x": self.varId, "i": index},
+                  isPyData=False)
+
+  def toDates(self):
+    """
+    Create all the Date objects of the series
+
+    :return: A Python Javascript Array of Dates
+    """
+    return JsArray.JsArray("%s.map(function(t){return t === null ? null : new Date(t)})" % self.varId, isPyData=False)
+
+  def format(self, jsFormat="YYYY-MM-DD"):
+    """
+    Convert all the dates of the series to Strings.
+    The Date objects are only temporary and the format is compiled once with the UTC getters
+
+    Example
+    jsObj.objects.date.series(dates, varName="MyDates").format("DD/MM/YYYY")
+
+    :param jsFormat: Optional. The date format. Default YYYY-MM-DD
+
+    :return: A Python Javascript Array of Strings
+    """
+    return JsArray.JsArray("(function(f){return %s.map(function(t){return t === null ? null : f(new Date(t))})})(%s)" % (
+      self.varId, compileFormat(jsFormat, utc=True)), isPyData=False)
@@ -15,10 +15,25 @@ If necessary the tests folder can be updated in order to catch some specific reg
 """
 
 
+import json
+
 from epyk.core.js.primitives import JsObject
 from epyk.core.js import JsMaths
 
 
+# Default locale for the country codes used in the formatMoney function
+COUNTRY_LOCALES = {'UK': 'en-GB', 'US': 'en-US', 'FR': 'fr-FR', 'DE': 'de-DE', 'IT': 'it-IT', 'ES': 'es-ES',
+                   'CH': 'de-CH', 'JP': 'ja-JP'}
+
+# Javascript fragment to get the cached Intl.NumberFormat in a fmt variable
+JS_NUMBER_FORMATTER = '''
+  var key = locale + '|' + decPlaces + '|' + currency, cache = Number.formatters || (Number.formatters = {}), fmt = cache[key];
+  if(fmt === undefined){
+    var opts = {minimumFractionDigits: decPlaces, maximumFractionDigits: decPlaces};
+    if(currency){opts.style = 'currency'; opts.currency = currency};
+    fmt = cache[key] = new Intl.NumberFormat(locale, opts)}'''
+
+
 class JsNumber(JsObject.JsObject):
   _jsClass = "Number"
 
@@ -212,32 +227,72 @@ class JsNumber(JsObject.JsObject):
 
   @classmethod
   def proto(cls, jsObj, fncName):
-    """"""
-    jsObj.extendProto(cls, "formatMoney", '''
-          var n = this, decPlaces = isNaN(decPlaces = Math.abs(decPlaces)) ? 2 : decPlaces, decSeparator = decSeparator == undefined ? "." : decSeparator,
-          thouSeparator = thouSeparator == undefined ? "," : thouSeparator, sign = n < 0 ? "-" : "", i = parseInt(n = Math.abs(+n || 0).toFixed(decPlaces)) + "",
-          j = (j = i.length) > 3 ? j % 3 : 0;
-          return sign + (j ? i.substr(0, j) + thouSeparator : "") + i.substr(j).replace(/(\d{3})(?=\d)/g, "$1" + thouSeparator) + (decPlaces ? decSeparator + Math.abs(n - i).toFixed(decPlaces).slice(2) : "");
-          ''', pmts=["decPlaces", "thouSeparator", "decSeparator"])
+    """
+    Add the predefined function to the Number prototype
+
+    :param jsObj: The base Javascript Python object
+    :param fncName: The function name to be added to the prototype
+    """
+    if fncName == "formatLocale":
+      jsObj.extendProto(cls, "formatLocale", "%s; return fmt.format(this)" % JS_NUMBER_FORMATTER,
+                        pmts=["decPlaces", "locale", "currency"])
+    elif fncName == "formatMoney":
+      cls.proto(jsObj, "formatLocale")
+      # Without locale (unknown country code) the thousands are separated by spaces as before
+      jsObj.extendProto(cls, "formatMoney", '''
+        if(locale){return this.formatLocale(decPlaces, locale, currency)};
+        return this.formatLocale(decPlaces, 'en-US', currency).replace(/,/g, ' ')''',
+                        pmts=["decPlaces", "locale", "currency"])
+
+  def formatLocale(self, jsObj, decPlaces=0, locale='en-GB', currency=None):
+    """
+    Format the number according to the locale conventions.
+
+    The Intl.NumberFormat object is created only once on the Javascript side for a given (locale, decimals, currency)
+    and then shared by all the calls. This is much faster than a regex based formatting for large tables
+
+    Example
+    jsObj.objects.number.get("MyNumber").formatLocale(jsObj, 2, 'fr-FR', currency='EUR')
 
-  def formatMoney(self, jsObj, decPlaces=0, countryCode='UK'):
+    Documentation
+    https://developer.mozilla.org/en-US/docs/Web/JavaScript/Reference/Global_Objects/Intl/NumberFormat
+
+    :param jsObj: The base Javascript Python object
+    :param decPlaces: Optional. The number of decimal. Default 0
+    :param locale: Optional. A BCP 47 language tag. Default en-GB
+    :param currency: Optional. The ISO 4217 currency code (e.g. EUR, USD). Default None
+
+    :return: A Python Javascript String
+    """
+    self.proto(jsObj, "formatLocale")
+    from epyk.core.js.primitives import JsString
+    return JsString.JsString("%s.formatLocale(%s, %s, %s)" % (self.varId, decPlaces, json.dumps(locale), json.dumps(currency)), isPyData=False)
+
+  def formatMoney(self, jsObj, decPlaces=0, countryCode='UK', locale=None, currency=None):
     """
     Wrapper function
 
+    The separators are now coming from the locale and not from a hard coded list of countries.
+    The country code is only used to find the locale when this one is not defined. The unknown country codes keep the
+    previous format (spaces for the thousands and a dot for the decimals), they are never used as a locale
+
+    Example
+    jsObj.objects.number.get("MyNumber").formatMoney(jsObj, 2, locale='de-DE')
+
     Documentation
     https://en.wikipedia.org/wiki/Decimal_separator
     https://docs.oracle.com/cd/E19455-01/806-0169/overview-9/index.html
 
     :param jsObj: The base Javascript Python object
     :param decPlaces: The number of decimal
-    :return:
+    :param countryCode: Optional. The country code used to find the locale. Default UK
+    :param locale: Optional. A BCP 47 language tag. Default the locale of the country code
+    :param currency: Optional. The ISO 4217 currency code. Default None
+
+    :return: A Python Javascript String
     """
-    thouSeparator, decSeparator = (",", ".") if countryCode.upper() in ["UK", 'US'] else (" ", ".")
-    jsObj.extendProto(self, "formatMoney", '''
-      var n = this, decPlaces = isNaN(decPlaces = Math.abs(decPlaces)) ? 2 : decPlaces, decSeparator = decSeparator == undefined ? "." : decSeparator,
-      thouSeparator = thouSeparator == undefined ? "," : thouSeparator, sign = n < 0 ? "-" : "", i = parseInt(n = Math.abs(+n || 0).toFixed(decPlaces)) + "",
-      j = (j = i.length) > 3 ? j % 3 : 0;
-      return sign + (j ? i.substr(0, j) + thouSeparator : "") + i.substr(j).replace(/(\d{3})(?=\d)/g, "$1" + thouSeparator) + (decPlaces ? decSeparator + Math.abs(n - i).toFixed(decPlaces).slice(2) : "");
-      ''', pmts=["decPlaces", "thouSeparator", "decSeparator"])
+    if locale is None:
+      locale = COUNTRY_LOCALES.get(countryCode.upper())
+    self.proto(jsObj, "formatMoney")
     from epyk.core.js.primitives import JsString
-    return JsString.JsString("%s.formatMoney(%s, '%s', '%s')" % (self.varId, decPlaces, thouSeparator, decSeparator), isPyData=False)
+    return JsString.JsString("%s.formatMoney(%s, %s, %s)" % (self.varId, decPlaces, json.dumps(locale), json.dumps(currency)), isPyData=False)
@@ -3,13 +3,76 @@ Module dedicated to wrap the Javascript Object
 
 """
 
+import copy
 import json
+import collections
 
 from epyk.core.js import JsUtils
 
 _JSVARS = 0
 
 
+class JsFlyweights(object):
+  """
+  Pool of the Javascript keywords which cannot change (e.g. true, false, null, undefined).
+
+  Identical keywords (same class and same reference) are shared instead of being created again and again in the Python
+  loops used to build the components. Objects which can be used as variables (this, array.length...) are never shared
+  as setVar, freeze and seal change them in place. The least recently used keywords are removed when the pool is full
+  """
+
+  def __init__(self, maxsize=10000):
+    self.maxsize, self._pool = maxsize, collections.OrderedDict()
+    self.hits, self.misses = 0, 0
+
+  def ref(self, cls, varName):
+    """
+    Return the shared Javascript object for a given keyword
+
+    Example
+    FLYWEIGHTS.ref(JsBoolean.JsBoolean, "true")
+
+    :param cls: The Python Javascript class
+    :param varName: The Javascript keyword
+
+    :return: The shared Python Javascript object
+    """
+    key = (cls, varName)
+    obj = self._pool.get(key)
+    if obj is not None:
+      self.hits += 1
+      self._pool.move_to_end(key)
+      return obj
+
+    self.misses += 1
+    if len(self._pool) >= self.maxsize:
+      self._pool.popitem(last=False)
+    obj = cls.get(varName)
+    obj._interned = True
+    self._pool[key] = obj
+    return obj
+
+  def stats(self):
+    """
+    Return the pool counters
+
+    :return: A dictionary with the size, the hits, the misses and the hit rate of the pool
+    """
+    total = self.hits + self.misses
+    return {"size": len(self._pool), "hits": self.hits, "misses": self.misses,
+            "hit_rate": float(self.hits) / total if total else 0.0}
+
+  def clear(self):
+    """
+    Clear the pool and reset the counters
+    """
+    self._pool.clear()
+    self.hits, self.misses = 0, 0
+
+
+FLYWEIGHTS = JsFlyweights()
+
+
 class JsKeyword(object):
   def __init__(self, keyword):
     self.__keyword = keyword
@@ -23,6 +86,7 @@ class JsKeyword(object):
 
 class JsObject(object):
   _jsClass = "Object"
+  _interned = False
 
   def __init__(self, data, varName=None, setVar=False, isPyData=False):
     """
@@ -124,6 +188,9 @@ class JsObject(object):
     if varName is None:
       return self
 
+    if self._interned:
+      raise Exception("Cannot set a variable on the shared Javascript keyword %s, use new() instead" % self.varId)
+
     if varName != self.varName:
       if len(self._js) == 1:
         if self._js[0].startswith("var "):
@@ -137,6 +204,20 @@ class JsObject(object):
       self._js.append("%s %s = %s" % (varType, varName, self.varData))
     return self
 
+  def _mutable(self):
+    """
+    Return an object which can be changed.
+    Shared objects from the FLYWEIGHTS pool are copied and the other ones are returned directly
+
+    :return: The Python Javascript Object
+    """
+    if not self._interned:
+      return self
+
+    obj = copy.copy(self)
+    obj._interned, obj._js = False, list(self._js)
+    return obj
+
   def prototype(self, name, value):
     """
     The prototype property allows you to add new properties and methods to existing object types.
@@ -379,6 +460,7 @@ class JsObject(object):
     if self.varName is None:
       raise Exception("Variable name must be defined")
 
+    self._sealed = True
     return JsObject("Object.seal(%s)" % self.varName)
 
   def assign(self, target, sources, jsObj=None):
@@ -126,7 +126,7 @@ class JsObjects(object):
 
     :return: A Python Js Null object
     """
-    return JsObject.JsObject("null")
+    return JsObject.FLYWEIGHTS.ref(JsObject.JsObject, "null")
 
   @property
   def undefined(self):
@@ -138,7 +138,7 @@ class JsObjects(object):
 
     :return: A Python Js undefined object
     """
-    return JsObject.JsObject("undefined", isPyData=False)
+    return JsObject.FLYWEIGHTS.ref(JsObject.JsObject, "undefined")
 
   @property
   def NaN(self):
@@ -169,7 +169,7 @@ class JsObjects(object):
 
     :return: A Python Js True object
     """
-    return JsBoolean.JsBoolean.get('true')
+    return JsObject.FLYWEIGHTS.ref(JsBoolean.JsBoolean, "true")
 
   @property
   def false(self):
@@ -181,7 +181,7 @@ class JsObjects(object):
     
     :return: A Python Js False object
     """
-    return JsBoolean.JsBoolean.get('false')
+    return JsObject.FLYWEIGHTS.ref(JsBoolean.JsBoolean, "false")
 
   def proto(self, fncName):
     """
@@ -191,7 +191,8 @@ class JsObjects(object):
     :return:
     """
     _PROTO_MAPS = {
-      "formatMoney": [JsNumber.JsNumber]
+      "formatMoney": [JsNumber.JsNumber],
+      "formatLocale": [JsNumber.JsNumber, JsArray.JsArray],
     }
 
     for obj in _PROTO_MAPS.get(fncName, []):
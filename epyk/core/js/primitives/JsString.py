@@ -430,18 +430,22 @@ class JsString(JsObject.JsObject):
 
     return JsArray("%s.splitEmptyArray('%s')" % (self.varId, separator), isPyData=False)
 
-  def formatMoney(self, jsObj, decPlaces, countryCode='UK'):
+  def formatMoney(self, jsObj, decPlaces, countryCode='UK', locale=None, currency=None):
     """
+    Convert the string to a number and format it according to the locale conventions
 
-    :param jsObj:
-    :param decPlaces:
-    :param countryCode:
+    Example
+    jsObj.objects.string.get("MyValue").formatMoney(jsObj, 2, locale='fr-FR', currency='EUR')
 
-    :return:
+    :param jsObj: The base Javascript Python object
+    :param decPlaces: The number of decimal
+    :param countryCode: Optional. The country code used to find the locale. Default UK
+    :param locale: Optional. A BCP 47 language tag. Default the locale of the country code
+    :param currency: Optional. The ISO 4217 currency code. Default None
+
+    :return: A Python Javascript String
     """
-    jsObj.extendProto(self, "formatMoney", '''var n = parseFloat(this); n.formatMoney(decPlaces, thouSeparator, decSeparator);
-      ''', pmts=["decPlaces", "thouSeparator", "decSeparator"])
-    return self.parseFloat().formatMoney(jsObj, decPlaces, countryCode)
+    return self.parseFloat().formatMoney(jsObj, decPlaces, countryCode, locale=locale, currency=currency)
 
   def parseFloat(self):
     """
@@ -471,11 +475,24 @@ class JsString(JsObject.JsObject):
 
   def toDate(self, jsFormat="YYYY-MM-DD"):
     """
+    Convert the string to a Javascript Date without any external package (like moment).
 
-    :return:
+    ISO formats are directly given to the Date constructor, the other formats are parsed by a small function
+    generated on the Python side. The supported tokens are YYYY, MM, DD, HH, mm, ss and SSS.
+    The ISO date only strings (YYYY-MM-DD) are UTC dates, all the other formats give local dates
+
+    Example
+    JsString.new("03/08/2019", "testDate").toDate("DD/MM/YYYY")
+
+    :param jsFormat: Optional. The format of the string date. Default YYYY-MM-DD
+
+    :return: A Python Javascript Date
     """
     from epyk.core.js.primitives import JsDate
 
-    jsDate = JsDate.JsDate.new("%s" % self.varId, isPyData=False)
+    if jsFormat in JsDate.ISO_FORMATS:
+      jsDate = JsDate.JsDate.new(JsDate.ISO_FORMATS[jsFormat] % self.varId, isPyData=False)
+    else:
+      jsDate = JsDate.JsDate.new("(%s)(%s)" % (JsDate.compileParser(jsFormat), self.varId), isPyData=False)
     jsDate._js = self._js + jsDate._js
     return jsDate
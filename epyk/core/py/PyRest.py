@@ -90,7 +90,8 @@ class PyRest(object):
 
     return urlopen(request).read()
 
-  def request(self, url, data=None, method=None, encoding='utf-8', headers=None, unverifiable=False, proxy=None):
+  def request(self, url, data=None, method=None, encoding='utf-8', headers=None, unverifiable=False, proxy=None,
+              timeout=None):
     """
     Run a external REST call using a specific method (PUT, DELETE, OPTIONS, HEAD, PUT, PATCH...).
 
@@ -111,11 +112,15 @@ class PyRest(object):
     :param headers: Optional. Should be a dictionary, and will be treated as if add_header() was called with each key and value as arguments
     :param unverifiable: Optional. Should indicate whether the request is unverifiable, as defined by RFC 2965
     :param proxy: Optional.
+    :param timeout: Optional. The timeout in seconds of the connection. Default the socket default timeout
 
     :return: The content of the REST call as a String
     """
     request = Request(url, json.dumps(data or {}).encode(encoding=encoding), method=method, headers={} if headers is None else headers,
                       unverifiable=unverifiable)
+    if timeout is not None:
+      return urlopen(request, timeout=timeout).read()
+
     return urlopen(request).read()
 
   def webscrapping(self, url, data=None, encoding='utf-8', headers=None, unverifiable=False, proxy=None):
@@ -0,0 +1,108 @@
+"""
+Tests and size benchmarks of the extraction of the repeated inline styles
+"""
+
+import os
+import re
+import time
+
+from epyk.core.css import CssAtomic
+
+
+OUTS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'outs')
+
+
+def effective(html, styles):
+  """
+  Return the declarations of each element, coming either from the inline style or from an atomic class
+  """
+  rules = dict((selector[1:], CssAtomic.declarations(definition.strip("{} "))) for selector, definition in styles.items())
+  elements = []
+  for tag in re.findall(r"<[a-zA-Z][^>]*>", re.sub(r"<script.*?</script>", "", html, flags=re.S)):
+    style = re.search(r"""style=["']([^"']*)["']""", tag)
+    classes = re.search(r"""class=["']([^"']*)["']""", tag)
+    found = set(CssAtomic.declarations(style.group(1))) if style else set()
+    for name in classes.group(1).split() if classes else []:
+      found.update(rules.get(name, []))
+    elements.append(found)
+  return elements
+
+
+def page(rows):
+  cells = []
+  for i in range(rows):
+    cells.append(
+      "<tr><td style='text-align:center;vertical-align:middle;width:80px;height:30px;background:#%06x'>%s</td>"
+      "<td class='py_csscell' style=\"padding:0 5px;font-family:Calibri;font-size:12px;color:#000\">%s</td></tr>" % (i * 997 % 0xFFFFFF, i, i))
+  return "<html><head><title>Test</title></head><body><table>%s</table></body></html>" % "".join(cells)
+
+
+def test_declarations():
+  assert CssAtomic.declarations("background:url(data:image/png;base64,AA); Color : red") == [
+    'background:url(data:image/png;base64,AA)', 'color:red']
+
+
+def test_red_page():
+  with open(os.path.join(OUTS, 'colors', 'red.html')) as f:
+    html = f.read()
+  result, styles = CssAtomic.extract(html)
+  assert len(styles) == 4
+  assert effective(result, styles) == effective(html, {})
+  assert len(CssAtomic.atomize(html)) < 0.8 * len(html)
+
+
+def test_large_page():
+  html = page(5000)
+  start = time.time()
+  result = CssAtomic.atomize(html)
+  duration = time.time() - start
+  print("Atomic classes: %s bytes -> %s bytes in %.2fs" % (len(html), len(result), duration))
+  # The cells with a class attribute are only changed with important
+  assert len(result) < 0.9 * len(html)
+  assert result.count('class=\'py_csscell\' style="padding:0 5px;font-family:Calibri;font-size:12px;color:#000"') == 5000
+  assert "<style>" in result.split("</head>")[0]
+  assert len(CssAtomic.atomize(html, important=True)) < 0.7 * len(html)
+
+
+def test_keep_scripts_and_classes():
+  html = "<div class='a' style='width:80px'></div>" * 20 + "<script>var a = \"<div style='width:80px'>\"</script>"
+  assert CssAtomic.extract(html) == (html, {})
+  result, styles = CssAtomic.extract(html, important=True)
+  assert styles == {'.py_a0': '{ width:80px !important; }'}
+  assert result.count("<div class='a py_a0'></div>") == 20
+  assert result.endswith("<script>var a = \"<div style='width:80px'>\"</script>")
+
+
+def test_page_styles_stay_inline():
+  # The inline width must keep its priority over the class a defined in the page
+  html = "<style>.a{margin:0;width:10px}</style><div class='a' style='width:80px;height:30px'></div>"
+  html += "<div style='width:80px;height:30px;margin-top:5px'></div>" * 20
+  result, styles = CssAtomic.extract(html)
+  assert styles == {'.py_a0': '{ height:30px; }'}
+  assert result.startswith("<style>.a{margin:0;width:10px}</style><div class='a' style='width:80px;height:30px'></div>")
+  assert result.count("<div style='width:80px;margin-top:5px' class='py_a0'></div>") == 20
+
+
+def test_no_gain():
+  html = "<div style='width:1px'></div><div style='width:1px'></div>"
+  assert CssAtomic.extract(html) == (html, {})
+
+
+def test_repeated_properties_stay_inline():
+  html = "<div style='display:-webkit-box;display:flex;width:80px'></div>" * 20
+  html += "<div style='display:flex;width:80px'></div>" * 20
+  result, styles = CssAtomic.extract(html)
+  assert sorted(definition for definition in styles.values()) == ['{ display:flex; }', '{ width:80px; }']
+  assert result.count("style='display:-webkit-box;display:flex'") == 20
+  assert effective(result, styles) == effective(html, {})
+
+
+def test_custom_properties_case():
+  assert CssAtomic.declarations("--Main-Color: Red; COLOR: var(--Main-Color)") == [
+    '--Main-Color:Red', 'color:var(--Main-Color)']
+
+
+def test_stable_names():
+  html = "<div style='width:80px;height:30px'></div>" * 20
+  _, styles = CssAtomic.extract(html)
+  assert styles == {'.py_a0': '{ width:80px; }', '.py_a1': '{ height:30px; }'}
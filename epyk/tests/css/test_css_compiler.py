@@ -0,0 +1,40 @@
+"""
+Tests of the precompiled stylesheets
+"""
+
+import os
+import json
+
+import pytest
+
+pytest.importorskip("epyk.core.css.Color")
+
+from epyk.core.cli import CssCompiler
+from epyk.core.css import CssCache
+from epyk.core.css.styles import CssStyle
+from epyk.core.css.themes import ThemeDark
+
+
+def test_compiler(tmpdir):
+  path = str(tmpdir)
+  assert CssCompiler.main(['--path', path, '--themes', 'ThemeDark', 'ThemeRed', '--variables', '--quiet']) == 0
+  with open(os.path.join(path, "manifest.json")) as f:
+    manifest = json.load(f)
+  assert manifest['default'] == CssCache.themeKey(ThemeDark.ThemeDark)
+  assert sorted(record['name'] for record in manifest['themes'].values()) == ['ThemeDark', 'ThemeRed']
+  for record in manifest['themes'].values():
+    assert os.path.exists(os.path.join(path, record['file']))
+
+  CssCache.loadManifest(path)
+  try:
+    assert CssCache.precompiled() == manifest['themes'][manifest['default']]['file']
+    assert CssCache.isPrecompiled(CssStyle.getCssObj('CssButtonBasic', theme=ThemeDark.ThemeDark))
+    assert not CssCache.isPrecompiled(CssStyle.getCssObj('CssButtonBasic', theme=ThemeDark.ThemeDark).css('color', 'red'))
+    assert not CssCache.isPrecompiled(CssStyle.getCssObj('CssButtonBasic', theme=ThemeDark.ThemeDark, colors={'colors': {1: 'red'}}))
+  finally:
+    CssCache.MANIFEST = None
+
+
+def test_unknown_theme(tmpdir):
+  with pytest.raises(SystemExit):
+    CssCompiler.main(['--path', str(tmpdir), '--themes', 'ThemeUnknown'])
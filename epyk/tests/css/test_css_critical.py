@@ -0,0 +1,71 @@
+"""
+Tests of the critical CSS split
+"""
+
+import os
+
+from epyk.core.css import CssCritical
+
+
+class Report(object):
+  def __init__(self):
+    self._props = {}
+
+
+class Css(object):
+  def __init__(self, classname, styles):
+    self.classname, self.styles = classname, styles
+
+  def getStyles(self):
+    return dict(self.styles)
+
+
+BUTTON = Css('py_cssbutton', {'.py_cssbutton': '{ color: red; }', '.py_cssbutton:hover': '{ color: blue; }'})
+TABLE = Css('py_csstable', {'.py_csstable': '{ margin: 0px; }', '.py_csstable .py_cssbutton': '{ width: 100%; }'})
+FOOTER = Css('py_cssfooter', {'.py_cssfooter': '{ padding: 5px; }', 'body': '{ margin: 0 }'})
+
+
+def test_usage():
+  report = Report()
+  CssCritical.track(report, [BUTTON, 'py_csstable'])
+  CssCritical.fold(report)
+  CssCritical.track(report, [FOOTER, 'py_cssbutton'])
+  assert CssCritical.usage(report).critical == {'py_cssbutton', 'py_csstable'}
+
+
+def test_split():
+  styles = dict(TABLE.getStyles(), **FOOTER.getStyles())
+  critical, deferred = CssCritical.split(styles, {'py_csstable'})
+  assert list(critical) == ['.py_csstable', 'body']
+  assert list(deferred) == ['.py_csstable .py_cssbutton', '.py_cssfooter']
+
+
+def test_html(tmpdir):
+  report = Report()
+  CssCritical.track(report, BUTTON)
+  CssCritical.fold(report)
+  CssCritical.track(report, FOOTER)
+  html = CssCritical.html(report, [BUTTON, TABLE, FOOTER], path=str(tmpdir), url="/css/")
+  critical, link = html.split("\n")[:2]
+  assert critical == '<style>.py_cssbutton{color:red}.py_cssbutton:hover{color:blue}body{margin:0}</style>'
+  assert 'rel="preload"' in link
+  sheet = os.listdir(str(tmpdir))[0]
+  assert '"/css/%s"' % sheet in link
+  with open(os.path.join(str(tmpdir), sheet)) as f:
+    assert f.read() == ".py_csstable{margin:0}.py_csstable .py_cssbutton{width:100%}.py_cssfooter{padding:5px}"
+
+
+def test_split_keeps_cascade():
+  styles = {'.py_cssfooter .py_cssbutton': '{ color: blue; }', '.py_cssbutton': '{ color: red; }',
+            '.py_cssfooter': '{ padding: 5px; }'}
+  critical, deferred = CssCritical.split(styles, {'py_cssbutton'})
+  # The first selector is not critical but it would override the critical one if it was loaded after it
+  assert list(critical) == ['.py_cssfooter .py_cssbutton', '.py_cssbutton']
+  assert list(deferred) == ['.py_cssfooter']
+
+
+def test_html_no_path():
+  report = Report()
+  CssCritical.track(report, TABLE)
+  html = CssCritical.html(report, [TABLE, FOOTER])
+  assert html == '<style>.py_csstable,body{margin:0}.py_csstable .py_cssbutton{width:100%}.py_cssfooter{padding:5px}</style>'
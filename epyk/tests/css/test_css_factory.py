@@ -0,0 +1,129 @@
+"""
+Tests of the CSS factory and its overlays
+"""
+
+import json
+import time
+import concurrent.futures
+
+import pytest
+
+pytest.importorskip("epyk.core.css.Color")
+
+from epyk.core.css import CssCache
+from epyk.core.css import CssCritical
+from epyk.core.css.styles import CssStyle
+
+
+def render(i):
+  with CssStyle.overlay():
+    CssStyle.setCssObj('CssButtonBasic', {'render': i}, None, forceReload=True)
+    time.sleep(0.001)
+    return CssStyle.getCssObj('CssButtonBasic')
+
+
+def test_overlays_threads():
+  with concurrent.futures.ThreadPoolExecutor(8) as pool:
+    results = list(pool.map(render, range(64)))
+  assert results == [{'render': i} for i in range(64)]
+  assert CssStyle.getCssObj('CssButtonBasic').__class__.__name__ == 'CssButtonBasic'
+
+
+def test_copy_on_write():
+  snapshot = CssStyle.load()
+  CssStyle.setCssObj('CssTestOverride', {'test': True}, None)
+  assert 'CssTestOverride' not in snapshot
+  assert CssStyle.getCssObj('CssTestOverride') == {'test': True}
+  with pytest.raises(TypeError):
+    CssStyle.factory['CssTestOverride'] = None
+  CssStyle.load(reset=True)
+  assert CssStyle.getCssObj('CssTestOverride') is None
+
+
+def test_clone():
+  cssObj = CssStyle.getCssObj('CssButtonBasic')
+  assert cssObj.clone('CssButtonTest') is cssObj.clone('CssButtonTest')
+  assert cssObj.clone('CssButtonTest').name == 'CssButtonTest'
+
+
+def test_shared_instances():
+  cssObj1, cssObj2 = CssStyle.getCssObj('CssButtonBasic'), CssStyle.getCssObj('CssButtonBasic')
+  assert cssObj1 is not cssObj2 and cssObj1.style._data is cssObj2.style._data
+  styles = cssObj2.getStyles()
+  cssObj1.css('color', 'pink', eventAttrs={'hover': {'color': 'blue'}})
+  assert cssObj1.style._data is not cssObj2.style._data
+  assert cssObj2.getStyles() == styles
+  assert 'pink' not in "".join(CssStyle.getCssObj('CssButtonBasic').getStyles().values())
+  assert 'pink' in cssObj1.getStyles()['.py_cssbuttonbasic']
+
+
+class Report(object):
+  def __init__(self):
+    self._props = {}
+
+
+def test_cache_key_without_report():
+  cssObj1, cssObj2 = CssStyle.getCssObj('CssButtonBasic', Report()), CssStyle.getCssObj('CssButtonBasic', Report())
+  assert cssObj1._cacheKey == cssObj2._cacheKey == ('CssButtonBasic', None, None)
+  assert cssObj1.style._data is cssObj2.style._data
+
+
+def test_reset_clears_compiled_styles():
+  CssStyle.getCssObj('CssButtonBasic').getStyles()
+  assert CssCache.CACHE.stats()['size'] > 0
+  CssStyle.load(reset=True)
+  assert CssCache.CACHE.stats()['size'] == 0
+
+
+def test_report_classnames_tracked():
+  report = Report()
+  CssStyle.getCssObj('CssButtonBasic', report)
+  CssCritical.fold(report)
+  CssStyle.getCssObj('CssDataTableEven', report)
+  assert CssCritical.usage(report).critical == {'py_cssbuttonbasic'}
+  assert set(CssCritical.usage(report).classnames) == {'py_cssbuttonbasic', 'py_cssdatatableeven'}
+
+
+def test_shared_style_copy_on_write():
+  cssObj = CssStyle.getCssObj('CssButtonBasic')
+  cssObj.style['color'] = 'pink'
+  cssObj.eventsStyles['hover'].update({'color': 'blue'})
+  assert cssObj._cacheKey is None
+  styles = cssObj.getStyles()
+  assert 'pink' in styles['.py_cssbuttonbasic'] and 'blue' in styles['.py_cssbuttonbasic:hover']
+  other = CssStyle.getCssObj('CssButtonBasic')
+  assert other._cacheKey is not None
+  assert 'pink' not in other.style.values() and 'blue' not in other.eventsStyles['hover'].values()
+  assert 'pink' not in "".join(other.getStyles().values())
+  with pytest.raises(TypeError):
+    CssStyle.instances.get(other._cacheKey).style['color'] = 'pink'
+
+
+def test_shared_instances_without_report():
+  report = Report()
+  cssObj = CssStyle.getCssObj('CssButtonBasic', report)
+  assert cssObj.rptObj is report
+  assert CssStyle.instances.get(cssObj._cacheKey).rptObj is None
+
+
+def test_stylesheet_index_uses_definition(tmp_path):
+  # Same factory key for two definitions of the class (e.g. before and after a deploy)
+  key = ('CssButtonBasic', 'deploy', None)
+  cssObj = CssStyle.getCssCls('CssButtonBasic')(None)
+  cssObj._cacheKey = key
+  sheet = CssCache.StylesCache().stylesheet([cssObj], str(tmp_path))
+  assert CssCache.StylesCache().stylesheet([cssObj], str(tmp_path)) == sheet
+  cssObj.style['color'] = 'pink'
+  CssCache.CACHE.invalidate('CssButtonBasic')
+  newSheet = CssCache.StylesCache().stylesheet([cssObj], str(tmp_path))
+  assert newSheet != sheet and 'pink' in (tmp_path / newSheet).read_text()
+  assert len(json.loads((tmp_path / "index.json").read_text())) == 2
+  CssCache.CACHE.invalidate('CssButtonBasic')
+
+
+def test_styles_cache_second_chance():
+  cache = CssCache.StylesCache(maxsize=2)
+  cache.set('a', {}), cache.set('b', {})
+  cache.get('a')
+  cache.set('c', {})
+  assert (cache.get('a'), cache.get('b'), cache.get('c')) == ({}, None, {})
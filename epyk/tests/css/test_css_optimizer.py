@@ -0,0 +1,89 @@
+"""
+Tests of the CSS optimizer.
+
+The byte size tests are building all the CSS classes of the registry for each theme
+"""
+
+import importlib
+
+import pytest
+
+from epyk.core.css import CssOptimizer
+from epyk.core.css.styles import CssRegistry
+
+
+def test_parse():
+  assert CssOptimizer.parse("{ color: red; background: url(data:image/png;base64,AA); margin: 0 !IMPORTANT; }") == [
+    ('color', 'red', False), ('background', 'url(data:image/png;base64,AA)', False), ('margin', '0', True)]
+
+
+def test_overridden():
+  declarations = CssOptimizer.parse("{ color: red; margin-top: 2px; color: blue; margin: 0; border: 1px !important; border: 0 }")
+  assert CssOptimizer.removeOverridden(declarations) == [('color', 'blue', False), ('margin', '0', False), ('border', '1px', True)]
+
+
+def test_custom_properties_case():
+  assert CssOptimizer.parse("{ --Main-Color: Red; COLOR: var(--Main-Color) }") == [
+    ('--Main-Color', 'Red', False), ('color', 'var(--Main-Color)', False)]
+
+
+def test_fallbacks():
+  declarations = CssOptimizer.parse("{ display: -webkit-box; display: flex; width: 10px; width: calc(100% - 2px) }")
+  assert CssOptimizer.removeOverridden(declarations) == declarations
+  assert CssOptimizer.removeOverridden(CssOptimizer.parse("{ display: block; display: inline; display: -ms-flexbox }")) == [
+    ('display', 'inline', False), ('display', '-ms-flexbox', False)]
+
+
+def test_zero_units_in_functions():
+  assert CssOptimizer.minifyValue("calc(100% - 0px) 0px") == "calc(100% - 0px) 0"
+  assert CssOptimizer.minifyValue("max(0em, min(0px, 1em))") == "max(0em, min(0px, 1em))"
+
+
+def test_collapse():
+  declarations = CssOptimizer.parse("{ padding-top: 1px; padding-right: 2px; padding-bottom: 3px; padding-left: 2px }")
+  assert CssOptimizer.collapse(declarations) == [('padding', '1px 2px 3px', False)]
+  # Different priorities cannot be collapsed
+  declarations = CssOptimizer.parse("{ margin-top: 0 !important; margin-right: 0; margin-bottom: 0; margin-left: 0 }")
+  assert CssOptimizer.collapse(declarations) == declarations
+  # Only the single values can be collapsed
+  declarations = CssOptimizer.parse("{ border-width: 1px 2px; border-style: solid; border-color: red }")
+  assert CssOptimizer.collapse(declarations) == declarations
+  declarations = CssOptimizer.parse("{ border-width: calc(1px + 1em); border-style: solid; border-color: red }")
+  assert CssOptimizer.collapse(declarations) == [('border', 'calc(1px + 1em) solid red', False)]
+
+
+def test_grouping():
+  styles = {'.a': '{ color: #FFFFFF; }', '.b': '{ color: red }', '.c': '{ color: #FFF }', '.d': '{ margin: 0px }', '.e': '{ margin: 0 }'}
+  assert CssOptimizer.optimize(styles) == {'.a': '{color:#FFF}', '.b': '{color:red}', '.c': '{color:#FFF}', '.d,.e': '{margin:0}'}
+
+
+def test_grouping_shorthands():
+  styles = {'.x': '{ margin: 0; }', '.y': '{ margin-top: 5px; }', '.z': '{ margin: 0; }'}
+  assert CssOptimizer.minify(styles) == ".x{margin:0}.y{margin-top:5px}.z{margin:0}"
+  styles = {'.x': '{ border: 1px solid red; }', '.y': '{ border-top-color: blue; }', '.z': '{ border: 1px solid red; }'}
+  assert CssOptimizer.minify(styles) == ".x{border:1px solid red}.y{border-top-color:blue}.z{border:1px solid red}"
+  styles = {'.x': '{ border-top: 0; }', '.y': '{ border-left: 1px; }', '.z': '{ border-top: 0; }'}
+  assert CssOptimizer.minify(styles) == ".x,.z{border-top:0}.y{border-left:1px}"
+
+
+def test_vendor_selectors():
+  styles = {'.a::-webkit-scrollbar': '{ width: 0 }', '.b': '{ width: 0 }'}
+  assert CssOptimizer.minify(styles) == ".a::-webkit-scrollbar{width:0}.b{width:0}"
+
+
+@pytest.mark.parametrize("themeName", ["ThemeBlue", "ThemeDark", "ThemeRed", "ThemeGreen"])
+def test_themes_size(themeName):
+  pytest.importorskip("epyk.core.css.Color")
+  from epyk.core.css.styles import CssStyle
+
+  theme = getattr(importlib.import_module("epyk.core.css.themes.%s" % themeName), themeName)
+  raw, optimized = 0, 0
+  for clsName in CssRegistry.CLASSES:
+    cssObj = CssStyle.getCssObj(clsName, theme=theme)
+    if cssObj is None:
+      continue
+
+    styles = cssObj.getStyles()
+    raw += len("".join(["%s %s" % (selector, definition) for selector, definition in styles.items()]))
+    optimized += len(CssOptimizer.minify(styles))
+  assert 0 < optimized < raw
@@ -0,0 +1,16 @@
+"""
+Check that the generated registry of the CSS classes is in line with the styles modules.
+
+If this test is failing the registry should be refreshed with: python -m epyk.core.css.styles.CssRegistry
+"""
+
+from epyk.core.css.styles import CssRegistry
+
+
+def test_registry_up_to_date():
+  assert CssRegistry.scan() == CssRegistry.CLASSES
+
+
+def test_registry_modules():
+  assert CssRegistry.CLASSES['CssButtonBasic'] == 'CssStylesButton'
+  assert CssRegistry.CLASSES['CssDataTableEven'] == 'CssStylesTable'
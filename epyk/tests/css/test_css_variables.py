@@ -0,0 +1,56 @@
+"""
+Tests of the themes compiled to CSS variables
+"""
+
+import pytest
+
+pytest.importorskip("epyk.core.css.Color")
+
+from epyk.core.css import Palette
+from epyk.core.css.styles import CssStyle
+from epyk.core.css.styles import CssRegistry
+from epyk.core.css.themes import ThemeBlue
+from epyk.core.css.themes import ThemeDark
+
+
+def test_variables_palette():
+  palette = Palette.get(Palette.VARIABLES)
+  assert palette.get('colors', 3) == 'var(--epyk-colors-3)'
+  assert palette.get('greys', -1) == 'var(--epyk-greys-n1)'
+  assert palette.overlay({'colors': {-1: 'orange'}}).get('colors', -1) == 'orange'
+
+
+def test_stylesheet_themes():
+  # The same stylesheet is used by all the themes
+  for clsName in CssRegistry.CLASSES:
+    styles = CssStyle.getCssObj(clsName, theme=Palette.VARIABLES).getStyles()
+    for color in Palette.get(ThemeBlue.ThemeBlue).colors('colors'):
+      assert color not in "".join(styles.values())
+
+
+def test_themes_css():
+  css = Palette.themesCss(ThemeBlue.ThemeBlue, [ThemeDark.ThemeDark]).split("\n")
+  assert css[0].startswith(":root{--epyk-colors-0:%s;" % ThemeBlue.ThemeBlue.colors[0])
+  assert css[1].startswith(".epyk-theme-dark{")
+  assert "--epyk-greys-n1:%s" % ThemeDark.ThemeDark.greys[-1] in css[1]
+
+
+class Report(object):
+  def __init__(self):
+    self._props = {}
+
+
+def test_report_palette_shared_per_theme():
+  first, second = Report(), Report()
+  assert Palette.get(None, first) is Palette.get(None, second) is Palette.get()
+  Palette.useTheme(first, ThemeDark.ThemeDark)
+  assert Palette.get(None, first) is Palette.get(ThemeDark.ThemeDark)
+  Palette.useVariables(second)
+  assert Palette.get(None, second) is Palette.get(Palette.VARIABLES)
+  Palette.useVariables(second, False)
+  assert Palette.get(None, second) is Palette.get()
+
+
+def test_color_override_with_variables():
+  cssObj = CssStyle.getCssObj('CssButtonBasic', theme=Palette.VARIABLES)
+  assert cssObj.color('colors', 3, '#123456') is not None
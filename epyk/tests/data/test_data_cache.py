@@ -0,0 +1,106 @@
+"""
+Tests of the data cache
+"""
+
+import os
+import time
+import pickle
+
+import pytest
+
+from epyk.core.data import DataCache
+
+
+def test_memory_and_disk(tmpdir):
+  cache = DataCache.DataCache(str(tmpdir))
+  cache.set("prices", {'a': [1, 2, 3]})
+  assert cache.get("prices") == {'a': [1, 2, 3]}
+  assert cache.stats()['memory']['hits'] == 1
+
+  # A new process only has the disk tier
+  cache = DataCache.DataCache(str(tmpdir))
+  assert cache.get("prices") == {'a': [1, 2, 3]}
+  assert cache.get("prices") == {'a': [1, 2, 3]}
+  stats = cache.stats()
+  assert stats['disk']['hits'] == 1 and stats['memory']['hits'] == 1
+  assert cache.get("unknown") is None and not cache.exists("unknown")
+
+
+def test_ttl(tmpdir):
+  cache = DataCache.DataCache(str(tmpdir))
+  cache.set("prices", [1, 2], ttl=0.05)
+  assert cache.exists("prices")
+  time.sleep(0.1)
+  assert cache.get("prices") is None
+  assert not os.path.exists(os.path.join(str(tmpdir), "prices"))
+
+  cache.set("old", 1, ttl=0.01)
+  cache.set("new", 2)
+  time.sleep(0.05)
+  assert cache.disk.purge() == 1
+  assert os.listdir(str(tmpdir)) == ["new"]
+
+
+def test_lru_bytes(tmpdir):
+  cache = DataCache.DataCache(str(tmpdir), max_bytes=3000)
+  for i in range(5):
+    cache.set("data%s" % i, "x" * 1000)
+  stats = cache.stats()['memory']
+  assert stats['entries'] == 2 and stats['evictions'] == 3 and stats['bytes'] <= 3000
+  # The evicted data is still available on disk
+  assert cache.get("data0") == "x" * 1000
+
+
+def test_gzip(tmpdir):
+  rows = ["row %s" % (i % 10) for i in range(10000)]
+  cache = DataCache.DataCache(str(tmpdir))
+  cache.set("rows", rows, compression="gzip")
+  assert os.path.getsize(os.path.join(str(tmpdir), "rows")) < len(pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL)) / 2
+  assert DataCache.DataCache(str(tmpdir)).get("rows") == rows
+
+
+def test_zstd(tmpdir):
+  pytest.importorskip("zstandard")
+  cache = DataCache.DataCache(str(tmpdir))
+  cache.set("rows", list(range(10000)), compression="zstd")
+  assert DataCache.DataCache(str(tmpdir)).get("rows") == list(range(10000))
+
+
+def test_legacy_files(tmpdir):
+  with open(os.path.join(str(tmpdir), "legacy"), "wb") as f:
+    pickle.dump([1, 2], f)
+  assert DataCache.DataCache(str(tmpdir)).get("legacy") == [1, 2]
+
+
+def test_shared_caches(tmpdir):
+  assert DataCache.get_cache(str(tmpdir)) is DataCache.get_cache(os.path.join(str(tmpdir), "."))
+
+
+def test_memory_checked_against_file(tmpdir):
+  cache, other = DataCache.DataCache(str(tmpdir)), DataCache.DataCache(str(tmpdir))
+  cache.set("prices", [1, 2])
+  assert cache.get("prices") == [1, 2]
+  # Another process is changing the file
+  other.set("prices", [1, 2, 3])
+  assert cache.get("prices") == [1, 2, 3]
+  other.invalidate("prices")
+  assert cache.get("prices") is None
+  assert cache.stats()['memory']['entries'] == 0
+
+
+def test_exists_reads_header(tmpdir, monkeypatch):
+  cache = DataCache.DataCache(str(tmpdir))
+  cache.set("prices", [1, 2], ttl=0.05)
+  monkeypatch.setattr(DataCache.pickle, "loads", None)
+  assert cache.exists("prices") and not cache.exists("unknown")
+  time.sleep(0.1)
+  assert not cache.exists("prices")
+  assert not os.path.exists(os.path.join(str(tmpdir), "prices"))
+
+
+def test_expiry(tmpdir):
+  cache = DataCache.DataCache(str(tmpdir))
+  cache.set("prices", [1, 2], ttl=60)
+  cache.set("reference", [3], ttl=0)
+  assert time.time() + 55 < cache.expiry("prices") <= time.time() + 60
+  assert cache.expiry("reference") == 0 and cache.expiry("unknown") is None
@@ -0,0 +1,92 @@
+"""
+Tests of the columnar cache format
+"""
+
+import os
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from epyk.core.data import DataColumnar
+
+
+def frame(rows=1000):
+  return pd.DataFrame({'value': np.arange(rows, dtype='float64'), 'qty': np.arange(rows) % 7,
+                       'name': ["row %s" % i for i in range(rows)]}, index=pd.Index(np.arange(rows) * 2, name="id"))
+
+
+def test_dataframe(tmpdir):
+  df = frame()
+  DataColumnar.save(str(tmpdir), "prices", df)
+  result = DataColumnar.load(str(tmpdir), "prices")
+  pd.testing.assert_frame_equal(result, df)
+  # The numeric columns are memory-mapped
+  assert isinstance(DataColumnar.load(str(tmpdir), "prices", lazy=True)['value'].base, np.memmap)
+
+
+def test_read_only(tmpdir):
+  DataColumnar.save(str(tmpdir), "prices", frame())
+  values = DataColumnar.load(str(tmpdir), "prices", lazy=True)['value']
+  with pytest.raises(ValueError):
+    values[0] = 1
+
+
+def test_categories_and_index_name(tmpdir):
+  df = pd.DataFrame({'ccy': pd.Categorical(["EUR", "USD", "EUR"], categories=["USD", "EUR"], ordered=True),
+                     'value': [1.0, 2.0, 3.0]})
+  df.index.name = "row"
+  DataColumnar.save(str(tmpdir), "prices", df)
+  pd.testing.assert_frame_equal(DataColumnar.load(str(tmpdir), "prices"), df)
+
+
+def test_reject_multiindex(tmpdir):
+  df = pd.DataFrame([[1, 2]], columns=pd.MultiIndex.from_tuples([("a", "x"), ("a", "y")]))
+  with pytest.raises(TypeError):
+    DataColumnar.save(str(tmpdir), "prices", df)
+  with pytest.raises(TypeError):
+    DataColumnar.save(str(tmpdir), "prices", pd.DataFrame([[1]], columns=pd.Index([("a", "x")], tupleize_cols=False)))
+  with pytest.raises(TypeError):
+    DataColumnar.save(str(tmpdir), "prices", {("a", "x"): [1, 2]})
+  assert os.listdir(str(tmpdir)) == []
+
+
+def test_columns(tmpdir):
+  DataColumnar.save(str(tmpdir), "prices", frame())
+  lazy = DataColumnar.load(str(tmpdir), "prices", lazy=True)
+  assert lazy.columns == ['value', 'qty', 'name'] and lazy._columns == {}
+  assert len(lazy) == 1000 and list(lazy._columns) == ['value']
+  result = DataColumnar.load(str(tmpdir), "prices", columns=['qty'])
+  assert list(result.columns) == ['qty'] and result['qty'].sum() == frame()['qty'].sum()
+
+
+def test_dict_and_array(tmpdir):
+  DataColumnar.save(str(tmpdir), "dict", {'a': [1, 2, 3], 'b': np.ones(3)})
+  result = DataColumnar.load(str(tmpdir), "dict")
+  assert result['a'].tolist() == [1, 2, 3] and result['b'].tolist() == [1, 1, 1]
+  DataColumnar.save(str(tmpdir), "array", np.eye(3))
+  assert (DataColumnar.load(str(tmpdir), "array") == np.eye(3)).all()
+
+
+def test_ttl_and_versions(tmpdir):
+  DataColumnar.save(str(tmpdir), "prices", frame(10), ttl=0.05)
+  lazy = DataColumnar.load(str(tmpdir), "prices", lazy=True)
+  values = lazy['value']
+  DataColumnar.save(str(tmpdir), "prices", frame(20), ttl=0.05)
+  assert len(values) == 10 and len(DataColumnar.load(str(tmpdir), "prices")) == 20
+  time.sleep(0.1)
+  assert DataColumnar.load(str(tmpdir), "prices") is None
+
+  DataColumnar.cleanup(str(tmpdir), "prices", keep=DataColumnar.read_meta(str(tmpdir), "prices", check_expiry=False)['folder'], grace_period=0)
+  assert len([name for name in os.listdir(str(tmpdir)) if os.path.isdir(os.path.join(str(tmpdir), name))]) == 1
+  DataColumnar.remove(str(tmpdir), "prices")
+  assert os.listdir(str(tmpdir)) == []
+
+
+def test_arrow(tmpdir):
+  pytest.importorskip("pyarrow")
+  df = frame()
+  DataColumnar.save(str(tmpdir), "prices", df, format="arrow")
+  pd.testing.assert_frame_equal(DataColumnar.load(str(tmpdir), "prices"), df)
@@ -0,0 +1,56 @@
+"""
+Tests of the streaming CSV reader
+"""
+
+import os
+import datetime
+
+import pytest
+
+from epyk.core.data import DataCsv
+
+
+def write(path, rows=1000):
+  with open(path, "w") as file_obj:
+    file_obj.write("id,price,active,date,name\n")
+    for i in range(rows):
+      file_obj.write('%s,%s,%s,2020-01-%02d,"name, %s"\n' % (i, i * 1.5, i % 2 == 0, i % 28 + 1, i))
+  return path
+
+
+def test_schema(tmpdir):
+  path = write(str(tmpdir.join("prices.csv")))
+  schema = DataCsv.schema(path)
+  assert schema.to_dict() == {'id': 'int', 'price': 'float', 'active': 'bool', 'date': 'date', 'name': 'str'}
+  assert DataCsv.schema(path) is schema
+  # The schema is inferred again when the file changes
+  with open(path, "a") as file_obj:
+    file_obj.write("1000,abc,True,2020-01-01,x\n")
+  assert DataCsv.schema(path) is not schema
+  with pytest.raises(ValueError):
+    list(DataCsv.read(path, batch_size=100))
+  assert list(DataCsv.read(path, types={'price': 'str'}))[0][-1]['price'] == 'abc'
+
+
+def test_batches(tmpdir):
+  path = write(str(tmpdir.join("prices.csv")))
+  batches = list(DataCsv.read(path, batch_size=300))
+  assert [len(batch) for batch in batches] == [300, 300, 300, 100]
+  assert batches[0][1] == {'id': 1, 'price': 1.5, 'active': False, 'date': datetime.date(2020, 1, 2), 'name': "name, 1"}
+  batches = list(DataCsv.read(path, batch_size=400, columns=['name', 'id'], output="columns"))
+  assert list(batches[0]) == ['name', 'id'] and batches[-1]['id'][-1] == 999
+
+
+def test_parallel(tmpdir):
+  path = write(str(tmpdir.join("prices.csv")), rows=5000)
+  expected = list(DataCsv.read(path, batch_size=700, output="columns"))
+  batches = list(DataCsv.read(path, batch_size=700, output="columns", workers=2, chunk_bytes=10000))
+  assert len(DataCsv.chunks(path, 0, 10000)) > 5
+  assert batches == expected
+
+
+def test_infer_numbers():
+  assert DataCsv.infer_type(["1", "-20", "+3", "0"]) == 'int'
+  assert DataCsv.infer_type(["1.5", "-0.25", ".5", "1e-3", "2"]) == 'float'
+  for values in (["00123", "1"], ["1_000"], ["nan", "1.0"], ["inf"], ["-Infinity"], ["012.5"]):
+    assert DataCsv.infer_type(values) == 'str', values
@@ -0,0 +1,88 @@
+"""
+Tests of the delta updates of the refreshed datasets
+"""
+
+import random
+
+import pytest
+
+from epyk.core.data import DataDelta
+
+
+def apply(rows, patch, key="id"):
+  if patch['full']:
+    return list(patch['rows'])
+
+  deleted = set(patch['deletes'])
+  rows = [row for row in rows if row[key] not in deleted]
+  updates = dict((row[key], row) for row in patch['updates'])
+  return [updates.get(row[key], row) for row in rows] + patch['inserts']
+
+
+def test_patches():
+  table = DataDelta.VersionedTable("id")
+  table.update([{'id': 1, 'v': 1}, {'id': 2, 'v': 2}])
+  first = table.since()
+  assert first['full'] and len(first['rows']) == 2
+  table.update([{'id': 1, 'v': 10}, {'id': 3, 'v': 3}])
+  patch = table.since(first['version'])
+  assert patch == {'version': table.token, 'full': False, 'inserts': [{'id': 3, 'v': 3}], 'updates': [{'id': 1, 'v': 10}],
+                   'deletes': [2]}
+  # No change, no new version
+  assert table.update([{'id': 1, 'v': 10}, {'id': 3, 'v': 3}]) == patch['version']
+  assert table.since(patch['version'])['inserts'] == []
+  # Inserted and deleted since the client version
+  table.update([{'id': 1, 'v': 10}, {'id': 3, 'v': 3}, {'id': 4, 'v': 4}])
+  table.update([{'id': 1, 'v': 10}, {'id': 3, 'v': 3}])
+  assert table.since(patch['version'])['deletes'] == [] and table.since(patch['version'])['inserts'] == []
+
+
+def test_full_reload():
+  table = DataDelta.VersionedTable("id", max_history=3)
+  token = table.update([{'id': 1}])
+  for i in range(5):
+    table.update([{'id': 1, 'v': i}])
+  assert table.since(token)['full'] and table.since("unknown")['full']
+
+
+def test_tokens_from_data():
+  rows = [{'id': 1, 'v': 1}, {'id': 2, 'v': 2}]
+  # Another worker (or a restarted server) with the same data knows the version of the client
+  worker1, worker2 = DataDelta.VersionedTable("id"), DataDelta.VersionedTable("id")
+  token = worker1.update(rows)
+  assert worker2.update(rows) == token
+  worker2.update([{'id': 1, 'v': 10}, {'id': 2, 'v': 2}])
+  assert worker2.since(token)['updates'] == [{'id': 1, 'v': 10}]
+  # A version never seen by the worker returns the full data
+  worker1.update([{'id': 3, 'v': 3}])
+  assert worker2.since(worker1.token)['full']
+
+
+def test_random_updates():
+  table, rng = DataDelta.VersionedTable("id", max_history=10), random.Random(1)
+  current, clients = [], [(None, [])] * 5
+  for _ in range(200):
+    current = [{'id': i, 'v': rng.randint(0, 3)} for i in rng.sample(range(40), rng.randint(0, 30))]
+    table.update(current)
+    client = rng.randrange(len(clients))
+    token, rows = clients[client]
+    patch = table.since(token)
+    rows = apply(rows, patch)
+    assert sorted(rows, key=lambda row: row['id']) == sorted(current, key=lambda row: row['id'])
+    clients[client] = (patch['version'], rows)
+
+
+def test_respond():
+  patch = DataDelta.respond("test_delta", [{'code': "A", 'price': 1}], key="code")
+  assert patch['full'] and DataDelta.get_table("test_delta", key="code").key == "code"
+  assert DataDelta.respond("test_delta", [{'code': "A", 'price': 2}], patch['version'], key="code")['updates'] == [
+    {'code': "A", 'price': 2}]
+  with pytest.raises(ValueError):
+    DataDelta.get_table("test_delta")
+
+
+def test_scopes():
+  DataDelta.respond("test_scope", [{'id': 1}], scope="report1")
+  DataDelta.respond("test_scope", [{'id': 2}], scope="report2")
+  assert list(DataDelta.get_table("test_scope", scope="report1").rows) == [1]
+  assert DataDelta.get_table("test_scope", scope="report1") is not DataDelta.get_table("test_scope", scope="report2")
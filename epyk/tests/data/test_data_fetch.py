@@ -0,0 +1,152 @@
+"""
+Tests of the concurrent calls to the data sources
+"""
+
+import json
+import time
+import socket
+import asyncio
+import threading
+import concurrent.futures
+
+import pytest
+
+from epyk.core.data import DataFetch
+
+try:
+  from http.server import HTTPServer, BaseHTTPRequestHandler
+  from socketserver import ThreadingMixIn
+except ImportError:
+  pytest.skip("Python 3 only", allow_module_level=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+
+  def do_GET(self):
+    delay = float(self.path.strip("/") or 0)
+    time.sleep(delay)
+    content = json.dumps({'delay': delay}).encode()
+    self.send_response(200)
+    self.send_header("Content-Length", str(len(content)))
+    self.end_headers()
+    self.wfile.write(content)
+
+  def log_message(self, *args):
+    pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+  daemon_threads = True
+
+
+class Report(object):
+  _props = {}
+
+  def __init__(self, py):
+    self.py = py
+
+
+@pytest.fixture
+def data():
+  # DataSrc is importing all the data modules, some of them need optional packages (e.g. the database ones)
+  Data = pytest.importorskip("epyk.core.data.Data", exc_type=ImportError)
+  PyRest = pytest.importorskip("epyk.core.py.PyRest", exc_type=ImportError)
+  return Data.DataSrc(Report(PyRest.PyRest()))
+
+
+@pytest.fixture(scope="module")
+def url():
+  server = Server(("localhost", 0), Handler)
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  yield "http://localhost:%s" % server.server_address[1]
+  server.shutdown()
+
+
+@pytest.fixture(scope="module")
+def port():
+  listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+  listener.bind(("localhost", 0))
+  listener.listen(16)
+
+  def reply(conn):
+    data = json.loads(conn.recv(1024))
+    time.sleep(data['delay'])
+    conn.sendall(json.dumps(data).encode())
+    conn.close()
+
+  def serve():
+    while True:
+      try:
+        conn, _ = listener.accept()
+      except OSError:
+        return
+
+      threading.Thread(target=reply, args=(conn, ), daemon=True).start()
+
+  threading.Thread(target=serve, daemon=True).start()
+  yield listener.getsockname()[1]
+  listener.close()
+
+
+def test_fetch_many(data, url, port):
+  requests = [data.request("rest", "%s/0.3" % url, method="GET") for _ in range(6)]
+  requests.append(data.request("socket", {'delay': 0.3}, port=port))
+  requests.append({'source': "rest", 'args': ["%s/0" % url], 'kwargs': {'method': "GET"}})
+  start = time.time()
+  results = data.fetch_many(requests, concurrency=8)
+  assert time.time() - start < 1
+  assert results[0] == {'delay': 0.3} and json.loads(results[6]) == {'delay': 0.3} and results[-1] == {'delay': 0}
+
+
+def test_concurrency():
+  running, peak, lock = [0], [0], threading.Lock()
+
+  def call(i):
+    with lock:
+      running[0] += 1
+      peak[0] = max(peak[0], running[0])
+    time.sleep(0.05)
+    with lock:
+      running[0] -= 1
+    return i
+
+  results = DataFetch.fetch_many(None, [lambda i=i: call(i) for i in range(10)], concurrency=3)
+  assert results == list(range(10)) and peak[0] == 3
+
+
+def test_timeout(data, url):
+  # The timeout starts with the call, the queued requests are not timed out
+  requests = [lambda: time.sleep(0.2) or 1, lambda: time.sleep(0.2) or 2,
+              data.request("rest", "%s/2" % url, method="GET", timeout=0.3)]
+  start = time.time()
+  results = data.fetch_many(requests, concurrency=1, timeout=0.5, return_exceptions=True)
+  assert results[:2] == [1, 2] and isinstance(results[2], (socket.timeout, concurrent.futures.TimeoutError))
+  assert time.time() - start < 1.5
+  with pytest.raises(concurrent.futures.TimeoutError):
+    DataFetch.fetch_many(None, [lambda: time.sleep(1)], timeout=0.1)
+
+
+def test_afetch_many(data, url):
+
+  async def main():
+    requests = [data.request("rest", "%s/0.2" % url, method="GET") for _ in range(5)]
+    requests.append(lambda: time.sleep(1))
+    start = time.time()
+    results = await data.afetch_many(requests, concurrency=6, timeout=0.5, return_exceptions=True)
+    return results, time.time() - start
+
+  results, duration = asyncio.run(main())
+  assert duration < 0.9
+  assert results[:5] == [{'delay': 0.2}] * 5 and isinstance(results[5], concurrent.futures.TimeoutError)
+
+
+def test_afetch_many_queued_in_executor():
+  # The executor has fewer workers than the concurrency, the queued calls are not timed out
+
+  async def main():
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+      return await DataFetch.afetch_many(
+        None, [lambda: time.sleep(0.3) or 1, lambda: time.sleep(0.3) or 2], concurrency=2, timeout=0.5,
+        executor=executor)
+
+  assert asyncio.run(main()) == [1, 2]
@@ -0,0 +1,65 @@
+"""
+Tests of the coalescing of the concurrent identical calls
+"""
+
+import time
+import threading
+
+from epyk.core.data import DataFlight
+
+
+def run(flight, key, func, count):
+  results, threads = [], []
+  for _ in range(count):
+    threads.append(threading.Thread(target=lambda: results.append(flight.do(key, func))))
+    threads[-1].start()
+  for thread in threads:
+    thread.join()
+  return results
+
+
+def test_coalesce():
+  flight, calls = DataFlight.SingleFlight(), []
+
+  def call():
+    calls.append(1)
+    time.sleep(0.2)
+    return {'price': 1}
+
+  results = run(flight, DataFlight.key("rest", "http://localhost/prices", "GET", None), call, 20)
+  assert len(calls) == 1 and all(result is results[0] for result in results)
+  stats = flight.stats()
+  assert stats['executions'] == 1 and stats['coalesced'] == 19 and stats['sources'] == {'rest': 19}
+  # Nothing is cached
+  flight.do(DataFlight.key("rest", "http://localhost/prices", "GET", None), call)
+  assert len(calls) == 2 and flight.in_flight() == 0
+
+
+def test_errors():
+  flight, release, errors = DataFlight.SingleFlight(), threading.Event(), []
+
+  def call():
+    release.wait(5)
+    raise ValueError("service down")
+
+  def safe():
+    try:
+      flight.do("rpc:1", call)
+    except ValueError as err:
+      errors.append(err)
+
+  threads = [threading.Thread(target=safe) for _ in range(5)]
+  for thread in threads:
+    thread.start()
+  while flight.stats()['calls'] < 5:
+    time.sleep(0.01)
+  release.set()
+  for thread in threads:
+    thread.join()
+  assert len(errors) == 5 and flight.stats()['errors'] == 1 and flight.stats()['coalesced'] == 4
+
+
+def test_keys():
+  assert DataFlight.key("rest", "url", {'a': 1, 'b': 2}) == DataFlight.key("rest", "url", {'b': 2, 'a': 1})
+  assert DataFlight.key("rest", "url", "GET") != DataFlight.key("rest", "url", "POST")
+  assert DataFlight.do("rest", ("url", ), lambda: 3) == 3
@@ -0,0 +1,102 @@
+"""
+Tests of the memoization of the data services
+"""
+
+import sys
+import time
+import threading
+
+import pytest
+
+from epyk.core.data import DataMemo
+
+
+SERVICE = '''
+import time
+
+CALLS = []
+
+def getData(report, data):
+  CALLS.append(data)
+  time.sleep(0.1)
+  return {"version": %s, "data": data}
+'''
+
+
+class Report(object):
+  _props = {}
+
+
+@pytest.fixture
+def data():
+  # DataSrc is importing all the data modules, some of them need optional packages (e.g. the database ones)
+  return pytest.importorskip("epyk.core.data.Data", exc_type=ImportError).DataSrc(Report())
+
+
+@pytest.fixture
+def service(tmpdir):
+  package = tmpdir.mkdir("memo_sources")
+  package.join("__init__.py").write("")
+  package.join("prices.py").write(SERVICE % 1)
+  yield package.join("prices.py")
+  DataMemo.get_memo().invalidate()
+  for name in ("memo_sources", "memo_sources.prices"):
+    sys.modules.pop(name, None)
+
+
+def test_memoize(tmpdir, service, data):
+  results = []
+  threads = [threading.Thread(target=lambda: results.append(
+    data.from_source({'ccy': "EUR"}, "prices", folder="memo_sources", path=str(tmpdir), memoize=True))) for _ in range(8)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert results == [{'version': 1, 'data': {'ccy': "EUR"}}] * 8
+  import memo_sources.prices
+
+  assert memo_sources.prices.CALLS == [{'ccy': "EUR"}]
+  data.from_source({'ccy': "USD"}, "prices", folder="memo_sources", path=str(tmpdir), memoize=True, ttl=0.05)
+  time.sleep(0.1)
+  data.from_source({'ccy': "USD"}, "prices", folder="memo_sources", path=str(tmpdir), memoize=True)
+  assert len(memo_sources.prices.CALLS) == 3
+  # A change of the service reloads it
+  service.write(SERVICE % 22)
+  result = data.from_source({'ccy': "EUR"}, "prices", folder="memo_sources", path=str(tmpdir), memoize=True)
+  assert result['version'] == 22 and DataMemo.get_memo().stats()['reloads'] == 1
+
+
+def test_new_version_in_new_module(tmpdir, service):
+  sys.path.insert(0, str(tmpdir))
+  try:
+    import memo_sources.prices
+
+    memo = DataMemo.Memo()
+    previous = memo_sources.prices
+    assert memo.check_source(previous) is previous
+    service.write(SERVICE % 333)
+    module = memo.check_source(previous)
+    # The threads still running the previous version are not impacted
+    assert module.getData(None, {})['version'] == 333 and previous.getData(None, {})['version'] == 1
+    assert sys.modules["memo_sources.prices"] is module and memo_sources.prices is module
+    assert memo.check_source(previous) is module
+  finally:
+    sys.path.remove(str(tmpdir))
+
+
+def test_counters():
+  memo = DataMemo.Memo()
+  memo.set("key", 1)
+  # The check done under the key lock is not counted
+  assert memo.get("key", count=False) == 1 and memo.get("missing", count=False) is DataMemo.MISSING
+  assert memo.stats()['hits'] == 0 and memo.stats()['misses'] == 0
+  assert memo.get("key") == 1 and memo.stats()['hits'] == 1
+
+
+def test_key_locks():
+  locks = DataMemo.KeyLocks()
+  locks.acquire("a")
+  locks.acquire("b")
+  locks.release("a")
+  locks.release("b")
+  assert locks._locks == {}
@@ -0,0 +1,173 @@
+"""
+Tests of the push channels with a local server
+"""
+
+import json
+import time
+import shutil
+import socket
+import struct
+import subprocess
+
+import pytest
+
+from epyk.core.data import DataPush
+
+
+@pytest.fixture
+def server():
+  server = DataPush.PushServer(port=0, flush_interval=0.1, heartbeat=0.5).start()
+  yield server
+  server.stop()
+
+
+def connect(server, path, websocket=False, key="dGhlIHNhbXBsZSBub25jZQ==", origin=None):
+  sock = socket.create_connection(server.server_address, timeout=5)
+  headers = "GET /%s HTTP/1.1\r\nHost: localhost\r\n" % path
+  if origin is not None:
+    headers += "Origin: %s\r\n" % origin
+  if websocket:
+    headers += "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+    if key is not None:
+      headers += "Sec-WebSocket-Key: %s\r\n" % key
+  sock.sendall((headers + "\r\n").encode())
+  reader = sock.makefile("rb")
+  response = []
+  while True:
+    line = reader.readline()
+    if line in (b"\r\n", b""):
+      break
+
+    response.append(line.decode().strip())
+  return sock, reader, response
+
+
+def read_event(reader):
+  lines = []
+  while True:
+    line = reader.readline().decode().strip()
+    if not line and lines:
+      return lines
+
+    if line and not line.startswith(":"):
+      lines.append(line)
+
+
+def read_frame(reader, opcode=0x81):
+  while True:
+    frame_opcode, size = struct.unpack(">BB", reader.read(2))
+    if size == 126:
+      size = struct.unpack(">H", reader.read(2))[0]
+    elif size == 127:
+      size = struct.unpack(">Q", reader.read(8))[0]
+    payload = reader.read(size)
+    if frame_opcode == opcode:
+      return json.loads(payload.decode()) if opcode == 0x81 else payload
+
+
+def client_frame(opcode, payload=b""):
+  mask = b"\x01\x02\x03\x04"
+  return struct.pack(">BB", 0x80 | opcode, 0x80 | len(payload)) + mask + bytes(
+    byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+def test_sse(server):
+  channel = DataPush.get_channel("test_sse")
+  channel.publish("table", [1])
+  sock, reader, response = connect(server, "test_sse")
+  assert response[0].endswith("200 OK") and "Content-Type: text/event-stream" in response
+  # The last state is sent to the new subscribers
+  event = read_event(reader)
+  assert event[0].startswith("id: ") and json.loads(event[1][6:])['updates'] == {'table': [1]}
+  # The updates of a component are coalesced and the components are batched
+  for i in range(50):
+    channel.publish("table", [i])
+  channel.publish("chart", {'x': 1})
+  updates = {}
+  while updates.get('table') != [49]:
+    updates.update(json.loads(read_event(reader)[1][6:])['updates'])
+  assert updates == {'table': [49], 'chart': {'x': 1}} and channel.stats()['coalesced'] > 0
+  sock.close()
+
+
+def test_websocket(server):
+  channel = DataPush.get_channel("test_ws")
+  sock, reader, response = connect(server, "test_ws", websocket=True)
+  assert "101" in response[0] and "Sec-WebSocket-Accept: s3pPLMBiTxaQ9kYGzzhZRbK+xOo=" in response
+  channel.publish("table", list(range(100)))
+  message = read_frame(reader)
+  assert message['channel'] == "test_ws" and message['updates'] == {'table': list(range(100))}
+  sock.close()
+
+
+def test_handshake_and_origins():
+  server = DataPush.PushServer(port=0, allowed_origins=["http://reports"]).start()
+  try:
+    for key in (None, "short"):
+      sock, _, response = connect(server, "test_handshake", websocket=True, key=key)
+      assert "400" in response[0]
+      sock.close()
+    sock, _, response = connect(server, "test_handshake", websocket=True, origin="http://other")
+    assert "403" in response[0]
+    sock.close()
+    sock, _, response = connect(server, "test_handshake", origin="http://reports")
+    assert "Access-Control-Allow-Origin: http://reports" in response
+    sock.close()
+  finally:
+    server.stop()
+
+
+def test_sse_without_origins(server):
+  sock, _, response = connect(server, "test_sse_origin", origin="http://other")
+  assert response[0].endswith("200 OK") and not [header for header in response if "Allow-Origin" in header]
+  sock.close()
+
+
+def test_client_frames(server):
+  channel = DataPush.get_channel("test_close")
+  sock, reader, response = connect(server, "test_close", websocket=True)
+  sock.sendall(client_frame(0x9, b"hello"))
+  assert read_frame(reader, 0x8A) == b"hello"
+  sock.sendall(client_frame(0x8, b"\x03\xe8"))
+  assert read_frame(reader, 0x88) == b"\x03\xe8"
+  start = time.time()
+  while channel.stats()['subscribers'] and time.time() - start < 2:
+    time.sleep(0.01)
+  assert channel.stats()['subscribers'] == 0
+  sock.close()
+
+
+def test_slow_subscriber():
+  channel = DataPush.get_channel("test_slow")
+  subscriber = channel.subscribe()
+  for i in range(10000):
+    channel.publish("component_%s" % (i % 10), i)
+  # The buffer of a subscriber is limited to the number of components
+  assert len(subscriber.pending) == 10
+  batch = subscriber.next_batch(max_batch=4)
+  assert list(batch.values()) == [9990, 9991, 9992, 9993] and len(subscriber.next_batch(0)) == 6
+  assert subscriber.next_batch(0.01) == {}
+  subscriber.close()
+  assert subscriber.next_batch(0) is None and channel.stats()['subscribers'] == 0
+
+
+def test_js():
+  script = DataPush.js_subscribe("http://localhost:8765/prices", {'table': "function(data){}"}, var_name="sub")
+  assert script.startswith("var sub = ") and '"ws://localhost:8765/prices"' in script and "EventSource" in script
+
+
+def test_js_fallback():
+  node = shutil.which("node")
+  if node is None:
+    pytest.skip("node is not available")
+
+  script = DataPush.js_subscribe("http://localhost:8765/prices", {}, reconnect=0, var_name="sub", max_failures=2)
+  # The websockets are closed before being opened (e.g. blocked by a proxy)
+  mocks = """
+var opened = [];
+function WebSocket(url){opened.push('ws'); var self = this; setTimeout(function(){self.onclose()}, 0)};
+function EventSource(url){opened.push('sse')};
+"""
+  check = "setTimeout(function(){console.log(JSON.stringify(opened))}, 50)"
+  output = subprocess.check_output([node, "-e", "%s\n%s;\n%s" % (mocks, script, check)])
+  assert json.loads(output) == ["ws", "ws", "sse"]
@@ -0,0 +1,106 @@
+"""
+Tests of the shared memory tier of the workers
+"""
+
+import sys
+import time
+import subprocess
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("multiprocessing.shared_memory")
+
+from epyk.core.data import DataShared
+
+
+WORKER = """
+import sys
+import time
+import numpy as np
+from epyk.core.data import DataShared
+
+cache = DataShared.SharedCache(sys.argv[1])
+cache.get_or_load("reference", lambda: {'values': np.arange(100000, dtype='float64'), 'name': "ref"})
+print(cache.stats()['published'])
+"""
+
+
+@pytest.fixture
+def cache(tmpdir):
+  cache = DataShared.SharedCache(str(tmpdir))
+  yield cache
+  cache.clear()
+
+
+def test_attach(cache):
+  # The segment is kept after the end of the worker publishing it
+  assert subprocess.check_output([sys.executable, "-c", WORKER, cache.path]).strip() == b"1"
+  assert subprocess.check_output([sys.executable, "-c", WORKER, cache.path]).strip() == b"0"
+  data = cache.get("reference")
+  assert data['name'] == "ref" and data['values'][-1] == 99999
+  assert not data['values'].flags.writeable and not data['values'].flags.owndata
+  assert cache.get("reference") is data and cache.stats()['segments'] == 1
+
+
+def test_publish(cache):
+  assert cache.get("prices") is None
+  assert cache.get_or_load("prices", lambda: None) is None and cache.stats()['segments'] == 0
+  cache.publish("prices", [1, 2, 3], ttl=60)
+  assert cache.get_or_load("prices", lambda: [4]) == [1, 2, 3]
+  # A valid version is not replaced
+  assert cache.publish("prices", [4]) == [1, 2, 3]
+  cache.remove("prices")
+  assert cache.publish("prices", [4]) == [4]
+  cache.publish("expired", "old", ttl=-1)
+  assert cache.get("expired", "missing") == "missing"
+  assert cache.publish("expired", "new") == "new"
+
+
+def test_none_recorded(cache):
+  calls = []
+  assert cache.get_or_load("missing", lambda: calls.append(1), ttl=0.05) is None
+  assert cache.get_or_load("missing", lambda: calls.append(1), ttl=0.05) is None
+  assert calls == [1] and cache.stats()['segments'] == 0
+  time.sleep(0.1)
+  assert cache.get_or_load("missing", lambda: [1]) == [1]
+
+
+def test_index_parsed_on_change(cache, monkeypatch):
+  cache.publish("prices", [1, 2, 3])
+  cache.get("prices")
+  loads = []
+  monkeypatch.setattr(DataShared.json, "load", lambda f: loads.append(1) or {})
+  assert cache.get("prices") == [1, 2, 3] and loads == []
+
+
+def test_publish_valid_version(cache, monkeypatch):
+  cache.publish("prices", [1, 2, 3])
+  monkeypatch.setattr(DataShared, "_open", None)
+  assert cache.publish("prices", [4]) == [1, 2, 3]
+
+
+def test_invalidate_columns(cache):
+  cache.publish("prices", [1])
+  cache.publish("prices:a,b", [2])
+  cache.publish("prices2", [3])
+  DataShared.invalidate("prices", cache.path)
+  assert sorted(cache.index()) == ["prices2"]
+
+
+def test_expiry_of_source(cache, monkeypatch):
+  # Without ttl the shared data expires with its source
+  assert cache.get_or_load("prices", lambda: [1], expiry=lambda: time.time() + 0.05) == [1]
+  assert cache.index()["prices"]['expiry'] <= time.time() + 0.05
+  time.sleep(0.1)
+  assert cache.get("prices", "missing") == "missing"
+  assert cache.get_or_load("prices", lambda: [2], ttl=0.05, expiry=lambda: 0) == [2]
+  assert cache.index()["prices"]['expiry'] <= time.time() + 0.05
+  # A source already expired is not shared
+  assert cache.get_or_load("old", lambda: [3], expiry=lambda: time.time() - 1) == [3]
+  assert "old" not in cache.index()
+  # The recorded None is short lived
+  monkeypatch.setattr(DataShared, "NONE_TTL", 0.05)
+  assert cache.get_or_load("missing", lambda: None) is None
+  time.sleep(0.1)
+  assert cache.get_or_load("missing", lambda: [4]) == [4]
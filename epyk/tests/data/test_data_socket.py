@@ -0,0 +1,134 @@
+"""
+Tests of the framed socket client and its reference server
+"""
+
+import json
+import time
+import socket
+import threading
+
+import pytest
+
+from epyk.core.data import DataSocket
+
+
+class Report(object):
+  _props = {}
+
+
+@pytest.fixture
+def data():
+  # DataSrc is importing all the data modules, some of them need optional packages (e.g. the database ones)
+  return pytest.importorskip("epyk.core.data.Data", exc_type=ImportError).DataSrc(Report())
+
+
+@pytest.fixture
+def server():
+  def handler(data):
+    if data.get('fail'):
+      raise ValueError("invalid request")
+
+    time.sleep(data.get('delay', 0))
+    return {'echo': data, 'rows': ["row %s" % i for i in range(data.get('rows', 0))]}
+
+  server = DataSocket.Server(handler, port=0).start()
+  yield server
+  server.stop()
+
+
+def test_request(server):
+  port = server.server_address[1]
+  pool = DataSocket.SocketPool("localhost", port, size=2, timeout=5)
+  for i in range(20):
+    assert pool.request({'i': i})['echo'] == {'i': i}
+  assert pool.stats()['opened'] == 1 and pool.stats()['reused'] == 19
+  # Large responses are fully read
+  assert len(pool.request({'rows': 100000})['rows']) == 100000
+  assert pool.request({'fail': True}) == {'error': "invalid request"}
+
+
+def test_pipeline(server):
+  pool = DataSocket.SocketPool("localhost", server.server_address[1])
+  responses = pool.pipeline([{'i': i} for i in range(200)])
+  assert [response['echo']['i'] for response in responses] == list(range(200)) and pool.stats()['opened'] == 1
+
+
+def test_pool_threads(server):
+  pool, results = DataSocket.SocketPool("localhost", server.server_address[1], size=3), []
+  threads = [threading.Thread(target=lambda i=i: results.append(pool.request({'i': i, 'delay': 0.05}))) for i in range(9)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert len(results) == 9 and pool.stats()['opened'] == 3
+
+
+def test_timeout_and_reconnect(server):
+  pool = DataSocket.SocketPool("localhost", server.server_address[1], timeout=0.2)
+  with pytest.raises(OSError):
+    pool.request({'delay': 1})
+  assert pool.stats()['errors'] == 1 and pool.request({'i': 1})['echo'] == {'i': 1}
+  # The idle connection closed by the server is replaced
+  pool._idle.queue[0].sock.shutdown(2)
+  assert pool.request({'i': 2})['echo'] == {'i': 2} and pool.stats()['opened'] == 3
+
+
+def test_no_retry_after_responses():
+  listener, connections = socket.socket(socket.AF_INET, socket.SOCK_STREAM), []
+  listener.bind(("localhost", 0))
+  listener.listen(4)
+
+  def serve():
+    while True:
+      try:
+        conn, _ = listener.accept()
+      except OSError:
+        return
+
+      connections.append(conn)
+      while True:
+        payload = DataSocket.recv_frame(conn)
+        if payload is None or json.loads(payload.decode()).get('close'):
+          conn.close()
+          break
+
+        DataSocket.send_frame(conn, payload)
+
+  threading.Thread(target=serve, daemon=True).start()
+  try:
+    pool = DataSocket.SocketPool("localhost", listener.getsockname()[1], timeout=2)
+    assert pool.request({'i': 0}) == {'i': 0}
+    # The first request is processed before the connection is closed, the requests are not sent again
+    with pytest.raises(ConnectionError):
+      pool.pipeline([{'i': 1}, {'close': True}])
+    assert len(connections) == 1 and pool.stats()['errors'] == 1
+  finally:
+    listener.close()
+
+
+def test_legacy_socket(data):
+  listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+  listener.bind(("localhost", 0))
+  listener.listen(4)
+
+  def serve():
+    for _ in range(2):
+      conn, _ = listener.accept()
+      conn.recv(1024)
+      conn.sendall(b"x" * 5000)
+      time.sleep(0.2)
+      conn.close()
+
+  threading.Thread(target=serve, daemon=True).start()
+  try:
+    port = listener.getsockname()[1]
+    # A single read by default, the server does not need to close the connection
+    assert 0 < len(data.socket({'i': 1}, port=port)) <= 1024
+    assert data.socket({'i': 1}, port=port, read_all=True) == b"x" * 5000
+  finally:
+    listener.close()
+
+
+def test_data_src(server, data):
+  assert data.socket({'i': 1}, port=server.server_address[1], framed=True)['echo'] == {'i': 1}
+  assert data.socket_pool(port=server.server_address[1]).pipeline([{'i': 1}, {'i': 2}])[1]['echo'] == {'i': 2}
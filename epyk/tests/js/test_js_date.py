@@ -0,0 +1,78 @@
+import os
+import datetime
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from epyk.core.js.primitives import JsDate
+from epyk.core.js.primitives import JsString
+
+
+def run_node(statements, tz="America/New_York"):
+  if shutil.which("node") is None:
+    pytest.skip("node is not available")
+
+  script = "console.log(JSON.stringify([%s]))" % ", ".join(statements)
+  env = dict(os.environ, TZ=tz)
+  return json.loads(subprocess.check_output(["node", "-e", script], env=env, universal_newlines=True))
+
+
+def test_tokenize():
+  assert JsDate.tokenize("DD/MM/YYYY") == [('DD', True), ('/', False), ('MM', True), ('/', False), ('YYYY', True)]
+  assert JsDate.tokenize("[Day] DD [at] HH:mm") == [
+    ('Day', False), (' ', False), ('DD', True), (' ', False), ('at', False), (' ', False), ('HH', True), (':', False),
+    ('mm', True)]
+  assert JsDate.tokenize("") == []
+
+
+def test_compile_format():
+  assert JsDate.compileFormat("DD/MM/YYYY") is JsDate.compileFormat("DD/MM/YYYY")
+  assert JsDate.compileFormat("") == "function(d){return ''}"
+  assert run_node(["(%s)(new Date(2019, 4, 3, 9, 5, 7, 12))" % JsDate.compileFormat("DD/MM/YYYY [at] HH:mm:ss.SSS")]) == [
+    "03/05/2019 at 09:05:07.012"]
+
+
+def test_compile_parser():
+  parser = JsDate.compileParser("DD/MM/YYYY HH:mm")
+  assert parser is JsDate.compileParser("DD/MM/YYYY HH:mm")
+  assert run_node(["(%s)('03/05/2019 09:05') === new Date(2019, 4, 3, 9, 5).getTime()" % parser]) == [True]
+
+
+def test_to_date_iso_is_utc():
+  date = JsString.JsString("'2019-05-03'", isPyData=False).toDate()
+  assert run_node(["%s.getTime()" % date.varData]) == [1556841600000]
+
+
+def test_to_epoch_millis_sequences():
+  assert JsDate.toEpochMillis(["2019-05-03", datetime.date(2019, 5, 4), datetime.datetime(2019, 5, 3, 1, 0, 0, 5000),
+                               None, float("nan")]) == [1556841600000, 1556928000000, 1556845200005, None, None]
+  tz = datetime.timezone(datetime.timedelta(hours=2))
+  assert JsDate.toEpochMillis([datetime.datetime(2019, 5, 3, 2, tzinfo=tz)]) == [1556841600000]
+
+
+def test_to_epoch_millis_missing_values():
+  pd = pytest.importorskip("pandas")
+  numpy = pytest.importorskip("numpy")
+  expected = [1556841600000, None, None]
+  assert JsDate.toEpochMillis([datetime.datetime(2019, 5, 3), pd.NaT, numpy.datetime64("NaT")]) == expected
+  assert JsDate.toEpochMillis(pd.Series(["2019-05-03", None, numpy.nan], dtype=object)) == expected
+  assert JsDate.toEpochMillis(pd.Series(pd.to_datetime(["2019-05-03", None, None]))) == expected
+  assert JsDate.toEpochMillis(numpy.array(["2019-05-03", "NaT", "NaT"], dtype="datetime64[D]")) == expected
+  assert JsDate.toEpochMillis(pd.Series(pd.to_datetime(["2019-05-03 02:00", None])).dt.tz_localize("Europe/Paris")) == [
+    1556841600000, None]
+
+
+def test_series_format_keeps_naive_dates():
+  series = JsDate.JsDateSeries.new([datetime.datetime(2019, 5, 3, 23, 30), None], varName="MyDates")
+  statements = ["(function(){var %s; return %s})()" % (series.toStr()[4:], series.format("YYYY-MM-DD HH:mm").varData)]
+  for tz in ("America/New_York", "Asia/Tokyo"):
+    assert run_node(statements, tz) == [["2019-05-03 23:30", None]]
+
+
+def test_series_item_keeps_missing_values():
+  series = JsDate.JsDateSeries.new([datetime.datetime(2019, 5, 3), None], varName="MyDates")
+  statements = ["(function(){var %s; return [%s, %s, %s.map(function(d){return d === null ? null : d.getTime()})]})()" % (
+    series.toStr()[4:], series[0].varData, series[1].varData, series.toDates().varData)]
+  assert run_node(statements) == [["2019-05-03T00:00:00.000Z", None, [1556841600000, None]]]
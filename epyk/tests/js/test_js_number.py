@@ -0,0 +1,53 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from epyk.core.js.primitives import JsNumber
+
+
+class Prototypes(object):
+  """
+  Record the prototypes added by the Python Javascript objects
+  """
+
+  def __init__(self):
+    self.protos = {}
+
+  def extendProto(self, cls, name, body, pmts=None):
+    self.protos[(cls._jsClass, name)] = (body, pmts or [])
+
+  def script(self):
+    return "".join("%s.prototype.%s = function(%s){%s};\n" % (jsClass, name, ", ".join(pmts), body)
+                   for (jsClass, name), (body, pmts) in self.protos.items())
+
+
+def run_node(jsObj, statements):
+  if shutil.which("node") is None:
+    pytest.skip("node is not available")
+
+  script = "%sconsole.log(JSON.stringify([%s]))" % (jsObj.script(), ", ".join(statements))
+  return json.loads(subprocess.check_output(["node", "-e", script], universal_newlines=True))
+
+
+def test_format_money_country_locale():
+  jsObj = Prototypes()
+  assert JsNumber.JsNumber.get("n").formatMoney(jsObj, 2, "fr").toStr() == 'n.formatMoney(2, "fr-FR", null)'
+  assert ("Number", "formatLocale") in jsObj.protos
+
+
+def test_format_money_unknown_country():
+  jsObj = Prototypes()
+  assert JsNumber.JsNumber.get("n").formatMoney(jsObj, 2, "XX").toStr() == 'n.formatMoney(2, null, null)'
+  assert run_node(jsObj, ["(1234567.891).formatMoney(2, null, null)"]) == ["1 234 567.89"]
+
+
+def test_formatter_cache_key():
+  jsObj = Prototypes()
+  JsNumber.JsNumber.get("n").formatLocale(jsObj, 2, "fr-FR", currency="EUR")
+  result = run_node(jsObj, [
+    "(1).formatLocale(2, 'en-GB', null)", "(2).formatLocale(2, 'en-GB', null)", "(1).formatLocale(0, 'en-GB', null)",
+    "(1).formatLocale(2, 'en-GB', 'EUR')", "Object.keys(Number.formatters).sort()"])
+  assert result[:4] == ["1.00", "2.00", "1", "€1.00"]
+  assert result[4] == ["en-GB|0|null", "en-GB|2|EUR", "en-GB|2|null"]
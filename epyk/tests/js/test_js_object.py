@@ -0,0 +1,58 @@
+import pytest
+
+from epyk.core.js.primitives import JsArray
+from epyk.core.js.primitives import JsBoolean
+from epyk.core.js.primitives import JsObject
+
+
+def test_keywords_are_shared():
+  JsObject.FLYWEIGHTS.clear()
+  true = JsObject.FLYWEIGHTS.ref(JsBoolean.JsBoolean, "true")
+  assert JsObject.FLYWEIGHTS.ref(JsBoolean.JsBoolean, "true") is true
+  assert JsObject.FLYWEIGHTS.ref(JsBoolean.JsBoolean, "false") is not true
+  stats = JsObject.FLYWEIGHTS.stats()
+  assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+
+
+def test_variables_are_not_shared():
+  assert JsArray.JsArray.get("MyArray").length is not JsArray.JsArray.get("MyArray").length
+  assert JsObject.JsObject.this() is not JsObject.JsObject.this()
+
+
+def test_pool_removes_least_recently_used():
+  pool = JsObject.JsFlyweights(maxsize=2)
+  a = pool.ref(JsObject.JsObject, "a")
+  b = pool.ref(JsObject.JsObject, "b")
+  pool.ref(JsObject.JsObject, "a")
+  pool.ref(JsObject.JsObject, "c")
+  assert pool.stats()["size"] == 2
+  assert pool.ref(JsObject.JsObject, "a") is a
+  assert pool.ref(JsObject.JsObject, "b") is not b
+
+
+def test_set_var_changes_object():
+  length = JsArray.JsArray.get("MyArray").length
+  length.setVar("size")
+  assert length.toStr().startswith("var size = ")
+
+
+def test_set_var_refuses_shared_keyword():
+  true = JsObject.FLYWEIGHTS.ref(JsBoolean.JsBoolean, "true")
+  with pytest.raises(Exception):
+    true.setVar("flag")
+  assert true.toStr() == "true"
+
+
+def test_not_copies_shared_keyword():
+  true = JsObject.FLYWEIGHTS.ref(JsBoolean.JsBoolean, "true")
+  assert true.not_.toStr() == "!true"
+  assert true.toStr() == "true"
+
+
+def test_freeze_and_seal_flag_this(capsys):
+  this = JsObject.JsObject.this()
+  assert this.freeze().toStr() == "Object.freeze(this)"
+  assert this.seal().toStr() == "Object.seal(this)"
+  assert (this._frozen, this._sealed) == (True, True)
+  this.setattr("a", 1)
+  assert "frozen" in capsys.readouterr().out
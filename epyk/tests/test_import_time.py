@@ -0,0 +1,97 @@
+"""
+Import time benchmark for the lazy packages.
+
+The packages below must not import their submodules when they are imported themselves.
+The checks are done in a fresh interpreter to avoid the modules already loaded by pytest.
+Modules imported with importlib are not reported by -X importtime so sys.modules and perf_counter are used instead.
+The checks are skipped for the modules missing in the tree, they would pass without testing anything
+"""
+
+import os
+import sys
+import pkgutil
+import importlib
+import subprocess
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LAZY_PACKAGES = {
+  'epyk.core.html': 'epyk.core.html.Html',
+  'epyk.core.html.graph': 'epyk.core.html.graph.Graph',
+  'epyk.core.html.tables': 'epyk.core.html.tables.Html',
+  'epyk.core.css.styles': 'epyk.core.css.styles.CssStyles',
+  'epyk.core.css.themes': 'epyk.core.css.themes.Theme',
+}
+
+
+def loaded(statement):
+  """
+  Run a statement in a new interpreter and return the modules loaded
+
+  :param statement: The Python statement to run
+
+  :return: A set with the module names in sys.modules
+  """
+  proc = subprocess.run([sys.executable, '-c', "import sys; %s; print(' '.join(sys.modules))" % statement], cwd=ROOT,
+                        stdout=subprocess.PIPE, universal_newlines=True)
+  return set(proc.stdout.split())
+
+
+def submodules(package, prefix):
+  """
+  Return the submodules of a package available in the tree which match a prefix
+
+  :param package: The package name
+  :param prefix: The module name prefix
+
+  :return: A list with the module names
+  """
+  path = importlib.import_module(package).__path__
+  return [name for _, name, _ in pkgutil.iter_modules(path, "%s." % package) if name.startswith(prefix)]
+
+
+@pytest.mark.parametrize("package, prefix", sorted(LAZY_PACKAGES.items()))
+def test_package_import_is_lazy(package, prefix):
+  if not submodules(package, prefix):
+    pytest.skip("No %s module in this tree" % prefix)
+
+  modules = loaded("import %s" % package)
+  assert package in modules
+  assert [name for name in modules if name.startswith(prefix)] == []
+
+
+@pytest.mark.parametrize("package", sorted(LAZY_PACKAGES))
+def test_alias_is_cached(package):
+  pkg = importlib.import_module(package)
+  alias = sorted(pkg._MODULES)[0]
+  try:
+    mod = getattr(pkg, alias)
+  except ImportError:
+    pytest.skip("The %s module cannot be imported in this tree" % alias)
+
+  assert vars(pkg)[alias] is mod
+
+
+def test_alias_loads_module_on_access():
+  modules = loaded("from epyk.core.css import themes; themes.darks.ThemeDark")
+  assert 'epyk.core.css.themes.ThemeDark' in modules
+  assert 'epyk.core.css.themes.ThemeRed' not in modules
+
+
+@pytest.mark.parametrize("package", sorted(LAZY_PACKAGES))
+def test_import_time_below_eager(package):
+  # The modules imported with importlib are missing in the -X importtime report, they are timed in the interpreter
+  proc = subprocess.run([sys.executable, '-c', "import time, importlib; importlib.import_module(%(parent)r); "
+                         "start = time.perf_counter(); pkg = importlib.import_module(%(pkg)r); "
+                         "lazy = time.perf_counter() - start; [getattr(pkg, name) for name in pkg._MODULES]; "
+                         "print(lazy, time.perf_counter() - start - lazy)" % {
+                           'pkg': package, 'parent': package.rpartition(".")[0]}],
+                        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+  if proc.returncode != 0:
+    pytest.skip("The %s modules cannot be imported in this tree" % package)
+
+  lazy, modules = map(float, proc.stdout.split())
+  assert lazy < modules
@@ -23,10 +23,12 @@ setuptools.setup(
     url="https://github.com/epykure/epyk-ui",
     packages=setuptools.find_packages(),
     install_requires=install_required(),
-    python_requires=">=2.7",
+    python_requires=">=3.8",
+    entry_points={
+      'console_scripts': ['epyk_css=epyk.core.cli.CssCompiler:main'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 2.7",
         "License :: OSI Approved :: GNU General Public License (GPL)",
         "Operating System :: OS Independent",
     ],